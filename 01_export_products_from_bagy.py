@@ -1,31 +1,50 @@
-import requests
 import openpyxl
 import json
 import os
-from time import sleep
+import sys
 from dotenv import load_dotenv
+import columnar
+import http_cache
+import metrics
+import profiling
+import staging
+from snapshot import load_snapshot, save_snapshot, merge_records, next_watermark, changed_since, INCREMENTAL_SORT
 
 # Carrega as variáveis do arquivo .env
 load_dotenv()
 
-API_URL = "https://api.dooca.store/products"
+# BAGY_API_URL permite apontar para o simulador local (api_simulator.py)
+API_URL = f"{os.getenv('BAGY_API_URL', 'https://api.dooca.store')}/products"
 API_KEY = os.getenv("API_KEY")
 
 # Verifica se a API_KEY foi carregada
 if not API_KEY:
     raise ValueError("❌ API_KEY não encontrada no arquivo .env")
 
-def get_all_products():
+# Tipos da cópia colunar (imported/produtos.parquet ou .pkl); o resto vai como JSON
+PRODUCT_SCHEMA = {
+    "id": "Int64", "name": "string", "sku": "string", "reference": "string", "url": "string",
+    "active": "boolean", "price": "float64", "price_compare": "float64", "balance": "Int64",
+    "created_at": "string", "updated_at": "string"
+}
+
+def get_all_products(since=None):
+    """Busca os produtos; com since, apenas os alterados desde a marca d'água.
+    Retorna (registros, paginação completa)"""
     headers = {"Authorization": f"Bearer {API_KEY}"}
     products = []
     page = 1
     total_pages = None
 
     while True:
-        response = requests.get(API_URL, headers=headers, params={"page": page})
+        params = {"page": page}
+        if since:
+            params["sort"] = INCREMENTAL_SORT
+
+        response = http_cache.get(API_URL, headers=headers, params=params)
         if response.status_code != 200:
             print(f"❌ Erro na página {page}: {response.status_code}")
-            break
+            return products, False
 
         data = response.json()
         if total_pages is None:
@@ -34,15 +53,24 @@ def get_all_products():
             print(f"📦 Total de produtos: {data.get('meta', {}).get('total', '?')}")
 
         print(f"➡️  Processando página {page} de {total_pages}...")
-        products.extend(data.get("data", []))
+        page_products = data.get("data", [])
+
+        if since:
+            recent, reached = changed_since(page_products, since)
+            products.extend(recent)
+            if reached:
+                print(f"⏹️  Marca d'água {since} atingida na página {page}")
+                break
+        else:
+            products.extend(page_products)
 
         if not data.get("links", {}).get("next"):
             break
 
         page += 1
-        sleep(0.350)
+        metrics.throttle_sleep(0.350, "bagy_pagination")
 
-    return products
+    return products, True
 
 def export_products_to_excel(products, filename="produtos_dooca.xlsx"):
     # Cria a pasta imported se não existir
@@ -80,7 +108,42 @@ def export_products_to_json(products, filename="produtos.json"):
         json.dump(products, f, ensure_ascii=False, indent=2)
     print(f"✅ Arquivo JSON salvo como {filepath}")
 
-# Execução completa
-produtos = get_all_products()
-export_products_to_excel(produtos)
-export_products_to_json(produtos)
+def main():
+    # --incremental: busca só o que mudou desde a última execução e mescla no snapshot
+    incremental = "--incremental" in sys.argv
+
+    records, watermark = load_snapshot("produtos") if incremental else ({}, None)
+    if watermark:
+        print(f"🔁 Exportação incremental: produtos alterados desde {watermark}")
+
+    profiling.checkpoint("fetch")
+    changed, complete = get_all_products(since=watermark)
+    
+    profiling.checkpoint("merge_snapshot")
+    new_count, updated_count = merge_records(records, changed)
+    print(f"🧮 Produtos novos: {new_count} | atualizados: {updated_count} | total: {len(records)}")
+
+    save_snapshot("produtos", records, next_watermark(changed, watermark, complete))
+
+    # Grava no staging: upsert dos alterados ou substituição completa na varredura total
+    # (uma varredura interrompida só faz upsert, para não apagar o que não foi buscado)
+    profiling.checkpoint("staging")
+    conn = staging.connect()
+    if (complete and watermark is None) or not staging.count_rows(conn, "products"):
+        staging.upsert_products(conn, records.values(), replace=True)
+    else:
+        staging.upsert_products(conn, changed)
+    conn.close()
+
+    produtos = list(records.values())
+    profiling.checkpoint("excel")
+    export_products_to_excel(produtos)
+    profiling.checkpoint("json")
+    export_products_to_json(produtos)
+    profiling.checkpoint("columnar")
+    columnar.save_dataset("produtos", produtos, PRODUCT_SCHEMA)
+    profiling.checkpoint(None)
+
+if __name__ == "__main__":
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
@@ -1,16 +1,31 @@
-import requests
 import openpyxl
 from time import sleep
 import os
+import sys
 from dotenv import load_dotenv
+import columnar
+import http_cache
+import metrics
+import profiling
+import staging
+from snapshot import load_snapshot, save_snapshot, merge_records, next_watermark, changed_since, INCREMENTAL_SORT
 
 # Carrega as variáveis do arquivo .env
 load_dotenv()
 
-API_URL = "https://api.dooca.store/customers"
+# BAGY_API_URL permite apontar para o simulador local (api_simulator.py)
+API_URL = f"{os.getenv('BAGY_API_URL', 'https://api.dooca.store')}/customers"
 API_KEY = os.getenv("API_KEY")
 
-def get_all_customers():
+# Tipos da cópia colunar (imported/clientes.parquet ou .pkl); o endereço vai como JSON
+CUSTOMER_SCHEMA = {
+    "id": "Int64", "name": "string", "email": "string", "cgc": "string", "phone": "string",
+    "birthday": "string", "gender": "string", "created_at": "string", "updated_at": "string"
+}
+
+def get_all_customers(since=None):
+    """Busca os clientes; com since, apenas os alterados desde a marca d'água.
+    Retorna (registros, paginação completa)"""
     headers = {"Authorization": f"Bearer {API_KEY}"}
     customers = []
     page = 1
@@ -18,10 +33,14 @@ def get_all_customers():
     total_customers = None
 
     while True:
-        response = requests.get(API_URL, headers=headers, params={"page": page})
+        params = {"page": page}
+        if since:
+            params["sort"] = INCREMENTAL_SORT
+
+        response = http_cache.get(API_URL, headers=headers, params=params)
         if response.status_code != 200:
             print(f"❌ Erro na requisição da página {page}: {response.status_code}")
-            break
+            return customers, False
 
         data = response.json()
         if total_pages is None:
@@ -33,16 +52,22 @@ def get_all_customers():
         print(f"➡️  Processando página {page} de {total_pages}...")
 
         new_customers = data.get("data", [])
+        if since:
+            new_customers, reached = changed_since(new_customers, since)
         customers.extend(new_customers)
 
         print(f"📥 Baixados {len(customers)} de {total_customers} clientes até agora\n")
+        if since and reached:
+            print(f"⏹️  Marca d'água {since} atingida na página {page}")
+            break
+
         if not data.get("links", {}).get("next"):
             break
 
         page += 1
         # sleep(0.350)
 
-    return customers
+    return customers, True
 
 def export_to_excel(customers, filename="clientes_dooca.xlsx"):
     # Cria a pasta imported se não existir
@@ -85,6 +110,32 @@ def export_to_excel(customers, filename="clientes_dooca.xlsx"):
     wb.save(filepath)
     print(f"✅ Arquivo salvo como {filepath}")
 
-# Execução completa sem limite de páginas
-clientes = get_all_customers()
-export_to_excel(clientes)
+def main():
+    # --incremental: busca só o que mudou desde a última execução e mescla no snapshot
+    incremental = "--incremental" in sys.argv
+
+    records, watermark = load_snapshot("clientes") if incremental else ({}, None)
+    if watermark:
+        print(f"🔁 Exportação incremental: clientes alterados desde {watermark}")
+
+    changed, complete = get_all_customers(since=watermark)
+    new_count, updated_count = merge_records(records, changed)
+    print(f"🧮 Novos: {new_count} | atualizados: {updated_count} | total: {len(records)}")
+
+    save_snapshot("clientes", records, next_watermark(changed, watermark, complete))
+
+    # Grava no staging: upsert dos alterados ou substituição completa na varredura total
+    # (uma varredura interrompida só faz upsert, para não apagar o que não foi buscado)
+    conn = staging.connect()
+    if (complete and watermark is None) or not staging.count_rows(conn, "customers"):
+        staging.upsert_customers(conn, records.values(), replace=True)
+    else:
+        staging.upsert_customers(conn, changed)
+    conn.close()
+
+    export_to_excel(list(records.values()))
+    columnar.save_dataset("clientes", records.values(), CUSTOMER_SCHEMA)
+
+if __name__ == "__main__":
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
@@ -1,26 +1,47 @@
-import requests
 import openpyxl
-from time import sleep
 import os
+import sys
 from dotenv import load_dotenv
+import columnar
+import http_cache
+import metrics
+import profiling
+import staging
+from snapshot import load_snapshot, save_snapshot, merge_records, next_watermark, changed_since, INCREMENTAL_SORT
 
 # Carrega as variáveis do arquivo .env
 load_dotenv()
 
-API_URL = "https://api.dooca.store/discounts"
+# BAGY_API_URL permite apontar para o simulador local (api_simulator.py)
+API_URL = f"{os.getenv('BAGY_API_URL', 'https://api.dooca.store')}/discounts"
 API_KEY = os.getenv("API_KEY")
 
-def get_all_discounts():
+# Tipos da cópia colunar (imported/cupons.parquet ou .pkl); listas de IDs vão como JSON
+DISCOUNT_SCHEMA = {
+    "id": "Int64", "name": "string", "code": "string", "date_from": "string", "date_to": "string",
+    "single_usage": "boolean", "usage_limit": "Int64", "min_purchase": "float64", "max_purchase": "float64",
+    "min_quantity": "Int64", "max_quantity": "Int64", "type": "string", "value_type": "string",
+    "value": "float64", "coupon_allow_free_freight": "boolean", "is_free_freight": "boolean",
+    "active": "boolean", "created_at": "string", "updated_at": "string"
+}
+
+def get_all_discounts(since=None):
+    """Busca os cupons; com since, apenas os alterados desde a marca d'água.
+    Retorna (registros, paginação completa)"""
     headers = {"Authorization": f"Bearer {API_KEY}"}
     discounts = []
     page = 1
     total_pages = None
 
     while True:
-        response = requests.get(API_URL, headers=headers, params={"page": page})
+        params = {"page": page}
+        if since:
+            params["sort"] = INCREMENTAL_SORT
+
+        response = http_cache.get(API_URL, headers=headers, params=params)
         if response.status_code != 200:
             print(f"❌ Erro na requisição da página {page}: {response.status_code}")
-            break
+            return discounts, False
 
         data = response.json()
         if total_pages is None:
@@ -30,15 +51,24 @@ def get_all_discounts():
 
         print(f"➡️  Processando página {page} de {total_pages}...")
 
-        discounts.extend(data.get("data", []))
+        page_discounts = data.get("data", [])
+
+        if since:
+            recent, reached = changed_since(page_discounts, since)
+            discounts.extend(recent)
+            if reached:
+                print(f"⏹️  Marca d'água {since} atingida na página {page}")
+                break
+        else:
+            discounts.extend(page_discounts)
 
         if not data.get("links", {}).get("next"):
             break
 
         page += 1
-        sleep(0.350)
+        metrics.throttle_sleep(0.350, "bagy_pagination")
 
-    return discounts
+    return discounts, True
 
 def export_discounts_to_excel(discounts, filename="cupons_dooca.xlsx"):
     # Cria a pasta imported se não existir
@@ -101,6 +131,32 @@ def export_discounts_to_excel(discounts, filename="cupons_dooca.xlsx"):
     wb.save(filepath)
     print(f"✅ Arquivo salvo como {filepath}")
 
-# Execução completa
-cupons = get_all_discounts()
-export_discounts_to_excel(cupons)
+def main():
+    # --incremental: busca só o que mudou desde a última execução e mescla no snapshot
+    incremental = "--incremental" in sys.argv
+
+    records, watermark = load_snapshot("cupons") if incremental else ({}, None)
+    if watermark:
+        print(f"🔁 Exportação incremental: cupons alterados desde {watermark}")
+
+    changed, complete = get_all_discounts(since=watermark)
+    new_count, updated_count = merge_records(records, changed)
+    print(f"🧮 Novos: {new_count} | atualizados: {updated_count} | total: {len(records)}")
+
+    save_snapshot("cupons", records, next_watermark(changed, watermark, complete))
+
+    # Grava no staging: upsert dos alterados ou substituição completa na varredura total
+    # (uma varredura interrompida só faz upsert, para não apagar o que não foi buscado)
+    conn = staging.connect()
+    if (complete and watermark is None) or not staging.count_rows(conn, "discounts"):
+        staging.upsert_discounts(conn, records.values(), replace=True)
+    else:
+        staging.upsert_discounts(conn, changed)
+    conn.close()
+
+    export_discounts_to_excel(list(records.values()))
+    columnar.save_dataset("cupons", records.values(), DISCOUNT_SCHEMA)
+
+if __name__ == "__main__":
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
@@ -12,11 +12,20 @@ Regras importantes:
 5. Imagens em linhas separadas com Handle + dados da imagem
 """
 
+import argparse
+import glob
+import hashlib
+import io
 import json
 import csv
 import re
 import os
+from contextlib import nullcontext
 from html import unescape
+import numpy as np
+import pandas as pd
+import profiling
+import staging
 
 def clean_html(html_text):
     """Remove tags HTML e converte entidades HTML para texto limpo"""
@@ -87,172 +96,99 @@ def safe_get(obj, key, default=''):
     except:
         return default
 
-def convert_bagy_to_shopify_csv(json_file_path, csv_file_path, max_products=None):
-    """
-    Converte produtos do JSON da Bagy para CSV do Shopify
-    """
-    
+# Cabeçalhos do CSV do Shopify (baseado no template)
+HEADERS = [
+    'Handle', 'Title', 'Body (HTML)', 'Vendor', 'Product Category', 'Type', 'Tags',
+    'Published', 'Option1 Name', 'Option1 Value', 'Option2 Name', 'Option2 Value',
+    'Option3 Name', 'Option3 Value', 'Variant SKU', 'Variant Grams',
+    'Variant Inventory Tracker', 'Variant Inventory Qty', 'Variant Inventory Policy',
+    'Variant Fulfillment Service', 'Variant Price', 'Variant Compare At Price',
+    'Variant Requires Shipping', 'Variant Taxable', 'Variant Barcode', 'Image Src',
+    'Image Position', 'Image Alt Text', 'Gift Card', 'SEO Title', 'SEO Description',
+    'Google Shopping / Google Product Category', 'Google Shopping / Gender',
+    'Google Shopping / Age Group', 'Google Shopping / MPN', 'Google Shopping / Condition',
+    'Google Shopping / Custom Product', 'Variant Image', 'Variant Weight Unit',
+    'Variant Tax Code', 'Cost per item', 'Included / United States',
+    'Price / United States', 'Compare At Price / United States',
+    'Included / International', 'Price / International',
+    'Compare At Price / International', 'Status'
+]
+
+# O Shopify recusa CSVs de importação de produtos acima de 15 MB
+MAX_CSV_MB = 15
+# Só os produtos novos ou alterados desde a última conversão incremental
+DELTA_CSV_FILE = "produtos_shopify_delta.csv"
+# Motores de conversão: laço por produto ou colunar (pandas), com a mesma saída
+ENGINES = ["loop", "pandas"]
+# Produtos por lote no motor colunar (limita a memória dos DataFrames)
+COLUMNAR_CHUNK = 5000
+# Imagens já enviadas ao Shopify Files pelo 14_upload_images_to_shopify.py
+IMAGE_MAP_FILE = os.path.join("imported", "images_upload_state.json")
+# Colunas do produto que só a primeira linha de variação leva
+FIRST_ROW_COLUMNS = ['Title', 'Body (HTML)', 'Vendor', 'Type', 'Tags', 'Published', 'SEO Title',
+                     'SEO Description', 'Image Src', 'Image Position', 'Image Alt Text']
+
+def sort_variations(var):
+    """Chave de ordenação das variações: cor primeiro, depois tamanho"""
     try:
-        print("Carregando arquivo JSON...")
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
-        print(f"JSON carregado com {len(products)} produtos")
-    except Exception as e:
-        print(f"Erro ao ler arquivo JSON: {e}")
-        return
+        size_order = {'P': 1, 'M': 2, 'G': 3, 'GG': 4, 'XG': 5}
+        color = safe_get(var.get('color', {}), 'name', '') if var.get('color') else ''
+        size = safe_get(var.get('attribute', {}), 'name', 'P')
+        return (color, size_order.get(size, 6))
+    except:
+        return ('', 6)
 
-    # Cabeçalhos do CSV do Shopify (baseado no template)
-    headers = [
-        'Handle', 'Title', 'Body (HTML)', 'Vendor', 'Product Category', 'Type', 'Tags',
-        'Published', 'Option1 Name', 'Option1 Value', 'Option2 Name', 'Option2 Value',
-        'Option3 Name', 'Option3 Value', 'Variant SKU', 'Variant Grams',
-        'Variant Inventory Tracker', 'Variant Inventory Qty', 'Variant Inventory Policy',
-        'Variant Fulfillment Service', 'Variant Price', 'Variant Compare At Price',
-        'Variant Requires Shipping', 'Variant Taxable', 'Variant Barcode', 'Image Src',
-        'Image Position', 'Image Alt Text', 'Gift Card', 'SEO Title', 'SEO Description',
-        'Google Shopping / Google Product Category', 'Google Shopping / Gender',
-        'Google Shopping / Age Group', 'Google Shopping / MPN', 'Google Shopping / Condition',
-        'Google Shopping / Custom Product', 'Variant Image', 'Variant Weight Unit',
-        'Variant Tax Code', 'Cost per item', 'Included / United States',
-        'Price / United States', 'Compare At Price / United States',
-        'Included / International', 'Price / International',
-        'Compare At Price / International', 'Status'
-    ]
-    
-    csv_rows = []
-    processed_count = 0
-    error_count = 0
+def product_rows(product, headers=HEADERS):
+    """Linhas do CSV de um produto: variações (ou a linha do produto simples) e depois as imagens"""
+    rows = []
+    handle = create_handle(product['name'])
+    title = safe_get(product, 'name', 'Produto sem nome')
+    body_html = safe_get(product, 'description', '')
+    vendor = 'Marca'
     
-    # Filtra produtos válidos
-    valid_products = [p for p in products if p and p.get('name')]
+    # Tenta obter vendor do brand
+    if product.get('brand') and product['brand'].get('name'):
+        vendor = product['brand']['name']
     
-    # Processa os produtos especificados ou todos se max_products for None
-    if max_products is None:
-        products_to_process = valid_products
-    else:
-        products_to_process = valid_products[:max_products]
+    # Categoria do produto
+    category = ''
+    if product.get('category_default') and product['category_default'].get('name'):
+        category = product['category_default']['name']
     
-    print(f"Processando {len(products_to_process)} produtos...")
+    # Tags - usando meta_keywords se disponível
+    tags = safe_get(product, 'meta_keywords', '')
     
-    for i, product in enumerate(products_to_process):
-        try:
-            handle = create_handle(product['name'])
-            title = safe_get(product, 'name', 'Produto sem nome')
-            body_html = safe_get(product, 'description', '')
-            vendor = 'Marca'
-            
-            # Tenta obter vendor do brand
-            if product.get('brand') and product['brand'].get('name'):
-                vendor = product['brand']['name']
-            
-            # Categoria do produto
-            category = ''
-            if product.get('category_default') and product['category_default'].get('name'):
-                category = product['category_default']['name']
-            
-            # Tags - usando meta_keywords se disponível
-            tags = safe_get(product, 'meta_keywords', '')
-            
-            # Status do produto
-            status = 'active' if product.get('active', False) else 'draft'
-            
-            # SEO
-            seo_title = safe_get(product, 'meta_title', '') or title
-            seo_description = safe_get(product, 'meta_description', '') or clean_html(body_html)[:320]
-            
-            # Peso em gramas
-            weight_grams = get_weight_in_grams(product.get('weight'))
-            
-            # Preço
-            price = product.get('price', 0)
-            compare_price = safe_get(product, 'price_compare', '')
-            
-            # Verifica se o produto tem variações
-            variations = product.get('variations', [])
-            images = product.get('images', [])
-            
-            if variations:
-                # Produto com variações
-                # ORDENAÇÃO IMPORTANTE: Cor primeiro, depois por tamanho
-                def sort_variations(var):
-                    try:
-                        size_order = {'P': 1, 'M': 2, 'G': 3, 'GG': 4, 'XG': 5}
-                        color = safe_get(var.get('color', {}), 'name', '') if var.get('color') else ''
-                        size = safe_get(var.get('attribute', {}), 'name', 'P')
-                        return (color, size_order.get(size, 6))
-                    except:
-                        return ('', 6)
-                
-                variations.sort(key=sort_variations)
-                
-                first_variation = True
+    # Status do produto
+    status = 'active' if product.get('active', False) else 'draft'
+    
+    # SEO
+    seo_title = safe_get(product, 'meta_title', '') or title
+    seo_description = safe_get(product, 'meta_description', '') or clean_html(body_html)[:320]
+    
+    # Peso em gramas
+    weight_grams = get_weight_in_grams(product.get('weight'))
+    
+    # Preço
+    price = product.get('price', 0)
+    compare_price = safe_get(product, 'price_compare', '')
+    
+    # Verifica se o produto tem variações
+    variations = product.get('variations', [])
+    images = product.get('images', [])
+    
+    if variations:
+        # Produto com variações
+        # ORDENAÇÃO IMPORTANTE: Cor primeiro, depois por tamanho
+        variations.sort(key=sort_variations)
+        
+        first_variation = True
+        
+        for variation in variations:
+            try:
+                row = [''] * len(headers)
                 
-                for variation in variations:
-                    try:
-                        row = [''] * len(headers)
-                        
-                        # Dados básicos do produto (apenas na primeira linha de variação)
-                        if first_variation:
-                            row[headers.index('Handle')] = handle
-                            row[headers.index('Title')] = title
-                            row[headers.index('Body (HTML)')] = body_html
-                            row[headers.index('Vendor')] = vendor
-                            row[headers.index('Type')] = category
-                            row[headers.index('Tags')] = tags
-                            row[headers.index('Published')] = 'TRUE' if status == 'active' else 'FALSE'
-                            row[headers.index('SEO Title')] = seo_title
-                            row[headers.index('SEO Description')] = seo_description[:320]
-                            first_variation = False
-                        else:
-                            row[headers.index('Handle')] = handle
-                        
-                        # Opções de variação: COR PRIMEIRO (Option1), TAMANHO SEGUNDO (Option2)
-                        if variation.get('color'):
-                            row[headers.index('Option1 Name')] = 'Cor'
-                            row[headers.index('Option1 Value')] = safe_get(variation['color'], 'name', '')
-                        
-                        if variation.get('attribute'):
-                            row[headers.index('Option2 Name')] = safe_get(variation['attribute'], 'attribute_name', 'Tamanho')
-                            row[headers.index('Option2 Value')] = safe_get(variation['attribute'], 'name', '')
-                        
-                        # Dados da variação
-                        row[headers.index('Variant SKU')] = safe_get(variation, 'sku', '')
-                        row[headers.index('Variant Grams')] = weight_grams
-                        row[headers.index('Variant Inventory Tracker')] = 'shopify'
-                        row[headers.index('Variant Inventory Qty')] = variation.get('balance', 0)
-                        row[headers.index('Variant Inventory Policy')] = 'deny'
-                        row[headers.index('Variant Fulfillment Service')] = 'manual'
-                        row[headers.index('Variant Price')] = variation.get('price', price)
-                        
-                        if variation.get('price_compare'):
-                            row[headers.index('Variant Compare At Price')] = variation['price_compare']
-                        
-                        # Adiciona imagem específica da variação se existir
-                        if variation.get('images') and variation['images']:
-                            variant_images = variation['images']
-                            if isinstance(variant_images, list) and len(variant_images) > 0:
-                                row[headers.index('Variant Image')] = safe_get(variant_images[0], 'src', '')
-                            elif isinstance(variant_images, str):
-                                row[headers.index('Variant Image')] = variant_images
-                        
-                        row[headers.index('Variant Requires Shipping')] = 'TRUE'
-                        row[headers.index('Variant Taxable')] = 'TRUE'
-                        row[headers.index('Gift Card')] = 'FALSE'
-                        row[headers.index('Variant Weight Unit')] = 'g'
-                        row[headers.index('Included / United States')] = 'TRUE'
-                        row[headers.index('Included / International')] = 'TRUE'
-                        row[headers.index('Status')] = status
-                        
-                        csv_rows.append(row)
-                        
-                    except Exception as e:
-                        print(f"Erro ao processar variação do produto '{title}': {e}")
-                        continue
-            else:
-                # Produto simples (sem variações)
-                try:
-                    row = [''] * len(headers)
-                    
+                # Dados básicos do produto (apenas na primeira linha de variação)
+                if first_variation:
                     row[headers.index('Handle')] = handle
                     row[headers.index('Title')] = title
                     row[headers.index('Body (HTML)')] = body_html
@@ -260,102 +196,609 @@ def convert_bagy_to_shopify_csv(json_file_path, csv_file_path, max_products=None
                     row[headers.index('Type')] = category
                     row[headers.index('Tags')] = tags
                     row[headers.index('Published')] = 'TRUE' if status == 'active' else 'FALSE'
-                    row[headers.index('Option1 Name')] = 'Title'
-                    row[headers.index('Option1 Value')] = 'Default Title'
-                    row[headers.index('Variant SKU')] = safe_get(product, 'sku', '')
-                    row[headers.index('Variant Grams')] = weight_grams
-                    row[headers.index('Variant Inventory Tracker')] = 'shopify'
-                    row[headers.index('Variant Inventory Qty')] = 0
-                    row[headers.index('Variant Inventory Policy')] = 'deny'
-                    row[headers.index('Variant Fulfillment Service')] = 'manual'
-                    row[headers.index('Variant Price')] = price
-                    
-                    if compare_price:
-                        row[headers.index('Variant Compare At Price')] = compare_price
-                    
-                    row[headers.index('Variant Requires Shipping')] = 'TRUE'
-                    row[headers.index('Variant Taxable')] = 'TRUE'
-                    row[headers.index('Gift Card')] = 'FALSE'
                     row[headers.index('SEO Title')] = seo_title
                     row[headers.index('SEO Description')] = seo_description[:320]
-                    row[headers.index('Variant Weight Unit')] = 'g'
-                    row[headers.index('Included / United States')] = 'TRUE'
-                    row[headers.index('Included / International')] = 'TRUE'
-                    row[headers.index('Status')] = status
                     
-                    # Adiciona primeira imagem se existir
+                    # A primeira imagem do produto vai na primeira linha de variação
                     if images and len(images) > 0:
                         row[headers.index('Image Src')] = safe_get(images[0], 'src', '')
                         row[headers.index('Image Position')] = str(safe_get(images[0], 'position', 1))
                         row[headers.index('Image Alt Text')] = safe_get(images[0], 'alt', '') or title
-                    
-                    csv_rows.append(row)
-                    
+                else:
+                    row[headers.index('Handle')] = handle
+                
+                # Opções de variação: COR PRIMEIRO (Option1), TAMANHO SEGUNDO (Option2)
+                if variation.get('color'):
+                    row[headers.index('Option1 Name')] = 'Cor'
+                    row[headers.index('Option1 Value')] = safe_get(variation['color'], 'name', '')
+                
+                if variation.get('attribute'):
+                    row[headers.index('Option2 Name')] = safe_get(variation['attribute'], 'attribute_name', 'Tamanho')
+                    row[headers.index('Option2 Value')] = safe_get(variation['attribute'], 'name', '')
+                
+                # Dados da variação
+                row[headers.index('Variant SKU')] = safe_get(variation, 'sku', '')
+                row[headers.index('Variant Grams')] = weight_grams
+                row[headers.index('Variant Inventory Tracker')] = 'shopify'
+                row[headers.index('Variant Inventory Qty')] = variation.get('balance', 0)
+                row[headers.index('Variant Inventory Policy')] = 'deny'
+                row[headers.index('Variant Fulfillment Service')] = 'manual'
+                row[headers.index('Variant Price')] = variation.get('price', price)
+                
+                if variation.get('price_compare'):
+                    row[headers.index('Variant Compare At Price')] = variation['price_compare']
+                
+                # Adiciona imagem específica da variação se existir
+                if variation.get('images') and variation['images']:
+                    variant_images = variation['images']
+                    if isinstance(variant_images, list) and len(variant_images) > 0:
+                        row[headers.index('Variant Image')] = safe_get(variant_images[0], 'src', '')
+                    elif isinstance(variant_images, str):
+                        row[headers.index('Variant Image')] = variant_images
+                
+                row[headers.index('Variant Requires Shipping')] = 'TRUE'
+                row[headers.index('Variant Taxable')] = 'TRUE'
+                row[headers.index('Gift Card')] = 'FALSE'
+                row[headers.index('Variant Weight Unit')] = 'g'
+                row[headers.index('Included / United States')] = 'TRUE'
+                row[headers.index('Included / International')] = 'TRUE'
+                row[headers.index('Status')] = status
+                
+                rows.append(row)
+                # Dados do produto e primeira imagem ficam na primeira linha que deu certo
+                first_variation = False
+                
+            except Exception as e:
+                print(f"Erro ao processar variação do produto '{title}': {e}")
+                continue
+    else:
+        # Produto simples (sem variações)
+        try:
+            row = [''] * len(headers)
+            
+            row[headers.index('Handle')] = handle
+            row[headers.index('Title')] = title
+            row[headers.index('Body (HTML)')] = body_html
+            row[headers.index('Vendor')] = vendor
+            row[headers.index('Type')] = category
+            row[headers.index('Tags')] = tags
+            row[headers.index('Published')] = 'TRUE' if status == 'active' else 'FALSE'
+            row[headers.index('Option1 Name')] = 'Title'
+            row[headers.index('Option1 Value')] = 'Default Title'
+            row[headers.index('Variant SKU')] = safe_get(product, 'sku', '')
+            row[headers.index('Variant Grams')] = weight_grams
+            row[headers.index('Variant Inventory Tracker')] = 'shopify'
+            row[headers.index('Variant Inventory Qty')] = 0
+            row[headers.index('Variant Inventory Policy')] = 'deny'
+            row[headers.index('Variant Fulfillment Service')] = 'manual'
+            row[headers.index('Variant Price')] = price
+            
+            if compare_price:
+                row[headers.index('Variant Compare At Price')] = compare_price
+            
+            row[headers.index('Variant Requires Shipping')] = 'TRUE'
+            row[headers.index('Variant Taxable')] = 'TRUE'
+            row[headers.index('Gift Card')] = 'FALSE'
+            row[headers.index('SEO Title')] = seo_title
+            row[headers.index('SEO Description')] = seo_description[:320]
+            row[headers.index('Variant Weight Unit')] = 'g'
+            row[headers.index('Included / United States')] = 'TRUE'
+            row[headers.index('Included / International')] = 'TRUE'
+            row[headers.index('Status')] = status
+            
+            # Adiciona primeira imagem se existir
+            if images and len(images) > 0:
+                row[headers.index('Image Src')] = safe_get(images[0], 'src', '')
+                row[headers.index('Image Position')] = str(safe_get(images[0], 'position', 1))
+                row[headers.index('Image Alt Text')] = safe_get(images[0], 'alt', '') or title
+            
+            rows.append(row)
+            
+        except Exception as e:
+            print(f"Erro ao processar produto simples '{title}': {e}")
+    
+    # Adiciona imagens adicionais em linhas separadas
+    try:
+        if images and len(images) > 0:
+            for j, image in enumerate(images[1:], start=2):
+                try:
+                    image_row = [''] * len(headers)
+                    image_row[headers.index('Handle')] = handle
+                    image_row[headers.index('Image Src')] = safe_get(image, 'src', '')
+                    image_row[headers.index('Image Position')] = str(safe_get(image, 'position', j))
+                    image_row[headers.index('Image Alt Text')] = safe_get(image, 'alt', '') or title
+                    rows.append(image_row)
                 except Exception as e:
-                    print(f"Erro ao processar produto simples '{title}': {e}")
+                    print(f"Erro ao processar imagem {j} do produto '{title}': {e}")
                     continue
-            
-            # Adiciona linhas para imagens do produto
+    except Exception as e:
+        print(f"Erro ao processar imagens do produto '{title}': {e}")
+    
+    return rows
+
+# Colunas fixas das linhas de variação e de produto simples
+VARIANT_CONSTANTS = {
+    'Variant Inventory Tracker': 'shopify', 'Variant Inventory Policy': 'deny',
+    'Variant Fulfillment Service': 'manual', 'Variant Requires Shipping': 'TRUE', 'Variant Taxable': 'TRUE',
+    'Gift Card': 'FALSE', 'Variant Weight Unit': 'g', 'Included / United States': 'TRUE',
+    'Included / International': 'TRUE'
+}
+SIZE_ORDER = {'P': 1, 'M': 2, 'G': 3, 'GG': 4, 'XG': 5}
+# Acentos que create_handle troca, numa tabela só
+ACCENTS = str.maketrans('ãáàâéêíóôõúç', 'aaaaeeiooouc')
+
+def is_columnar_product(product):
+    """Produto no formato usual da Bagy, que o motor colunar converte. Os demais (tipos inesperados,
+    casos que o laço resolve nos except) passam por product_rows, para a saída continuar idêntica"""
+    text = (str, type(None))
+    if not (isinstance(product.get('name'), str) and isinstance(product.get('description'), text)
+            and isinstance(product.get('meta_description'), text)):
+        return False
+    for key in ('brand', 'category_default'):
+        if product.get(key) and not isinstance(product[key], dict):
+            return False
+    images = product.get('images')
+    if images and not (isinstance(images, list) and all(isinstance(image, dict) for image in images)):
+        return False
+    variations = product.get('variations')
+    if variations:
+        if not isinstance(variations, list):
+            return False
+        for variation in variations:
+            if not isinstance(variation, dict):
+                return False
+            color, attribute = variation.get('color'), variation.get('attribute')
+            # Nomes de cor que não são texto quebram a ordenação do laço (o produto inteiro dá erro)
+            if color and not (isinstance(color, dict) and isinstance(color.get('name', ''), str)):
+                return False
+            if attribute and not (isinstance(attribute, dict) and isinstance(attribute.get('name'), text)):
+                return False
+    return True
+
+def _objects(values):
+    """Lista como array de objetos (sem o pandas converter números nem desdobrar listas)"""
+    return pd.Series(values, dtype=object).to_numpy()
+
+def handle_column(names):
+    """create_handle em uma coluna de nomes"""
+    handles = names.str.lower().str.translate(ACCENTS).str.replace(r'[^a-z0-9\s-]', '', regex=True)
+    handles = handles.str.replace(r'\s+', '-', regex=True).str.replace(r'-+', '-', regex=True).str.strip('-')
+    return handles.where(handles != '', 'produto-sem-nome')
+
+def clean_html_column(texts):
+    """clean_html em uma coluna de textos"""
+    texts = texts.fillna('')
+    texts = texts.str.replace(r'<style[^>]*>.*?</style>', '', regex=True, flags=re.DOTALL | re.IGNORECASE)
+    texts = texts.str.replace(r'<.*?>', '', regex=True).map(unescape)
+    # split() sem argumento usa os mesmos espaços que \s: igual a re.sub(r'\s+', ' ', texto).strip(), bem mais rápido
+    return texts.map(lambda text: ' '.join(text.split()))
+
+def grams_column(weights):
+    """get_weight_in_grams em uma coluna: pesos numéricos em conta vetorizada, os demais (textos) pela função"""
+    weights = pd.Series(weights, dtype=object)
+    numeric = weights.map(type).isin([int, float]).to_numpy()
+    values = weights[numeric].to_numpy(dtype=float)
+    with np.errstate(invalid='ignore', over='ignore'):
+        converted = np.trunc(np.where(values < 50, values * 1000, values))
+    exact = np.isfinite(converted) & (np.abs(values) < 2 ** 53)
+    fast = np.zeros(len(weights), dtype=bool)
+    fast[numeric] = exact
+    grams = np.empty(len(weights), dtype=object)
+    grams[fast] = converted[exact].astype(np.int64).tolist()
+    grams[~fast] = [get_weight_in_grams(weight) for weight in weights[~fast]]
+    return grams
+
+def variant_image(images):
+    """Imagem da variação como no laço (lista de imagens ou a URL direto)"""
+    if images and isinstance(images, list):
+        return safe_get(images[0], 'src', '')
+    return images if images and isinstance(images, str) else ''
+
+def _rows_part(columns, product, section, seq, color='', size=0, first_only=False):
+    """Pedaço das linhas do motor colunar: colunas do CSV (as ausentes ficam vazias) e chaves de ordenação"""
+    index = pd.RangeIndex(len(product))
+    part = pd.DataFrame({header: columns.get(header, '') for header in HEADERS}, index=index, dtype=object)
+    keys = pd.DataFrame({'product': product, 'section': section, 'color': color, 'size': size, 'seq': seq,
+                         'first_only': first_only}, index=index)
+    keys['color'] = keys['color'].astype(object)
+    return pd.concat([part, keys], axis=1)
+
+def columnar_frame(products, positions, loop_rows=()):
+    """
+    Linhas do CSV calculadas por coluna. products são produtos no formato usual (positions: posição de
+    cada um na conversão); loop_rows traz (posição, linhas de product_rows) dos demais.
+    Retorna o DataFrame com as colunas HEADERS, na ordem do laço, e a posição do produto de cada linha
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    parts = []
+
+    if products:
+        # Tabela de produtos: uma linha por produto com tudo que vai na primeira linha dele
+        names = pd.Series([p['name'] for p in products], dtype=object)
+        bodies = pd.Series([p.get('description', '') for p in products], dtype=object)
+        images = [p.get('images') or [] for p in products]
+        variations = [p.get('variations') or [] for p in products]
+        active = np.array([bool(p.get('active', False)) for p in products], dtype=bool)
+        status = np.where(active, 'active', 'draft').astype(object)
+
+        meta_titles = pd.Series([p.get('meta_title', '') for p in products], dtype=object)
+        seo_titles = meta_titles.where(meta_titles.map(bool).astype(bool), names)
+        seo_descriptions = pd.Series([p.get('meta_description', '') for p in products], dtype=object)
+        without_meta = ~seo_descriptions.map(bool).astype(bool)
+        seo_descriptions[without_meta] = clean_html_column(bodies[without_meta]).str.slice(stop=320)
+
+        first_images = [imgs[0] if imgs else None for imgs in images]
+        product_columns = {
+            'Handle': handle_column(names).to_numpy(),
+            'Title': names.to_numpy(),
+            'Body (HTML)': bodies.to_numpy(),
+            'Vendor': _objects([p['brand']['name'] if p.get('brand') and p['brand'].get('name') else 'Marca'
+                                for p in products]),
+            'Type': _objects([p['category_default']['name']
+                              if p.get('category_default') and p['category_default'].get('name') else ''
+                              for p in products]),
+            'Tags': _objects([p.get('meta_keywords', '') for p in products]),
+            'Published': np.where(active, 'TRUE', 'FALSE').astype(object),
+            'SEO Title': seo_titles.to_numpy(),
+            'SEO Description': seo_descriptions.str.slice(stop=320).to_numpy(),
+            'Image Src': _objects(['' if image is None else image.get('src', '') for image in first_images]),
+            'Image Position': _objects(['' if image is None else str(image.get('position', 1))
+                                        for image in first_images]),
+            'Image Alt Text': _objects(['' if image is None else image.get('alt', '') or name
+                                        for image, name in zip(first_images, names)]),
+            'Variant Grams': grams_column([p.get('weight') for p in products]),
+            'Status': status,
+        }
+        prices = _objects([p.get('price', 0) for p in products])
+
+        # Variações: uma linha por variação, com os dados do produto (só a primeira, depois de ordenar, fica com eles)
+        has_variations = np.array([bool(v) for v in variations], dtype=bool)
+        if has_variations.any():
+            exploded = pd.Series(variations, dtype=object)[has_variations].explode()
+            owner = exploded.index.to_numpy()
+            var = exploded.tolist()
+            colors = [v.get('color') for v in var]
+            attributes = [v.get('attribute') for v in var]
+            color_names = [color.get('name', '') if color else '' for color in colors]
+            sizes = pd.Series([a.get('name', 'P') if a else 'P' for a in attributes], dtype=object)
+            parts.append(_rows_part({
+                **{column: values[owner] for column, values in product_columns.items()},
+                **VARIANT_CONSTANTS,
+                'Option1 Name': _objects(['Cor' if color else '' for color in colors]),
+                'Option1 Value': _objects(color_names),
+                'Option2 Name': _objects([a.get('attribute_name', 'Tamanho') if a else '' for a in attributes]),
+                'Option2 Value': _objects([a.get('name', '') if a else '' for a in attributes]),
+                'Variant SKU': _objects([v.get('sku', '') for v in var]),
+                'Variant Inventory Qty': _objects([v.get('balance', 0) for v in var]),
+                'Variant Price': _objects([v.get('price', prices[o]) for v, o in zip(var, owner)]),
+                'Variant Compare At Price': _objects([v.get('price_compare') or '' for v in var]),
+                'Variant Image': _objects([variant_image(v.get('images')) for v in var]),
+            }, positions[owner], 0, exploded.groupby(level=0).cumcount().to_numpy(), color=color_names,
+                size=sizes.map(SIZE_ORDER).fillna(6).to_numpy(), first_only=True))
+
+        # Produtos simples: uma linha com os dados do produto
+        simple = np.flatnonzero(~has_variations)
+        if len(simple):
+            parts.append(_rows_part({
+                **{column: values[simple] for column, values in product_columns.items()},
+                **VARIANT_CONSTANTS,
+                'Option1 Name': 'Title',
+                'Option1 Value': 'Default Title',
+                'Variant SKU': _objects([products[i].get('sku', '') for i in simple]),
+                'Variant Inventory Qty': 0,
+                'Variant Price': prices[simple],
+                'Variant Compare At Price': _objects([products[i].get('price_compare', '') or '' for i in simple]),
+            }, positions[simple], 0, 0))
+
+        # Imagens a partir da segunda: uma linha por imagem, com posição padrão pela ordem
+        has_extra_images = np.array([len(imgs) > 1 for imgs in images], dtype=bool)
+        if has_extra_images.any():
+            exploded = pd.Series([imgs[1:] for imgs in images], dtype=object)[has_extra_images].explode()
+            owner = exploded.index.to_numpy()
+            number = exploded.groupby(level=0).cumcount().to_numpy() + 2
+            extra = exploded.tolist()
+            parts.append(_rows_part({
+                'Handle': product_columns['Handle'][owner],
+                'Image Src': _objects([image.get('src', '') for image in extra]),
+                'Image Position': _objects([str(image.get('position', j)) for image, j in zip(extra, number)]),
+                'Image Alt Text': _objects([image.get('alt', '') or product_columns['Title'][o]
+                                        for image, o in zip(extra, owner)]),
+            }, positions[owner], 1, number))
+
+    for position, rows in loop_rows:
+        if rows:
+            part = pd.DataFrame(rows, columns=HEADERS, dtype=object)
+            parts.append(_rows_part(part, np.full(len(rows), position), 0, np.arange(len(rows))))
+
+    if not parts:
+        return pd.DataFrame(columns=HEADERS, dtype=object), np.array([], dtype=np.int64)
+
+    # Uma ordenação só: produto, linhas de variação antes das imagens, cor, tamanho e ordem original
+    rows = pd.concat(parts, ignore_index=True).sort_values(['product', 'section', 'color', 'size', 'seq'],
+                                                             kind='stable', ignore_index=True)
+    repeated = rows['product'].duplicated().to_numpy() & rows['first_only'].to_numpy(dtype=bool)
+    rows.loc[repeated, FIRST_ROW_COLUMNS] = ''
+    return rows[HEADERS], rows['product'].to_numpy()
+
+def columnar_chunks(products, stats, chunk_size=COLUMNAR_CHUNK):
+    """Motor colunar: converte os produtos em lotes de chunk_size e devolve, por lote, o DataFrame das
+    linhas e a posição do produto de cada linha"""
+    for start in range(0, len(products), chunk_size):
+        regular, positions, loop_rows = [], [], []
+        for i, product in enumerate(products[start:start + chunk_size], start):
+            if is_columnar_product(product):
+                regular.append(product)
+                positions.append(i)
+                continue
             try:
-                if images and len(images) > 0:
-                    # Para produtos com variações, adiciona a primeira imagem na primeira linha
-                    if variations and csv_rows:
-                        first_row_index = len(csv_rows) - len(variations)
-                        if first_row_index >= 0 and not csv_rows[first_row_index][headers.index('Image Src')]:
-                            csv_rows[first_row_index][headers.index('Image Src')] = safe_get(images[0], 'src', '')
-                            csv_rows[first_row_index][headers.index('Image Position')] = str(safe_get(images[0], 'position', 1))
-                            csv_rows[first_row_index][headers.index('Image Alt Text')] = safe_get(images[0], 'alt', '') or title
-                    
-                    # Adiciona imagens adicionais em linhas separadas
-                    for j, image in enumerate(images[1:], start=2):
+                loop_rows.append((i, product_rows(product)))
+            except Exception as e:
+                print(f"Erro ao processar produto {i+1} ('{product.get('name', 'SEM NOME')}'): {e}")
+                stats['errors'] += 1
+
+        frame, owners = columnar_frame(regular, positions, loop_rows)
+        stats['processed'] += len(regular) + len(loop_rows)
+        print(f"Processados {stats['processed']} produtos...")
+        yield frame, owners
+
+def load_image_map(path=IMAGE_MAP_FILE):
+    """URL da imagem na Bagy -> URL no CDN do Shopify, das imagens já enviadas pelo 14"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        images = json.load(f).get('images', {})
+    return {src: image['url'] for src, image in images.items() if image.get('url')}
+
+def apply_image_map(product, image_map):
+    """Troca as URLs das imagens do produto e das variações pelas do Shopify (quando já enviadas)"""
+    if not image_map:
+        return product
+    for image in product.get('images') or []:
+        if isinstance(image, dict) and image.get('src') in image_map:
+            image['src'] = image_map[image['src']]
+    for variation in product.get('variations') or []:
+        variant_images = variation.get('images')
+        if isinstance(variant_images, list):
+            for image in variant_images:
+                if isinstance(image, dict) and image.get('src') in image_map:
+                    image['src'] = image_map[image['src']]
+        elif isinstance(variant_images, str) and variant_images in image_map:
+            variation['images'] = image_map[variant_images]
+    return product
+
+def product_hash(product):
+    """Hash estável do conteúdo de um produto da Bagy (calculado antes da conversão, que reordena as variações)"""
+    payload = json.dumps(product, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def converter_version():
+    """Hash do código deste script: se o conversor mudar, as linhas guardadas deixam de valer"""
+    with open(__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+class RollingCSVWriter:
+    """Grava blocos de linhas em um ou mais CSVs com cabeçalho. Quando o próximo bloco passaria do
+    limite, abre o arquivo seguinte (nome_2.csv, nome_3.csv...); um bloco nunca é dividido"""
+    
+    def __init__(self, path, headers, max_bytes=None):
+        self.base, self.extension = os.path.splitext(path)
+        self.max_bytes = max_bytes
+        self.files = []
+        self.rows = 0
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._header = self.encode([headers])
+        self._file = None
+        self._size = 0
+        
+        # Partes de uma execução anterior maior seriam importadas junto por engano
+        for path in glob.glob(f"{glob.escape(self.base)}_*{self.extension}"):
+            if re.fullmatch(r"_\d+", path[len(self.base):-len(self.extension) or None]):
+                os.remove(path)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def encode(self, rows):
+        """Linhas no formato do CSV, já em bytes"""
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerows(rows)
+        return self._buffer.getvalue().encode('utf-8')
+    
+    def _open_next(self):
+        if self._file:
+            self._file.close()
+        number = len(self.files) + 1
+        path = f"{self.base}{self.extension}" if number == 1 else f"{self.base}_{number}{self.extension}"
+        self._file = open(path, 'wb')
+        self._file.write(self._header)
+        self._size = len(self._header)
+        self.files.append(path)
+    
+    def write_block(self, rows):
+        self.write_encoded(self.encode(rows), len(rows))
+    
+    def write_encoded(self, data, row_count):
+        """Grava um bloco já codificado (vindo de encode ou do cache do staging)"""
+        full = self.max_bytes and self._size > len(self._header) and self._size + len(data) > self.max_bytes
+        if self._file is None or full:
+            self._open_next()
+        self._file.write(data)
+        self._size += len(data)
+        self.rows += row_count
+    
+    def write_frame(self, frame, products):
+        """Grava um lote do motor colunar (products: posição do produto de cada linha). Sem limite de tamanho
+        o lote vai inteiro; com limite, produto a produto, para dividir os arquivos nos mesmos pontos do laço.
+        As linhas passam pelo mesmo csv.writer do laço: to_csv é mais lento aqui e grava NaN como vazio"""
+        rows = frame.to_numpy().tolist()
+        if not rows:
+            return
+        if not self.max_bytes:
+            self.write_block(rows)
+            return
+        bounds = np.flatnonzero(np.diff(products)) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(rows)]):
+            self.write_block(rows[start:end])
+    
+    def close(self):
+        if self._file is None:
+            self._open_next()  # Sem produtos: CSV só com o cabeçalho
+        self._file.close()
+
+def convert_bagy_to_shopify_csv(json_file_path, csv_file_path, max_products=None, max_file_mb=MAX_CSV_MB,
+                                incremental=False, engine="loop", image_map=None):
+    """
+    Converte produtos do JSON da Bagy para CSV do Shopify.
+    As linhas de cada produto vão direto para o arquivo; acima de max_file_mb (None ou 0: sem limite)
+    a saída continua em um novo arquivo. Com incremental=True, produtos com o mesmo hash de conteúdo
+    da última conversão reaproveitam as linhas guardadas no staging e os novos ou alterados também
+    vão para o CSV delta. engine="pandas" usa o motor colunar (mesma saída; na conversão incremental,
+    que só converte os produtos alterados, o laço continua sendo usado). image_map (URL da Bagy -> URL do
+    Shopify) troca as imagens já enviadas pelo 14 antes da conversão. Retorna a lista de arquivos gerados
+    """
+    
+    profiling.checkpoint("json_load")
+    try:
+        print("Carregando arquivo JSON...")
+        with open(json_file_path, 'r', encoding='utf-8') as f:
+            products = json.load(f)
+        print(f"JSON carregado com {len(products)} produtos")
+    except Exception as e:
+        print(f"Erro ao ler arquivo JSON: {e}")
+        return
+    
+    profiling.checkpoint("convert")
+    
+    # Filtra produtos válidos
+    valid_products = [p for p in products if p and p.get('name')]
+    
+    # Processa os produtos especificados ou todos se max_products for None
+    if max_products is None:
+        products_to_process = valid_products
+    else:
+        products_to_process = valid_products[:max_products]
+    
+    print(f"Processando {len(products_to_process)} produtos...")
+    
+    # Imagens já no Shopify Files: trocadas antes do hash, então mudanças no mapa reconvertem o produto
+    if image_map:
+        for product in products_to_process:
+            apply_image_map(product, image_map)
+        print(f"🖼️  {len(image_map)} imagens apontando para o CDN do Shopify")
+    
+    # Cria a pasta converted se não existir
+    converted_dir = "converted"
+    os.makedirs(converted_dir, exist_ok=True)
+    
+    # Caminho completo do arquivo CSV
+    csv_filepath = os.path.join(converted_dir, os.path.basename(csv_file_path))
+    delta_filepath = os.path.join(converted_dir, DELTA_CSV_FILE)
+    max_bytes = int(max_file_mb * 1024 * 1024) if max_file_mb else None
+    stats = {'processed': 0, 'errors': 0, 'reused': 0, 'changed': 0, 'removed': 0}
+    columnar = engine == "pandas" and not incremental
+    
+    # Cache de conversão: hash e linhas de cada produto da última execução incremental
+    conn = staging.connect() if incremental else None
+    if incremental:
+        version = converter_version()
+        stored = staging.get_converted_hashes(conn)
+        previous = stored if staging.get_meta(conn, 'converted_products_version') == version else {}
+        seen = set()
+    
+    try:
+        with RollingCSVWriter(csv_filepath, HEADERS, max_bytes) as writer, \
+                (RollingCSVWriter(delta_filepath, HEADERS, max_bytes) if incremental else nullcontext()) as delta, \
+                (conn or nullcontext()):
+            if columnar:
+                # Motor colunar: lotes de produtos convertidos por coluna e gravados com to_csv
+                for frame, owners in columnar_chunks(products_to_process, stats):
+                    writer.write_frame(frame, owners)
+            else:
+                for i, product in enumerate(products_to_process):
+                    if incremental:
+                        key = None if product.get('id') is None else str(product['id'])
+                        digest = product_hash(product)
+                        changed = key is None or previous.get(key) != digest
+                        cached = None if changed else staging.get_converted_block(conn, key)
+                
+                    if incremental and cached:
+                        data, row_count = cached
+                        stats['reused'] += 1
+                    else:
                         try:
-                            image_row = [''] * len(headers)
-                            image_row[headers.index('Handle')] = handle
-                            image_row[headers.index('Image Src')] = safe_get(image, 'src', '')
-                            image_row[headers.index('Image Position')] = str(safe_get(image, 'position', j))
-                            image_row[headers.index('Image Alt Text')] = safe_get(image, 'alt', '') or title
-                            csv_rows.append(image_row)
+                            rows = product_rows(product)
                         except Exception as e:
-                            print(f"Erro ao processar imagem {j} do produto '{title}': {e}")
+                            print(f"Erro ao processar produto {i+1} ('{product.get('name', 'SEM NOME')}'): {e}")
+                            stats['errors'] += 1
                             continue
-            except Exception as e:
-                print(f"Erro ao processar imagens do produto '{title}': {e}")
-            
-            processed_count += 1
-            if processed_count % 50 == 0:
-                print(f"Processados {processed_count} produtos...")
+                        data, row_count = writer.encode(rows), len(rows)
+                        if incremental and key is not None:
+                            staging.save_converted_block(conn, key, digest, data, row_count)
                 
-        except Exception as e:
-            print(f"Erro ao processar produto {i+1} ('{product.get('name', 'SEM NOME')}'): {e}")
-            error_count += 1
-            continue
-    
-    # Escreve o arquivo CSV
-    try:
-        print("Escrevendo arquivo CSV...")
-        
-        # Cria a pasta converted se não existir
-        converted_dir = "converted"
-        os.makedirs(converted_dir, exist_ok=True)
-        
-        # Caminho completo do arquivo CSV
-        csv_filepath = os.path.join(converted_dir, os.path.basename(csv_file_path))
-        
-        with open(csv_filepath, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(headers)
-            writer.writerows(csv_rows)
+                    writer.write_encoded(data, row_count)
+                    if incremental:
+                        if changed:
+                            delta.write_encoded(data, row_count)
+                            stats['changed'] += 1
+                        seen.add(key)
+                
+                    stats['processed'] += 1
+                    if stats['processed'] % 50 == 0:
+                        print(f"Processados {stats['processed']} produtos...")
+            
+            if incremental:
+                # Produtos que saíram do catálogo deixam o cache (só quando o catálogo inteiro foi lido)
+                if max_products is None:
+                    removed = set(stored) - seen
+                    staging.delete_converted_products(conn, removed)
+                    stats['removed'] = len(removed)
+                staging.set_meta(conn, 'converted_products_version', version)
         
         print(f"\n✅ Conversão concluída!")
-        print(f"📊 Produtos processados: {processed_count}")
-        print(f"❌ Erros encontrados: {error_count}")
-        print(f"📄 Linhas no CSV: {len(csv_rows) + 1}")  # +1 para o cabeçalho
-        print(f"💾 Arquivo CSV gerado: {csv_filepath}")
+        print(f"📊 Produtos processados: {stats['processed']}")
+        print(f"❌ Erros encontrados: {stats['errors']}")
+        print(f"📄 Linhas no CSV: {writer.rows + len(writer.files)}")  # + cabeçalho de cada arquivo
+        if len(writer.files) == 1:
+            print(f"💾 Arquivo CSV gerado: {csv_filepath}")
+        else:
+            print(f"💾 {len(writer.files)} arquivos CSV gerados (até {max_file_mb} MB cada, importe todos):")
+            for path in writer.files:
+                print(f"   - {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+        
+        if incremental:
+            print(f"♻️  Reaproveitados da última conversão: {stats['reused']}")
+            print(f"🆕 Novos ou alterados: {stats['changed']} → {', '.join(delta.files)}")
+            if stats['removed']:
+                print(f"🗑️  {stats['removed']} produtos saíram do catálogo desde a última conversão "
+                      f"(a importação por CSV não remove produtos: arquive-os no admin do Shopify)")
         
     except Exception as e:
         print(f"❌ Erro ao escrever arquivo CSV: {e}")
+        return
+    finally:
+        if conn:
+            conn.close()
+    
+    profiling.checkpoint(None)
+    return writer.files
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Converte os produtos da Bagy para o CSV de importação do Shopify")
+    parser.add_argument("--max-mb", type=float, default=MAX_CSV_MB,
+                        help=f"tamanho máximo de cada CSV em MB; 0 desativa a divisão (padrão: {MAX_CSV_MB})")
+    parser.add_argument("--engine", choices=ENGINES, default="loop",
+                        help="motor de conversão: laço por produto ou colunar com pandas (mesma saída)")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"reaproveita as linhas dos produtos sem alteração e gera converted/{DELTA_CSV_FILE}")
+    parser.add_argument("--original-images", action="store_true",
+                        help=f"mantém as URLs da Bagy mesmo com imagens já enviadas ao Shopify ({IMAGE_MAP_FILE})")
+    args = parser.parse_args()
+    
     # Busca o produtos.json da pasta imported e salva CSV na pasta converted
     json_path = os.path.join("imported", "produtos.json")
     csv_path = "produtos_shopify_completo.csv"  # Nome do arquivo, pasta será definida pela função
@@ -364,4 +807,9 @@ if __name__ == "__main__":
         print(f"❌ Arquivo não encontrado: {json_path}")
         print("Execute primeiro o script importProductsFromBagy.py para gerar o arquivo produtos.json")
     else:
-        convert_bagy_to_shopify_csv(json_path, csv_path)
+        image_map = {} if args.original_images else load_image_map()
+        convert_bagy_to_shopify_csv(json_path, csv_path, max_file_mb=args.max_mb, incremental=args.incremental,
+                                    engine=args.engine, image_map=image_map)
+
+if __name__ == "__main__":
+    profiling.run(main, __file__)
@@ -4,27 +4,30 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 import json
-from time import sleep
+import columnar
+import metrics
+import profiling
+import staging
 
 load_dotenv()
 
 SHOPIFY_SHOP_DOMAIN = os.getenv("SHOPIFY_SHOP_DOMAIN")
 SHOPIFY_ACCESS_TOKEN = os.getenv("SHOPIFY_ACCESS_TOKEN")
 SHOPIFY_API_VERSION = "2024-10"
+# SHOPIFY_BASE_URL permite apontar para o simulador local (api_simulator.py)
+SHOPIFY_BASE_URL = os.getenv("SHOPIFY_BASE_URL") or f"https://{SHOPIFY_SHOP_DOMAIN}"
 
-def read_excel_coupons(filename="imported/cupons_dooca.xlsx"):
-    if not os.path.exists(filename):
-        print(f"❌ Arquivo {filename} não encontrado!")
-        return []
-    
-    wb = openpyxl.load_workbook(filename)
-    ws = wb.active
-    
-    headers = [cell.value for cell in ws[1]]
+# Campos de lista que o 03 grava no Excel como texto separado por vírgula
+LIST_FIELDS = [
+    "prerequisite_category_ids", "prerequisite_product_ids", "entitled_category_ids",
+    "entitled_product_ids", "fixed_freight_options", "zipcodes"
+]
+
+def prepare_coupons(rows):
+    """Mantém apenas cupons ativos e gera código quando não houver"""
     coupons = []
     
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        coupon_data = dict(zip(headers, row))
+    for coupon_data in rows:
         if coupon_data.get('active'):
             # Se não há código, gerar um baseado no nome
             if not coupon_data.get('codes'):
@@ -37,9 +40,57 @@ def read_excel_coupons(filename="imported/cupons_dooca.xlsx"):
                 coupon_data['codes'] = code
             coupons.append(coupon_data)
     
+    return coupons
+
+def read_excel_coupons(filename="imported/cupons_dooca.xlsx"):
+    if not os.path.exists(filename):
+        print(f"❌ Arquivo {filename} não encontrado!")
+        return []
+    
+    wb = openpyxl.load_workbook(filename)
+    ws = wb.active
+    
+    headers = [cell.value for cell in ws[1]]
+    rows = (dict(zip(headers, row)) for row in ws.iter_rows(min_row=2, values_only=True))
+    coupons = prepare_coupons(rows)
+    
     print(f"📊 {len(coupons)} cupons ativos encontrados no arquivo Excel")
     return coupons
 
+def discount_row(discount):
+    """Cupom da API da Bagy no mesmo formato das linhas do Excel"""
+    row = dict(discount)
+    row['codes'] = discount.get('code')  # mapeado como "codes", igual ao Excel
+    for field in LIST_FIELDS:
+        row[field] = ", ".join(map(str, discount.get(field) or []))
+    return row
+
+def read_staging_coupons():
+    """Lê os cupons do staging no mesmo formato das linhas do Excel"""
+    conn = staging.connect()
+    rows = [discount_row(discount) for discount in staging.iter_discounts(conn)]
+    conn.close()
+    
+    coupons = prepare_coupons(rows)
+    print(f"📊 {len(coupons)} cupons ativos encontrados no staging")
+    return coupons
+
+def read_coupons():
+    """Lê os cupons do staging quando disponível, senão da cópia colunar ou do Excel do 03"""
+    if staging.exists():
+        conn = staging.connect()
+        has_discounts = staging.count_rows(conn, "discounts") > 0
+        conn.close()
+        if has_discounts:
+            return read_staging_coupons()
+    
+    discounts = columnar.load_dataset("cupons")
+    if discounts is not None:
+        coupons = prepare_coupons(discount_row(discount) for discount in discounts)
+        print(f"📊 {len(coupons)} cupons ativos encontrados em {columnar.dataset_path('cupons')}")
+        return coupons
+    return read_excel_coupons()
+
 def convert_bagy_to_shopify_format(bagy_coupon):
     shopify_discount = {
         "price_rule": {
@@ -80,7 +131,7 @@ def convert_bagy_to_shopify_format(bagy_coupon):
     return shopify_discount
 
 def create_price_rule(discount_data):
-    url = f"https://{SHOPIFY_SHOP_DOMAIN}/admin/api/{SHOPIFY_API_VERSION}/price_rules.json"
+    url = f"{SHOPIFY_BASE_URL}/admin/api/{SHOPIFY_API_VERSION}/price_rules.json"
     headers = {
         "X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN,
         "Content-Type": "application/json"
@@ -96,7 +147,7 @@ def create_price_rule(discount_data):
         return None
 
 def create_discount_code(price_rule_id, code):
-    url = f"https://{SHOPIFY_SHOP_DOMAIN}/admin/api/{SHOPIFY_API_VERSION}/price_rules/{price_rule_id}/discount_codes.json"
+    url = f"{SHOPIFY_BASE_URL}/admin/api/{SHOPIFY_API_VERSION}/price_rules/{price_rule_id}/discount_codes.json"
     headers = {
         "X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN,
         "Content-Type": "application/json"
@@ -118,7 +169,7 @@ def create_discount_code(price_rule_id, code):
         return None
 
 def import_coupons_to_shopify():
-    coupons = read_excel_coupons()
+    coupons = read_coupons()
     
     if not coupons:
         print("❌ Nenhum cupom para importar")
@@ -180,7 +231,7 @@ def import_coupons_to_shopify():
                 "error": str(e)
             })
         
-        sleep(0.5)
+        metrics.throttle_sleep(0.5, "shopify_pacing")
     
     save_import_results(results)
     
@@ -206,7 +257,7 @@ def save_import_results(results):
     print(f"\n📝 Resultados salvos em {filename}")
 
 def check_existing_discount_codes():
-    url = f"https://{SHOPIFY_SHOP_DOMAIN}/admin/api/{SHOPIFY_API_VERSION}/price_rules.json"
+    url = f"{SHOPIFY_BASE_URL}/admin/api/{SHOPIFY_API_VERSION}/price_rules.json"
     headers = {
         "X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN,
         "Content-Type": "application/json"
@@ -224,7 +275,7 @@ def check_existing_discount_codes():
 
 def test_import_single_coupon():
     """Importa apenas o primeiro cupom para teste"""
-    coupons = read_excel_coupons()
+    coupons = read_coupons()
     
     if not coupons:
         print("❌ Nenhum cupom para importar")
@@ -256,7 +307,7 @@ def test_import_single_coupon():
     except Exception as e:
         print(f"   ❌ Erro: {str(e)}")
 
-if __name__ == "__main__":
+def main():
     print("🛍️ IMPORTADOR DE CUPONS BAGY → SHOPIFY")
     print("="*50)
     
@@ -278,4 +329,8 @@ if __name__ == "__main__":
     elif choice == "3":
         test_import_single_coupon()
     else:
-        print("👋 Encerrando...")
\ No newline at end of file
+        print("👋 Encerrando...")
+
+if __name__ == "__main__":
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
@@ -8,16 +8,18 @@ Busca produtos da API Shopify e compara com produtos.json da Bagy
 gerando um relatório com ID Shopify, ID Bagy, URL Shopify e URL Bagy.
 """
 
-import json
 import requests
 import openpyxl
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 import os
-import time
 from difflib import SequenceMatcher
 from dotenv import load_dotenv
 import re
+import columnar
+import metrics
+import profiling
+import projection
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -43,10 +45,12 @@ def clean_string_for_comparison(text):
 
 def calculate_similarity(text1, text2):
     """Calcula a similaridade entre dois textos"""
-    clean1 = clean_string_for_comparison(text1)
-    clean2 = clean_string_for_comparison(text2)
+    with profiling.stage("normalize"):
+        clean1 = clean_string_for_comparison(text1)
+        clean2 = clean_string_for_comparison(text2)
     
-    return SequenceMatcher(None, clean1, clean2).ratio()
+    with profiling.stage("score"):
+        return SequenceMatcher(None, clean1, clean2).ratio()
 
 def get_shopify_products(shop_domain, access_token):
     """Busca todos os produtos da loja Shopify"""
@@ -55,8 +59,11 @@ def get_shopify_products(shop_domain, access_token):
     
     print("Buscando produtos da Shopify...")
     
+    # SHOPIFY_BASE_URL permite apontar para o simulador local (api_simulator.py)
+    base_url = os.getenv('SHOPIFY_BASE_URL') or f"https://{shop_domain}"
+    
     while True:
-        url = f"https://{shop_domain}/admin/api/2023-10/products.json"
+        url = f"{base_url}/admin/api/2023-10/products.json"
         
         params = {
             'limit': 250,  # Máximo permitido pela API
@@ -98,16 +105,17 @@ def get_shopify_products(shop_domain, access_token):
             break
             
         # Delay para evitar rate limiting
-        time.sleep(0.5)
+        metrics.throttle_sleep(0.5, "shopify_pagination")
     
     print(f"Total de produtos encontrados na Shopify: {len(products)}")
     return products
 
 def load_bagy_products(json_file_path):
-    """Carrega produtos do arquivo JSON da Bagy"""
+    """Carrega produtos do arquivo JSON da Bagy, mantendo só id, nome e URL (projection.PRODUCT_MATCH)"""
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
+        products = columnar.load_dataset("produtos", projection.PRODUCT_MATCH)
+        if products is None:
+            products = projection.load_json(json_file_path, projection.PRODUCT_MATCH)
         
         # Filtra produtos válidos
         valid_products = [p for p in products if p and p.get('name') and p.get('id')]
@@ -235,15 +243,17 @@ def main():
     
     # Carrega produtos
     print("=== COMPARAÇÃO DE PRODUTOS SHOPIFY x BAGY ===")
-    shopify_products = get_shopify_products(shop_domain, access_token)
-    bagy_products = load_bagy_products(bagy_json_path)
+    with profiling.stage("fetch"):
+        shopify_products = get_shopify_products(shop_domain, access_token)
+        bagy_products = load_bagy_products(bagy_json_path)
     
     if not shopify_products or not bagy_products:
         print("❌ Erro: Não foi possível carregar os produtos")
         return
     
     # Encontra correspondências
-    matches = find_matching_products(shopify_products, bagy_products)
+    with profiling.stage("match"):
+        matches = find_matching_products(shopify_products, bagy_products)
     
     if not matches:
         print("❌ Nenhuma correspondência encontrada")
@@ -255,7 +265,8 @@ def main():
     
     # Gera arquivo Excel
     output_path = os.path.join(output_dir, "correspondencias_shopify_bagy.xlsx")
-    create_excel_report(matches, output_path)
+    with profiling.stage("excel_report"):
+        create_excel_report(matches, output_path)
     
     print(f"\n✅ Comparação concluída!")
     print(f"📊 Produtos Shopify: {len(shopify_products)}")
@@ -264,4 +275,5 @@ def main():
     print(f"📄 Relatório salvo em: {output_path}")
 
 if __name__ == "__main__":
-    main()
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
@@ -1,21 +1,29 @@
-import requests
 import openpyxl
 import json
 import os
 import pandas as pd
-from time import sleep
 from dotenv import load_dotenv
+import columnar
+import http_cache
+import metrics
+import profiling
+import staging
 
 # Carrega as variáveis do arquivo .env
 load_dotenv()
 
-API_BASE_URL = "https://api.dooca.store"
+API_BASE_URL = os.getenv("BAGY_API_URL", "https://api.dooca.store")
 API_KEY = os.getenv("API_KEY")
 
 # Verifica se a API_KEY foi carregada
 if not API_KEY:
     raise ValueError("❌ API_KEY não encontrada no arquivo .env")
 
+# Tipos da cópia colunar (imported/cashback_saldos.parquet ou .pkl)
+BALANCE_SCHEMA = {
+    "customer_id": "Int64", "balance": "float64", "next_expiration": "string", "next_release": "string"
+}
+
 def get_cashback_balances():
     """Busca todos os saldos de cashback dos clientes"""
     headers = {"Authorization": f"Bearer {API_KEY}"}
@@ -35,7 +43,7 @@ def get_cashback_balances():
         
         print(f"➡️  Processando página {page}{'/' + str(total_pages) if total_pages else ''}...")
         
-        response = requests.get(url, headers=headers, params=params)
+        response = http_cache.get(url, headers=headers, params=params)
         
         if response.status_code != 200:
             print(f"❌ Erro na página {page}: {response.status_code}")
@@ -45,7 +53,8 @@ def get_cashback_balances():
             if response.status_code == 500 and "startsWith" in response.text:
                 print("🔄 Tentando sem parâmetros de ordenação...")
                 params_simple = {"page": page, "limit": 100}
-                response = requests.get(url, headers=headers, params=params_simple)
+                metrics.record_retry("GET", url)
+                response = http_cache.get(url, headers=headers, params=params_simple)
                 
                 if response.status_code != 200:
                     print(f"❌ Erro mesmo sem ordenação: {response.status_code}")
@@ -74,7 +83,7 @@ def get_cashback_balances():
             break
 
         page += 1
-        sleep(0.5)  # Pausa para evitar rate limiting
+        metrics.throttle_sleep(0.5, "bagy_pagination")  # Pausa para evitar rate limiting
 
     print(f"✅ Total de saldos coletados: {len(balances)}")
     return balances
@@ -212,6 +221,13 @@ def main():
         # Exporta para Excel e JSON
         export_balances_to_excel(balances)
         export_balances_to_json(balances)
+        columnar.save_dataset("cashback_saldos", balances, BALANCE_SCHEMA)
+
+        # Grava no staging para consulta indexada pelo 08
+        conn = staging.connect()
+        staging.replace_cashback_balances(conn, balances)
+        conn.close()
+        print(f"✅ Saldos gravados no staging: {staging.STAGING_DB}")
         
         # Gera relatório resumido apenas dos saldos
         print("\n📊 Gerando relatório...")
@@ -241,5 +257,7 @@ if __name__ == "__main__":
         print("  - imported/cashback_saldos.xlsx")
         print("  - imported/cashback_saldos.json")
         print("  - imported/cashback_saldos_summary.txt")
+        print("  - imported/staging.db (tabela cashback_balances)")
     else:
-        main()
+        metrics.instrument(__file__)
+        profiling.run(main, __file__)
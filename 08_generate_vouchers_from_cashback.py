@@ -5,15 +5,22 @@ import uuid
 import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
+import columnar
+import http_cache
+import metrics
+import profiling
+import staging
 
 # Carrega as variáveis do arquivo .env
 load_dotenv()
 
 # Configurações das APIs
-API_BASE_URL = "https://api.dooca.store"
+API_BASE_URL = os.getenv("BAGY_API_URL", "https://api.dooca.store")
 API_KEY = os.getenv("API_KEY")
 SHOPIFY_SHOP_DOMAIN = os.getenv("SHOPIFY_SHOP_DOMAIN")
 SHOPIFY_ACCESS_TOKEN = os.getenv("SHOPIFY_ACCESS_TOKEN")
+# BAGY_API_URL e SHOPIFY_BASE_URL permitem apontar para o simulador local (api_simulator.py)
+SHOPIFY_BASE_URL = os.getenv("SHOPIFY_BASE_URL") or f"https://{SHOPIFY_SHOP_DOMAIN}"
 
 # Verifica se as variáveis foram carregadas
 if not API_KEY:
@@ -26,8 +33,38 @@ if not SHOPIFY_SHOP_DOMAIN or not SHOPIFY_ACCESS_TOKEN:
 else:
     SHOPIFY_ENABLED = True
 
+# Dados de cliente mudam pouco: com HTTP_CACHE ativo, reaproveita por 24h se a API não enviar ETag
+CUSTOMER_CACHE_TTL = 24 * 3600
+
+# Índice email -> cliente Shopify gravado pelo 16 (carregado na primeira consulta)
+CUSTOMERS_INDEX_FILE = os.path.join("imported", "customers_import_state.json")
+_customers_index = None
+
+# Conexão com o staging, aberta na primeira consulta
+_staging_conn = None
+# Clientes da cópia colunar do 02 por id (sem staging), carregados na primeira consulta
+_columnar_customers = None
+
+def get_staging_connection():
+    """Retorna a conexão com o staging ou None se o banco ainda não existir"""
+    global _staging_conn
+    if _staging_conn is None and staging.exists():
+        _staging_conn = staging.connect()
+    return _staging_conn
+
 def load_cashback_balances():
-    """Carrega os saldos de cashback do arquivo JSON"""
+    """Carrega os saldos de cashback do staging ou do arquivo JSON"""
+    conn = get_staging_connection()
+    if conn is not None and staging.count_rows(conn, "cashback_balances"):
+        data = list(staging.iter_cashback_balances(conn))
+        print(f"📂 Staging carregado com {len(data)} registros")
+        return data
+    
+    data = columnar.load_dataset("cashback_saldos")
+    if data is not None:
+        print(f"📂 {columnar.dataset_path('cashback_saldos')} carregado com {len(data)} registros")
+        return data
+    
     try:
         with open("imported/cashback_saldos.json", "r", encoding="utf-8") as f:
             data = json.load(f)
@@ -59,13 +96,31 @@ def filter_positive_balances(balances, limit=10):
     print(f"🔍 Encontrados {len(positive_balances)} saldos positivos (limitado a {limit})")
     return positive_balances
 
+def get_columnar_customers():
+    """Clientes da cópia colunar do 02 indexados por id (vazio se não existir)"""
+    global _columnar_customers
+    if _columnar_customers is None:
+        customers = columnar.load_dataset("clientes") or []
+        _columnar_customers = {str(customer.get("id")): customer for customer in customers}
+    return _columnar_customers
+
 def get_customer_email(customer_id):
-    """Busca o email do cliente via API da Bagy"""
+    """Busca o email do cliente no staging ou, se não houver, via API da Bagy"""
+    conn = get_staging_connection()
+    if conn is not None:
+        customer_data = staging.get_customer(conn, customer_id)
+        if customer_data and customer_data.get("email"):
+            return customer_data["email"], customer_data.get("name", "Nome não disponível")
+    else:
+        customer_data = get_columnar_customers().get(str(customer_id))
+        if customer_data and customer_data.get("email"):
+            return customer_data["email"], customer_data.get("name", "Nome não disponível")
+    
     headers = {"Authorization": f"Bearer {API_KEY}"}
     url = f"{API_BASE_URL}/customers/{customer_id}"
     
     try:
-        response = requests.get(url, headers=headers)
+        response = http_cache.get(url, headers=headers, ttl=CUSTOMER_CACHE_TTL)
         
         if response.status_code == 200:
             customer_data = response.json()
@@ -112,18 +167,35 @@ def parse_expiration_date(expiration_str):
         future_date = datetime.now() + timedelta(days=365)
         return future_date.strftime("%Y-%m-%dT23:59:59Z")
 
+def get_customers_index():
+    """Índice email -> GID do cliente no Shopify criado pelo 16 (vazio se não existir)"""
+    global _customers_index
+    if _customers_index is None:
+        _customers_index = {}
+        if os.path.exists(CUSTOMERS_INDEX_FILE):
+            with open(CUSTOMERS_INDEX_FILE, "r", encoding="utf-8") as f:
+                _customers_index = json.load(f).get("customers", {})
+    return _customers_index
+
 def find_shopify_customer_by_email(email):
     """Busca um cliente no Shopify pelo email"""
     if not SHOPIFY_ENABLED:
         return None
     
+    # Clientes importados pelo 16 já têm o ID no índice: sem chamada à API
+    customer_gid = get_customers_index().get((email or "").strip().lower())
+    if customer_gid:
+        customer_id = int(customer_gid.rsplit("/", 1)[-1])
+        print(f"   👤 Cliente encontrado no índice do 16: ID {customer_id}")
+        return customer_id
+    
     headers = {
         "X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN,
         "Content-Type": "application/json"
     }
     
     # Busca cliente pelo email
-    url = f"https://{SHOPIFY_SHOP_DOMAIN}/admin/api/2024-07/customers/search.json"
+    url = f"{SHOPIFY_BASE_URL}/admin/api/2024-07/customers/search.json"
     params = {
         "query": f"email:{email}",
         "limit": 1
@@ -159,7 +231,7 @@ def create_shopify_price_rule(voucher_info):
         "Content-Type": "application/json"
     }
     
-    url = f"https://{SHOPIFY_SHOP_DOMAIN}/admin/api/2024-07/price_rules.json"
+    url = f"{SHOPIFY_BASE_URL}/admin/api/2024-07/price_rules.json"
     
     # Converte valor para o formato correto do Shopify
     # Para Real (BRL): Shopify espera o valor em centavos como string
@@ -239,7 +311,7 @@ def create_shopify_discount_code(price_rule_id, voucher_code):
         "Content-Type": "application/json"
     }
     
-    url = f"https://{SHOPIFY_SHOP_DOMAIN}/admin/api/2024-07/price_rules/{price_rule_id}/discount_codes.json"
+    url = f"{SHOPIFY_BASE_URL}/admin/api/2024-07/price_rules/{price_rule_id}/discount_codes.json"
     
     discount_code_data = {
         "discount_code": {
@@ -370,8 +442,7 @@ def process_cashback_vouchers(balances):
             print(f"   ❌ Falha ao processar voucher")
         
         # Pequena pausa para não sobrecarregar as APIs
-        import time
-        time.sleep(0.5)
+        metrics.throttle_sleep(0.5, "shopify_pacing")
     
     return vouchers_created, total_value
 
@@ -585,4 +656,5 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    main()
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
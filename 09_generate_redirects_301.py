@@ -1,30 +1,117 @@
-import json
+import numpy as np
 import pandas as pd
 import os
-from urllib.parse import urlparse
+import csv
+import re
+import sys
+import unicodedata
+from glob import glob
+from urllib.parse import urlparse, quote
+import columnar
+import profiling
+import projection
+import sitemap
+import staging
+
+# O Shopify divide exportações grandes em products_export_1.csv, _2, _3...
+SHOPIFY_EXPORT_PATTERN = "imported/products_export_*.csv"
+# Só estas colunas são usadas; as outras ~50 da exportação não são lidas
+SHOPIFY_EXPORT_COLUMNS = ["Handle", "Variant SKU"]
+CSV_CHUNK_SIZE = 100_000
+# Domínio da loja na Bagy (as URLs com este prefixo viram só o path no redirect)
+STORE_BASE_URL = "https://www.asmanhas.com.br"
+REDIRECT_COLUMNS = ["redirect_from", "redirect_to", "sku", "product_name", "source"]
+SITEMAP_UNMATCHED_FILE = os.path.join("converted", "sitemap_unmatched.csv")
+# Palavras no nome do sitemap filho que indicam o tipo das URLs (só para o relatório das não encontradas)
+SITEMAP_HINTS = {"product": ("product", "produto"), "category": ("categor",), "brand": ("brand", "marca")}
 
 def load_bagy_products():
-    """Carrega os produtos da Bagy do arquivo JSON"""
+    """Carrega os produtos da Bagy da cópia colunar do 01 ou, sem ela, do arquivo JSON.
+    Só os campos usados nos redirects são mantidos (projection.PRODUCT_LINKS)"""
+    products = columnar.load_dataset("produtos", projection.PRODUCT_LINKS)
+    if products is not None:
+        print(f"✅ Carregados {len(products)} produtos da Bagy de {columnar.dataset_path('produtos')}")
+        return products
     try:
-        with open("imported/produtos.json", "r", encoding="utf-8") as f:
-            products = json.load(f)
+        products = projection.load_json("imported/produtos.json", projection.PRODUCT_LINKS)
         print(f"✅ Carregados {len(products)} produtos da Bagy")
         return products
     except FileNotFoundError:
         print("❌ Arquivo produtos.json não encontrado na pasta imported/")
         return []
 
+def shopify_export_files(pattern=SHOPIFY_EXPORT_PATTERN):
+    """Arquivos da exportação do Shopify na ordem numérica (_2 antes de _10)"""
+    def file_number(path):
+        match = re.search(r"_(\d+)\.csv$", path)
+        return int(match.group(1)) if match else 0
+    return sorted(glob(pattern), key=file_number)
+
+def read_shopify_export(path):
+    """Lê Handle e Variant SKU de um CSV em blocos, descartando as linhas sem SKU (imagens)"""
+    chunks = []
+    reader = pd.read_csv(
+        path, usecols=SHOPIFY_EXPORT_COLUMNS, dtype=str,
+        keep_default_na=False, na_values=[""], chunksize=CSV_CHUNK_SIZE
+    )
+    for chunk in reader:
+        chunks.append(chunk[chunk["Variant SKU"].notna()])
+    return chunks
+
 def load_shopify_products():
-    """Carrega os produtos do Shopify do arquivo CSV exportado"""
-    try:
-        df = pd.read_csv("imported/products_export_1.csv")
-        print(f"✅ Carregados {len(df)} produtos do Shopify")
-        return df
-    except FileNotFoundError:
-        print("❌ Arquivo products_export_1.csv não encontrado na pasta imported/")
-        return pd.DataFrame()
+    """Carrega Handle e Variant SKU de todos os CSVs exportados do Shopify"""
+    files = shopify_export_files()
+    if not files:
+        print("❌ Nenhum arquivo products_export_*.csv encontrado na pasta imported/")
+        return pd.DataFrame(columns=SHOPIFY_EXPORT_COLUMNS)
+    
+    chunks = []
+    for path in files:
+        file_chunks = read_shopify_export(path)
+        print(f"✅ {os.path.basename(path)}: {sum(len(c) for c in file_chunks)} variantes com SKU")
+        chunks.extend(file_chunks)
+    
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=SHOPIFY_EXPORT_COLUMNS)
+    print(f"✅ Carregadas {len(df)} variantes do Shopify de {len(files)} arquivo(s)")
+    return df
 
-def extract_path_from_url(url, base_url="https://www.asmanhas.com.br"):
+def load_staged_bagy_products(conn):
+    """Usa os produtos do staging (lidos sob demanda) ou, se vazio, o produtos.json"""
+    if staging.count_rows(conn, "products"):
+        products = staging.ProductsView(conn)
+        print(f"✅ Usando {len(products)} produtos da Bagy do staging")
+        return products
+    return load_bagy_products()
+
+def shopify_export_signature(files=None):
+    """Identifica a versão da exportação (caminho, data de modificação e tamanho de cada CSV)"""
+    signatures = []
+    for path in files if files is not None else shopify_export_files():
+        stat = os.stat(path)
+        signatures.append(f"{path}:{stat.st_mtime_ns}:{stat.st_size}")
+    return "|".join(signatures)
+
+def load_sku_to_handle(conn):
+    """Mapeamento SKU -> Handle do staging se os CSVs não mudaram; senão lê os CSVs e atualiza o staging"""
+    if (shopify_export_files()
+            and staging.get_meta(conn, "shopify_skus_source") == shopify_export_signature()
+            and staging.count_rows(conn, "shopify_skus")):
+        sku_to_handle = staging.SkuHandleIndex(conn)
+        print(f"♻️  CSV do Shopify inalterado, usando {len(sku_to_handle)} SKUs do staging")
+        return sku_to_handle
+    
+    with profiling.stage("shopify_csv_load"):
+        shopify_df = load_shopify_products()
+    if shopify_df.empty:
+        print("❌ Nenhum produto do Shopify encontrado")
+        return {}
+    
+    with profiling.stage("sku_mapping"):
+        sku_to_handle = create_sku_to_handle_mapping(shopify_df)
+    staging.replace_shopify_skus(conn, sku_to_handle.items(), shopify_export_signature())
+    return sku_to_handle
+
+def extract_path_from_url(url, base_url=STORE_BASE_URL):
     """Extrai o path da URL da Bagy para usar no redirect"""
     if url.startswith(base_url):
         return url.replace(base_url, "")
@@ -49,12 +136,13 @@ def create_sku_to_handle_mapping(shopify_df):
         (shopify_df['Handle'] != '')
     ]
     
-    for _, row in valid_rows.iterrows():
-        sku = str(row['Variant SKU']).strip()
-        handle = str(row['Handle']).strip()
-        
-        if sku and handle:
-            mapping[sku] = handle
+    # Limpeza vetorizada na coluna inteira (iterrows criava uma Series por linha)
+    skus = valid_rows['Variant SKU'].astype(str).str.strip()
+    handles = valid_rows['Handle'].astype(str).str.strip()
+    filled = (skus != '') & (handles != '')
+    
+    # dict(zip()) mantém a regra anterior: em SKU repetido, o último handle vence
+    mapping = dict(zip(skus[filled], handles[filled]))
     
     print(f"🔗 Criado mapeamento SKU -> Handle para {len(mapping)} SKUs")
     return mapping
@@ -127,9 +215,253 @@ def process_bagy_products(bagy_products, sku_to_handle):
     
     return redirects
 
+def flatten_bagy_products(bagy_products):
+    """Tabelas de produtos (uma linha por produto com URL) e de variações (uma linha por variação;
+    produtos sem variações viram uma linha com sku/reference)"""
+    product_ids, product_urls, names, simple = [], [], [], []
+    variation_products, skus, variation_urls = [], [], []
+    for index, product in enumerate(bagy_products):
+        product_url = product.get("url", "")
+        if not product_url:
+            continue
+        variations = product.get("variations", [])
+        product_ids.append(index)
+        product_urls.append(product_url)
+        names.append(product.get("name", ""))
+        simple.append(not variations)
+        if variations:
+            variation_products.extend([index] * len(variations))
+            skus.extend([v.get("sku", "") for v in variations])
+            variation_urls.extend([v.get("url", "") for v in variations])
+        else:
+            variation_products.append(index)
+            skus.append(product.get("sku") or product.get("reference"))
+            variation_urls.append("")
+
+    # Tipos fixos: sem nenhum produto com URL as listas vazias virariam float64/object e a junção falharia
+    products = pd.DataFrame({"product_url": product_urls, "product_name": names, "simple": simple},
+                            index=pd.Index(product_ids, dtype="int64", name="product")).astype({"simple": bool})
+    variations = pd.DataFrame({"product": pd.Series(variation_products, dtype="int64"),
+                               "sku": pd.Series(skus, dtype=object),
+                               "variation_url": pd.Series(variation_urls, dtype=object)})
+    return products, variations
+
+def load_staged_link_tables(conn):
+    """As mesmas tabelas de flatten_bagy_products, lidas das colunas do staging sem decodificar cada produto"""
+    # dtype=object: um reference numérico com os demais SKUs nulos viraria float64 (1 -> "1.0" na busca)
+    links = pd.DataFrame(staging.iter_product_links(conn).fetchall(), dtype=object,
+                         columns=["product", "product_url", "product_name", "simple", "sku"])
+    links = links[links["product_url"].map(bool).astype(bool)].astype({"product": "int64", "simple": bool})
+    products = links.set_index("product")[["product_url", "product_name", "simple"]]
+
+    variations = pd.DataFrame(staging.iter_variation_links(conn).fetchall(), dtype=object,
+                              columns=["product", "sku", "variation_url"]).astype({"product": "int64"})
+    variations = variations[variations["product"].isin(products.index)]
+    simple = links.loc[links["simple"], ["product", "sku"]].assign(
+        variation_url=pd.Series("", index=links.index[links["simple"]], dtype=object))
+    # Só junta as partes não vazias (concat com uma tabela vazia gera FutureWarning e muda os tipos)
+    parts = [part for part in (variations, simple) if len(part)] or [variations]
+    variations = pd.concat(parts).sort_values("product", kind="stable").reset_index(drop=True)
+    return products, variations
+
+def resolve_shared_urls(rows):
+    """Regras de process_bagy_products, em sequência, para produtos cujas URLs se repetem"""
+    emitted = []
+    processed_urls = set()
+    current, done = None, False
+    for row in rows.itertuples():
+        if row.product != current:
+            current, done = row.product, False
+        if done:
+            continue
+        if row.simple:
+            if row.product_url not in processed_urls:
+                emitted.append((row.Index, "product_direct"))
+                processed_urls.add(row.product_url)
+        elif row.has_variation_url and row.variation_url not in processed_urls:
+            emitted.append((row.Index, "variation_url"))
+            processed_urls.add(row.variation_url)
+        elif row.product_url not in processed_urls:
+            emitted.append((row.Index, "product_url"))
+            processed_urls.add(row.product_url)
+            done = True  # Só adiciona a URL principal uma vez por produto
+    return emitted
+
+def load_link_rows(bagy_products, sku_to_handle):
+    """Variações (ou produtos simples) com handle no Shopify, na ordem de exportação, com os dados do produto"""
+    staged = isinstance(sku_to_handle, staging.SkuHandleIndex)
+    if staged and isinstance(bagy_products, staging.ProductsView):
+        products, variations = load_staged_link_tables(bagy_products.conn)
+    else:
+        products, variations = flatten_bagy_products(bagy_products)
+    handles = pd.DataFrame(list(sku_to_handle.items()), columns=["key", "handle"], dtype=object)
+    variations["key"] = variations["sku"].astype(object)
+    if staged:
+        # O staging guarda e compara SKUs como texto
+        variations["key"] = variations["key"].map(sku_to_handle.key)
+
+    # Junção por SKU (mantém a ordem das variações): só ficam as que têm produto no Shopify
+    variations = variations[variations["sku"].map(bool).astype(bool)]
+    rows = variations.merge(handles, on="key", how="inner", sort=False)
+    return rows.join(products, on="product")
+
+def process_bagy_products_join(bagy_products, sku_to_handle):
+    """Mesmas regras de process_bagy_products com uma junção por SKU; devolve um DataFrame"""
+    rows = load_link_rows(bagy_products, sku_to_handle)
+    if rows.empty:
+        return pd.DataFrame(columns=REDIRECT_COLUMNS)
+    simple = rows["simple"].to_numpy(dtype=bool)
+    has_variation_url = rows["variation_url"].map(bool).to_numpy(dtype=bool) & ~simple
+
+    # Produtos sem URLs repetidas: variações com URL até a primeira sem URL, que vira a URL do produto
+    missing_url = ~has_variation_url & ~simple
+    missing_before = pd.Series(missing_url).groupby(rows["product"]).cumsum().to_numpy()
+    source = np.full(len(rows), None, dtype=object)
+    source[has_variation_url & (missing_before == 0)] = "variation_url"
+    source[missing_url & (missing_before == 1)] = "product_url"
+    source[simple] = "product_direct"
+
+    # URLs que aparecem em mais de um lugar (variação repetida, variação igual à URL do produto,
+    # produtos com a mesma URL) dependem da ordem de processamento: esses produtos seguem as regras em sequência
+    candidates = pd.concat([
+        rows.loc[has_variation_url, ["product", "variation_url"]].set_axis(["product", "url"], axis=1),
+        rows[["product", "product_url"]].drop_duplicates("product").set_axis(["product", "url"], axis=1)
+    ])
+    shared_products = candidates.loc[candidates["url"].duplicated(keep=False), "product"].unique()
+    if len(shared_products):
+        is_shared = rows["product"].isin(shared_products).to_numpy()
+        source[is_shared] = None
+        shared_rows = rows[is_shared].assign(has_variation_url=has_variation_url[is_shared])
+        for index, rule in resolve_shared_urls(shared_rows):
+            source[index] = rule
+
+    emitted = pd.notna(source)
+    rows = rows[emitted]
+    source = source[emitted]
+
+    # Path de origem: URL da variação ou do produto, conforme a regra que gerou o redirect
+    from_url = np.where(source == "variation_url", rows["variation_url"], rows["product_url"])
+    return pd.DataFrame({
+        "redirect_from": [extract_path_from_url(url) for url in from_url],
+        "redirect_to": ("/products/" + rows["handle"].astype(str)).to_numpy(),
+        "sku": rows["sku"].to_numpy(),
+        "product_name": rows["product_name"].to_numpy(),
+        "source": source
+    })
+
+def slugify(text):
+    """Slug no formato das URLs da loja (sem acentos, minúsculas, hífens)"""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+def normalize_path(path):
+    """Path sem barra final (a raiz continua "/"), mantendo a query"""
+    path, _, query = path.partition("?")
+    path = path.rstrip("/") or "/"
+    return f"{path}?{query}" if query else path
+
+def build_path_index(bagy_products, sku_to_handle):
+    """Índice path -> (sku, handle, nome) das URLs de produto e de variação com SKU no Shopify.
+    URLs de variação também entram sem a query; o path do produto fica com o primeiro SKU encontrado"""
+    rows = load_link_rows(bagy_products, sku_to_handle)
+    index = {}
+    for product_url, variation_url, sku, handle, name in zip(
+            rows["product_url"], rows["variation_url"], rows["sku"], rows["handle"], rows["product_name"]):
+        for url in (variation_url, product_url):
+            if url:
+                path = normalize_path(extract_path_from_url(url))
+                index.setdefault(path, (sku, handle, name))
+                index.setdefault(path.partition("?")[0], (sku, handle, name))
+    return index
+
+def build_taxonomy_index(bagy_products):
+    """Índice slug -> destino das categorias e marcas. O 04 grava a categoria no Type e a marca no Vendor,
+    então os destinos são as coleções automáticas do Shopify (/collections/types e /collections/vendors)"""
+    if isinstance(bagy_products, staging.ProductsView):
+        pairs = staging.iter_product_taxonomy(bagy_products.conn)
+    else:
+        pairs = (
+            ((p.get("category_default") or {}).get("name"), (p.get("category_default") or {}).get("slug"),
+             (p.get("brand") or {}).get("name"), (p.get("brand") or {}).get("slug"))
+            for p in bagy_products
+        )
+    categories, brands = {}, {}
+    for category, category_slug, brand, brand_slug in pairs:
+        if category:
+            categories.setdefault(category_slug or slugify(category), category)
+        if brand:
+            brands.setdefault(brand_slug or slugify(brand), brand)
+
+    # Em slug repetido a categoria vence
+    index = {slug: ("brand", f"/collections/vendors?q={quote(name)}", name) for slug, name in brands.items()}
+    index.update({slug: ("category", f"/collections/types?q={quote(name)}", name) for slug, name in categories.items()})
+    return index
+
+def classify_sitemap_url(url, path_index, taxonomy):
+    """Classifica uma URL do sitemap. Retorna (tipo, path, destino, sku, nome); destino None se não houver"""
+    path = normalize_path(extract_path_from_url(url))
+    if path == "/":
+        return "home", path, None, None, None
+    product = path_index.get(path) or path_index.get(path.partition("?")[0])
+    if product:
+        sku, handle, name = product
+        return "product", path, f"/products/{handle}", sku, name
+    taxonomy_match = taxonomy.get(slugify(path.partition("?")[0].rsplit("/", 1)[-1]))
+    if taxonomy_match:
+        kind, target, name = taxonomy_match
+        return kind, path, target, None, name
+    return "unmatched", path, None, None, None
+
+def sitemap_hint(sitemap_location):
+    """Tipo sugerido pelo nome do sitemap filho (sitemap-products.xml -> product)"""
+    name = os.path.basename(urlparse(sitemap_location).path).lower()
+    return next((kind for kind, words in SITEMAP_HINTS.items() if any(word in name for word in words)), "")
+
+def discover_sitemap_redirects(location, bagy_products, sku_to_handle, redirects):
+    """Lê o sitemap da loja antiga em fluxo e cria redirects para as URLs ainda sem redirect.
+    As URLs que não casam com nenhum produto, categoria ou marca vão para converted/sitemap_unmatched.csv"""
+    path_index = build_path_index(bagy_products, sku_to_handle)
+    taxonomy = build_taxonomy_index(bagy_products)
+    print(f"🔎 Índice: {len(path_index)} paths de produto, {len(taxonomy)} categorias/marcas")
+
+    known_paths = {normalize_path(path) for path in pd.DataFrame(redirects, columns=REDIRECT_COLUMNS)["redirect_from"]}
+    discovered = []
+    counts = {}
+    os.makedirs("converted", exist_ok=True)
+    with open(SITEMAP_UNMATCHED_FILE, "w", encoding="utf-8", newline="") as f:
+        unmatched = csv.writer(f)
+        unmatched.writerow(["url", "path", "sitemap", "hint"])
+        for url, _, source_sitemap in sitemap.iter_urls(location):
+            kind, path, target, sku, name = classify_sitemap_url(url, path_index, taxonomy)
+            counts[kind] = counts.get(kind, 0) + 1
+            if kind == "unmatched":
+                unmatched.writerow([url, path, source_sitemap, sitemap_hint(source_sitemap)])
+            elif target and path not in known_paths:
+                known_paths.add(path)
+                discovered.append({"redirect_from": path, "redirect_to": target, "sku": sku,
+                                   "product_name": name, "source": f"sitemap_{kind}"})
+
+    labels = {"product": "produtos", "category": "categorias", "brand": "marcas",
+              "home": "página inicial", "unmatched": "sem correspondência"}
+    print(f"🗺️  {sum(counts.values())} URLs no sitemap: " +
+          ", ".join(f"{count} {labels[kind]}" for kind, count in counts.items()))
+    print(f"➕ {len(discovered)} redirects novos a partir do sitemap")
+    if counts.get("unmatched"):
+        print(f"📄 URLs sem correspondência: {SITEMAP_UNMATCHED_FILE}")
+    return discovered
+
+def sitemap_argument():
+    """Sitemap pedido na linha de comando: --sitemap (o da loja) ou --sitemap=URL/arquivo"""
+    for arg in sys.argv[1:]:
+        if arg == "--sitemap":
+            return f"{STORE_BASE_URL}/sitemap.xml"
+        if arg.startswith("--sitemap="):
+            return arg.split("=", 1)[1]
+    return None
+
 def save_redirects_csv(redirects, filename="redirects_301.csv"):
     """Salva os redirects no formato CSV para importação"""
-    if not redirects:
+    if len(redirects) == 0:
         print("❌ Nenhum redirect encontrado para salvar")
         return
     
@@ -173,8 +505,7 @@ def generate_summary_report(redirects, sku_to_handle, bagy_products):
     
     # Conta por tipo de fonte
     sources_count = {}
-    for redirect in redirects:
-        source = redirect.get("source", "unknown")
+    for source in pd.DataFrame(redirects)["source"].fillna("unknown"):
         sources_count[source] = sources_count.get(source, 0) + 1
     
     # Cria o relatório
@@ -193,7 +524,10 @@ def generate_summary_report(redirects, sku_to_handle, bagy_products):
         source_name = {
             "variation_url": "URLs de variações",
             "product_url": "URLs principais de produto",
-            "product_direct": "Produtos sem variações"
+            "product_direct": "Produtos sem variações",
+            "sitemap_product": "Sitemap: produtos",
+            "sitemap_category": "Sitemap: categorias",
+            "sitemap_brand": "Sitemap: marcas"
         }.get(source, source)
         report_lines.append(f"   - {source_name}: {count}")
     
@@ -205,7 +539,7 @@ def generate_summary_report(redirects, sku_to_handle, bagy_products):
         "",
         "🎯 Próximos passos:",
         "   1. Revisar o arquivo redirects_301.csv",
-        "   2. Fazer upload no admin do Shopify",
+        "   2. Enviar ao Shopify: python 11_upload_redirects_to_shopify.py (ou upload do CSV no admin)",
         "   3. Verificar se os redirects foram criados corretamente"
     ])
     
@@ -223,22 +557,18 @@ def main():
     print("🔗 GERADOR DE REDIRECTS 301 BAGY → SHOPIFY")
     print("=" * 50)
     
-    # Carrega os dados
+    # Carrega os dados (staging quando disponível, senão os arquivos exportados)
     print("\n📥 Carregando dados...")
-    bagy_products = load_bagy_products()
-    shopify_df = load_shopify_products()
+    conn = staging.connect()
+    bagy_products = load_staged_bagy_products(conn)
     
     if not bagy_products:
         print("❌ Nenhum produto da Bagy encontrado")
         return
     
-    if shopify_df.empty:
-        print("❌ Nenhum produto do Shopify encontrado")
-        return
-    
     # Cria mapeamento SKU -> Handle
     print("\n🗺️  Criando mapeamento SKU -> Handle...")
-    sku_to_handle = create_sku_to_handle_mapping(shopify_df)
+    sku_to_handle = load_sku_to_handle(conn)
     
     if not sku_to_handle:
         print("❌ Nenhum mapeamento SKU -> Handle criado")
@@ -246,15 +576,35 @@ def main():
     
     # Processa produtos da Bagy
     print("\n🔄 Processando produtos da Bagy...")
-    redirects = process_bagy_products(bagy_products, sku_to_handle)
+    # Com produtos e SKUs no staging a junção por SKU lê só as colunas das tabelas; com os dados
+    # em memória o laço por produto é mais rápido. --join-engine/--loop-engine forçam um dos dois
+    staged = isinstance(bagy_products, staging.ProductsView) and isinstance(sku_to_handle, staging.SkuHandleIndex)
+    use_join = "--join-engine" in sys.argv or (staged and "--loop-engine" not in sys.argv)
+    engine = process_bagy_products_join if use_join else process_bagy_products
+    print(f"⚙️  Motor: {'junção por SKU' if use_join else 'laço por produto'}")
+    with profiling.stage("redirect_build"):
+        redirects = engine(bagy_products, sku_to_handle)
+    
+    # URLs do sitemap da loja antiga (categorias, marcas e páginas de produto fora dos registros)
+    sitemap_location = sitemap_argument()
+    if sitemap_location:
+        print(f"\n🗺️  Lendo o sitemap {sitemap_location}...")
+        with profiling.stage("sitemap"):
+            discovered = discover_sitemap_redirects(sitemap_location, bagy_products, sku_to_handle, redirects)
+        if discovered:
+            if isinstance(redirects, pd.DataFrame):
+                redirects = pd.concat([redirects, pd.DataFrame(discovered, columns=REDIRECT_COLUMNS)], ignore_index=True)
+            else:
+                redirects = redirects + discovered
     
-    if not redirects:
+    if len(redirects) == 0:
         print("❌ Nenhum redirect foi criado. Verifique se os SKUs coincidem entre Bagy e Shopify")
         return
     
     # Salva os redirects
     print("\n💾 Salvando redirects...")
-    csv_file = save_redirects_csv(redirects)
+    with profiling.stage("csv_write"):
+        csv_file = save_redirects_csv(redirects)
     
     # Gera relatório resumido
     print("\n📊 Gerando relatório...")
@@ -263,4 +613,4 @@ def main():
     print(f"\n🎉 Processo concluído! Arquivo pronto: {csv_file}")
 
 if __name__ == "__main__":
-    main()
+    profiling.run(main, __file__)
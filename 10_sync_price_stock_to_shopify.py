@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sincronização contínua de preço e estoque da Bagy para o Shopify.
+
+Usado no período de operação paralela, depois da importação dos produtos:
+1. Busca na Bagy os produtos alterados desde a última sincronização
+   (paginação ordenada por -updated_at, como na exportação incremental),
+   pedindo só os campos de preço e estoque (projection.PRODUCT_STOCK)
+2. Calcula um hash de conteúdo de preço e de estoque de cada variação e
+   compara com o último estado sincronizado (imported/sync_state.json)
+3. Resolve os SKUs alterados para IDs do Shopify (índice em cache no estado);
+   alterações de SKUs ainda sem correspondência ficam pendentes no estado e
+   são tentadas de novo nos próximos ciclos
+4. Envia apenas as variações alteradas, em lotes e com concorrência limitada:
+   - preço: productVariantsBulkUpdate (um lote por produto)
+   - estoque: inventorySetQuantities (até 250 itens por chamada)
+
+BAGY_API_URL e SHOPIFY_BASE_URL permitem rodar contra servidores locais (stub).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+import requests
+from dotenv import load_dotenv
+import metrics
+import profiling
+import projection
+from snapshot import changed_since, latest_updated_at, INCREMENTAL_SORT
+from shopify_client import ShopifyClient, ShopifyError, resolve_location_id
+
+# Carrega as variáveis do arquivo .env
+load_dotenv()
+
+API_BASE_URL = os.getenv("BAGY_API_URL", "https://api.dooca.store")
+API_KEY = os.getenv("API_KEY")
+
+STATE_FILE = os.path.join("imported", "sync_state.json")
+SKU_LOOKUP_BATCH = 50
+INVENTORY_BATCH = 250
+
+# Verifica se a API_KEY foi carregada
+if not API_KEY:
+    raise ValueError("❌ API_KEY não encontrada no arquivo .env")
+
+VARIANTS_BY_SKU_QUERY = """
+query($query: String!) {
+  productVariants(first: 250, query: $query) {
+    nodes { id sku product { id } inventoryItem { id } }
+  }
+}
+"""
+
+PRICE_UPDATE_MUTATION = """
+mutation($productId: ID!, $variants: [ProductVariantsBulkInput!]!) {
+  productVariantsBulkUpdate(productId: $productId, variants: $variants) {
+    productVariants { id }
+    userErrors { field message }
+  }
+}
+"""
+
+INVENTORY_SET_MUTATION = """
+mutation($input: InventorySetQuantitiesInput!) {
+  inventorySetQuantities(input: $input) {
+    userErrors { field message }
+  }
+}
+"""
+
+def load_state():
+    """Carrega o último estado sincronizado"""
+    if not os.path.exists(STATE_FILE):
+        return {"watermark": None, "variants": {}, "index": {}, "pending": {"price": {}, "stock": {}}}
+    with open(STATE_FILE, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    state.setdefault("variants", {})
+    state.setdefault("index", {})
+    state.setdefault("pending", {"price": {}, "stock": {}})
+    return state
+
+def save_state(state):
+    """Salva o estado de forma atômica"""
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, STATE_FILE)
+
+def fetch_changed_products(since=None):
+    """Busca na Bagy os produtos alterados desde a marca d'água (todos se None)"""
+    headers = {"Authorization": f"Bearer {API_KEY}"}
+    products = []
+    page = 1
+
+    while True:
+        # Só os campos de preço e estoque: descrição, imagens e categorias não são transferidas
+        params = {"page": page, "fields": projection.PRODUCT_STOCK.api_fields()}
+        if since:
+            params["sort"] = INCREMENTAL_SORT
+
+        response = requests.get(f"{API_BASE_URL}/products", headers=headers, params=params)
+        if response.status_code != 200:
+            raise RuntimeError(f"Erro na página {page} da Bagy: {response.status_code}")
+
+        data = response.json()
+        page_products = [projection.PRODUCT_STOCK.apply(product) for product in data.get("data", [])]
+
+        if since:
+            recent, reached = changed_since(page_products, since)
+            products.extend(recent)
+            if reached:
+                break
+        else:
+            products.extend(page_products)
+
+        if not data.get("links", {}).get("next"):
+            break
+
+        page += 1
+        metrics.throttle_sleep(0.350, "bagy_pagination")
+
+    return products
+
+def extract_variants(product):
+    """Extrai SKU, preço, preço comparativo e estoque de cada variação"""
+    variations = product.get("variations") or []
+    if not variations and product.get("sku"):
+        # Produto simples: o próprio produto é a variação
+        variations = [product]
+
+    for variation in variations:
+        sku = variation.get("sku")
+        if not sku:
+            continue
+        yield {
+            "sku": str(sku),
+            "price": variation.get("price", product.get("price")),
+            "compare_at": variation.get("price_compare") or None,
+            "balance": variation.get("balance")
+        }
+
+def parse_balance(value):
+    """Estoque da Bagy como inteiro (None se vazio ou inválido)"""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def content_hash(values):
+    """Hash estável do conteúdo de uma variação"""
+    payload = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def diff_variants(variants, synced):
+    """Separa as variações cujo preço ou estoque mudou desde a última sincronização"""
+    price_changes = {}
+    stock_changes = {}
+    invalid = []
+
+    for variant in variants:
+        last = synced.get(variant["sku"], {})
+        if variant["price"] is not None:
+            price_hash = content_hash([variant["price"], variant["compare_at"]])
+            if price_hash != last.get("price"):
+                price_changes[variant["sku"]] = dict(variant, hash=price_hash)
+
+        if variant["balance"] is not None:
+            balance = parse_balance(variant["balance"])
+            if balance is None:
+                invalid.append(variant["sku"])
+                continue
+            stock_hash = content_hash([variant["balance"]])
+            if stock_hash != last.get("stock"):
+                stock_changes[variant["sku"]] = dict(variant, balance=balance, hash=stock_hash)
+
+    if invalid:
+        print(f"⚠️  {len(invalid)} variações com estoque inválido ignoradas (ex: {', '.join(invalid[:5])})")
+    return price_changes, stock_changes
+
+def sku_search_query(skus):
+    """Monta o filtro de busca do Shopify para um lote de SKUs"""
+    terms = []
+    for sku in skus:
+        escaped = sku.replace("\\", "\\\\").replace('"', '\\"')
+        terms.append(f'sku:"{escaped}"')
+    return " OR ".join(terms)
+
+def resolve_skus(client, skus, index):
+    """Completa o índice SKU -> IDs do Shopify para os SKUs ainda desconhecidos"""
+    missing = sorted(sku for sku in skus if sku not in index)
+    for start in range(0, len(missing), SKU_LOOKUP_BATCH):
+        batch = missing[start:start + SKU_LOOKUP_BATCH]
+        data = client.graphql(VARIANTS_BY_SKU_QUERY, {"query": sku_search_query(batch)}, estimated_cost=60)
+        wanted = set(batch)
+        for node in data.get("productVariants", {}).get("nodes", []):
+            if node.get("sku") in wanted:
+                index[node["sku"]] = {
+                    "variant_id": node["id"],
+                    "product_id": node["product"]["id"],
+                    "inventory_item_id": (node.get("inventoryItem") or {}).get("id")
+                }
+
+    unresolved = [sku for sku in skus if sku not in index]
+    if unresolved:
+        print(f"⚠️  {len(unresolved)} SKUs não encontrados no Shopify (ex: {', '.join(unresolved[:5])})")
+    return unresolved
+
+def push_price_group(client, product_id, group):
+    """Atualiza os preços das variações de um produto. Retorna os SKUs sincronizados"""
+    variants = [
+        {
+            "id": item["variant_id"],
+            "price": str(item["price"]),
+            "compareAtPrice": str(item["compare_at"]) if item["compare_at"] else None
+        }
+        for item in group
+    ]
+    data = client.graphql(PRICE_UPDATE_MUTATION, {"productId": product_id, "variants": variants})
+    errors = data.get("productVariantsBulkUpdate", {}).get("userErrors") or []
+    if errors:
+        print(f"   ❌ Erro ao atualizar preços do produto {product_id}: {errors}")
+        return []
+    return [item["sku"] for item in group]
+
+def push_stock_batch(client, location_id, batch):
+    """Define o estoque disponível de um lote de itens. Retorna os SKUs sincronizados"""
+    payload = {
+        "input": {
+            "name": "available",
+            "reason": "correction",
+            "ignoreCompareQuantity": True,
+            "quantities": [
+                {
+                    "inventoryItemId": item["inventory_item_id"],
+                    "locationId": location_id,
+                    "quantity": item["balance"]
+                }
+                for item in batch
+            ]
+        }
+    }
+    data = client.graphql(INVENTORY_SET_MUTATION, payload, estimated_cost=20)
+    errors = data.get("inventorySetQuantities", {}).get("userErrors") or []
+    if errors:
+        print(f"   ❌ Erro ao atualizar estoque de {len(batch)} itens: {errors}")
+        return []
+    return [item["sku"] for item in batch]
+
+def run_parallel(tasks, workers):
+    """Executa as tarefas com concorrência limitada. Retorna (SKUs ok, falhas)"""
+    synced = []
+    failures = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(fn, *args) for fn, *args in tasks]
+        for future in futures:
+            try:
+                result = future.result()
+            except ShopifyError as e:
+                print(f"   ❌ {e}")
+                failures += 1
+                continue
+            if result:
+                synced.extend(result)
+            else:
+                failures += 1
+    return synced, failures
+
+def push_changes(client, price_changes, stock_changes, index, location_id, workers):
+    """Envia as alterações ao Shopify. Retorna (preços ok, estoques ok, falhas)"""
+    groups = {}
+    for sku, change in price_changes.items():
+        if sku in index:
+            item = dict(change, **index[sku])
+            groups.setdefault(item["product_id"], []).append(item)
+    price_tasks = [(push_price_group, client, product_id, group) for product_id, group in groups.items()]
+
+    stock_items = [dict(change, **index[sku]) for sku, change in stock_changes.items()
+                   if sku in index and index[sku].get("inventory_item_id")]
+    stock_tasks = [
+        (push_stock_batch, client, location_id, stock_items[start:start + INVENTORY_BATCH])
+        for start in range(0, len(stock_items), INVENTORY_BATCH)
+    ]
+
+    synced_prices, price_failures = run_parallel(price_tasks, workers)
+    synced_stock, stock_failures = run_parallel(stock_tasks, workers)
+    return synced_prices, synced_stock, price_failures + stock_failures
+
+def run_cycle(client, state, location_id, args):
+    """Executa um ciclo de sincronização"""
+    since = None if args.full else state.get("watermark")
+    print(f"\n🔄 Buscando produtos alterados na Bagy{' desde ' + since if since else ' (varredura completa)'}...")
+    products = fetch_changed_products(since)
+
+    variants = [variant for product in products for variant in extract_variants(product)]
+    price_changes, stock_changes = diff_variants(variants, state["variants"])
+    print(f"📦 Produtos lidos: {len(products)} | variações: {len(variants)}")
+    print(f"💲 Preços alterados: {len(price_changes)} | 📊 Estoques alterados: {len(stock_changes)}")
+
+    # Alterações de ciclos anteriores cujos SKUs ainda não existiam no Shopify (as novas prevalecem)
+    pending = state["pending"]
+    if pending["price"] or pending["stock"]:
+        print(f"⏳ Pendentes de ciclos anteriores: {len(pending['price'])} preços | {len(pending['stock'])} estoques")
+        price_changes = {**pending["price"], **price_changes}
+        stock_changes = {**pending["stock"], **stock_changes}
+
+    if not price_changes and not stock_changes:
+        state["watermark"] = latest_updated_at(products, state.get("watermark"))
+        return
+
+    resolve_skus(client, set(price_changes) | set(stock_changes), state["index"])
+
+    if args.dry_run:
+        print("🧪 MODO TESTE - nada foi enviado ao Shopify")
+        return
+
+    synced_prices, synced_stock, failures = push_changes(
+        client, price_changes, stock_changes, state["index"], location_id, args.workers
+    )
+
+    for sku in synced_prices:
+        state["variants"].setdefault(sku, {})["price"] = price_changes[sku]["hash"]
+    for sku in synced_stock:
+        state["variants"].setdefault(sku, {})["stock"] = stock_changes[sku]["hash"]
+
+    print(f"✅ Preços sincronizados: {len(synced_prices)} | Estoques sincronizados: {len(synced_stock)}")
+
+    # SKUs sem correspondência não são perdidos quando a marca d'água avança: ficam pendentes
+    index = state["index"]
+    state["pending"] = {
+        "price": {sku: change for sku, change in price_changes.items() if sku not in index},
+        "stock": {sku: change for sku, change in stock_changes.items()
+                  if not (index.get(sku) or {}).get("inventory_item_id")}
+    }
+    unresolved = len(state["pending"]["price"]) + len(state["pending"]["stock"])
+    if unresolved:
+        print(f"⏳ {unresolved} alterações de SKUs ainda não encontrados no Shopify; tentadas de novo no próximo ciclo")
+
+    # Só avança a marca d'água sem falhas, para não perder alterações no próximo ciclo
+    if failures:
+        print(f"⚠️  {failures} lotes falharam; serão reenviados no próximo ciclo")
+    else:
+        state["watermark"] = latest_updated_at(products, state.get("watermark"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincroniza preço e estoque da Bagy para o Shopify")
+    parser.add_argument("--once", action="store_true", help="executa um único ciclo e sai")
+    parser.add_argument("--interval", type=int, default=300, help="segundos entre ciclos (padrão: 300)")
+    parser.add_argument("--workers", type=int, default=4, help="requisições simultâneas ao Shopify (padrão: 4)")
+    parser.add_argument("--full", action="store_true", help="lê todos os produtos da Bagy em cada ciclo")
+    parser.add_argument("--location", help="ID da location de estoque no Shopify")
+    parser.add_argument("--dry-run", action="store_true", help="calcula as diferenças sem enviar")
+    args = parser.parse_args()
+
+    print("🔁 SINCRONIZAÇÃO DE PREÇO E ESTOQUE BAGY → SHOPIFY")
+    print("=" * 50)
+
+    client = ShopifyClient(pool_size=args.workers)
+    state = load_state()
+    location_id = None if args.dry_run else resolve_location_id(client, args.location)
+
+    while True:
+        started = time.monotonic()
+        try:
+            run_cycle(client, state, location_id, args)
+            save_state(state)
+        except (ShopifyError, RuntimeError, requests.exceptions.RequestException) as e:
+            print(f"❌ Ciclo interrompido: {e}")
+
+        if args.once:
+            break
+
+        wait = max(0, args.interval - (time.monotonic() - started))
+        print(f"⏳ Próximo ciclo em {wait:.0f}s (Ctrl+C para encerrar)")
+        try:
+            sleep(wait)
+        except KeyboardInterrupt:
+            print("\n👋 Encerrando sincronização...")
+            break
+
+if __name__ == "__main__":
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Envio dos redirects 301 gerados pelo 09 direto para o Shopify.
+
+Substitui o upload manual de converted/redirects_301.csv em partes pelo admin:
+1. Busca os redirects que já existem na loja (índice path -> destino) e
+   pula esses paths
+2. Cria os restantes por um de dois caminhos:
+   - rest (padrão): POST redirects.json em paralelo, todos sob o mesmo
+     leaky bucket do ShopifyClient
+   - bulk: importação em massa do GraphQL (stagedUploadsCreate +
+     urlRedirectImportCreate/urlRedirectImportSubmit), em lotes de
+     BULK_CHUNK linhas
+   Como a importação só informa contagens, com falhas os paths do lote são
+   conferidos na loja: os que não foram criados continuam pendentes
+3. Grava o progresso em imported/redirects_upload_state.json: uma execução
+   interrompida retoma de onde parou, sem repetir paths já criados nem
+   importações já submetidas
+
+SHOPIFY_BASE_URL permite rodar contra o simulador local (nos dois modos).
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from dotenv import load_dotenv
+import metrics
+import profiling
+from shopify_client import ShopifyClient, ShopifyError
+
+# Carrega as variáveis do arquivo .env
+load_dotenv()
+
+REDIRECTS_FILE = os.path.join("converted", "redirects_301.csv")
+STATE_FILE = os.path.join("imported", "redirects_upload_state.json")
+SAVE_EVERY = 500
+BULK_CHUNK = 10000
+BULK_POLL_INTERVAL = 5
+
+STAGED_UPLOAD_MUTATION = """
+mutation($input: [StagedUploadInput!]!) {
+  stagedUploadsCreate(input: $input) {
+    stagedTargets { url resourceUrl parameters { name value } }
+    userErrors { field message }
+  }
+}
+"""
+
+IMPORT_CREATE_MUTATION = """
+mutation($url: URL!) {
+  urlRedirectImportCreate(url: $url) {
+    urlRedirectImport { id }
+    userErrors { field message }
+  }
+}
+"""
+
+IMPORT_SUBMIT_MUTATION = """
+mutation($id: ID!) {
+  urlRedirectImportSubmit(id: $id) {
+    job { id }
+    userErrors { field message }
+  }
+}
+"""
+
+IMPORT_STATUS_QUERY = """
+query($id: ID!) {
+  urlRedirectImport(id: $id) { finished createdCount updatedCount failedCount }
+}
+"""
+
+def load_state():
+    """Carrega o progresso do último envio"""
+    if not os.path.exists(STATE_FILE):
+        return {"done": {}, "failed": {}, "bulk_import": None}
+    with open(STATE_FILE, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    state.setdefault("done", {})
+    state.setdefault("failed", {})
+    state.setdefault("bulk_import", None)
+    return state
+
+def save_state(state):
+    """Salva o progresso de forma atômica"""
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, STATE_FILE)
+
+def read_redirects(path=REDIRECTS_FILE):
+    """Lê os pares (path, destino) do CSV do 09, linha a linha"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            source = (row.get("Redirect from") or "").strip()
+            target = (row.get("Redirect to") or "").strip()
+            if source and target:
+                yield source, target
+
+def fetch_existing_redirects(client):
+    """Índice path -> destino dos redirects que já existem na loja"""
+    existing = {}
+    url = "redirects.json?limit=250&fields=path,target"
+    while url:
+        response = client.rest("GET", url)
+        if response.status_code != 200:
+            raise ShopifyError(f"Erro ao listar redirects: HTTP {response.status_code}")
+        for redirect in response.json().get("redirects", []):
+            existing[redirect["path"]] = redirect["target"]
+        url = response.links.get("next", {}).get("url")
+    return existing
+
+def create_redirect(client, path, target):
+    """Cria um redirect. Retorna (path, None) ou (path, mensagem de erro); path já usado conta como sucesso"""
+    response = client.rest("POST", "redirects.json", json={"redirect": {"path": path, "target": target}})
+    if response.status_code == 201:
+        return path, None
+    if response.status_code == 422:
+        errors = response.json().get("errors") or {}
+        if isinstance(errors, dict) and any("taken" in message for message in errors.get("path", [])):
+            return path, None
+        return path, f"HTTP 422: {errors}"
+    return path, f"HTTP {response.status_code}: {response.text[:200]}"
+
+def upload_rest(client, pending, state, workers):
+    """Cria os redirects com POSTs em paralelo. Retorna (criados, falhas)"""
+    created = failed = 0
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {}
+    try:
+        for path, target in pending:
+            futures[executor.submit(create_redirect, client, path, target)] = (path, target)
+        for number, future in enumerate(as_completed(futures), 1):
+            path, target = futures[future]
+            try:
+                _, error = future.result()
+            except ShopifyError as e:
+                error = str(e)
+
+            if error:
+                state["failed"][path] = error
+                failed += 1
+            else:
+                state["done"][path] = target
+                state["failed"].pop(path, None)
+                created += 1
+
+            if number % SAVE_EVERY == 0:
+                save_state(state)
+                print(f"   📤 {number}/{len(pending)} enviados ({failed} falhas)")
+    finally:
+        # Interrompido (Ctrl+C): descarta o que não começou e guarda o que já foi criado
+        # (cancela um a um: shutdown(cancel_futures=True) só existe a partir do Python 3.9)
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+        save_state(state)
+    return created, failed
+
+def check_user_errors(payload, operation):
+    errors = payload.get("userErrors") or []
+    if errors:
+        raise ShopifyError(f"{operation}: {errors}")
+
+def stage_redirects_csv(client, rows):
+    """Envia um lote em CSV para o armazenamento temporário do Shopify. Retorna a resourceUrl"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Redirect from", "Redirect to"])
+    writer.writerows(rows)
+
+    data = client.graphql(STAGED_UPLOAD_MUTATION, {"input": [{
+        "resource": "URL_REDIRECT_IMPORT",
+        "filename": "redirects.csv",
+        "mimeType": "text/csv",
+        "httpMethod": "POST"
+    }]})
+    result = data.get("stagedUploadsCreate", {})
+    check_user_errors(result, "stagedUploadsCreate")
+    target = result["stagedTargets"][0]
+
+    # O destino é um bucket externo: sem os cabeçalhos de autenticação do Shopify
+    fields = {parameter["name"]: parameter["value"] for parameter in target["parameters"]}
+    response = requests.post(target["url"], data=fields, timeout=120,
+                             files={"file": ("redirects.csv", buffer.getvalue().encode("utf-8"), "text/csv")})
+    if response.status_code not in (200, 201, 204):
+        raise ShopifyError(f"Falha no upload do CSV: HTTP {response.status_code}")
+    return target["resourceUrl"]
+
+def submit_import(client, resource_url):
+    """Cria e submete a importação de um CSV já enviado. Retorna o ID da importação"""
+    data = client.graphql(IMPORT_CREATE_MUTATION, {"url": resource_url})
+    result = data.get("urlRedirectImportCreate", {})
+    check_user_errors(result, "urlRedirectImportCreate")
+    import_id = result["urlRedirectImport"]["id"]
+
+    data = client.graphql(IMPORT_SUBMIT_MUTATION, {"id": import_id})
+    check_user_errors(data.get("urlRedirectImportSubmit", {}), "urlRedirectImportSubmit")
+    return import_id
+
+def wait_for_import(client, import_id):
+    """Aguarda o fim de uma importação. Retorna o status final"""
+    while True:
+        status = client.graphql(IMPORT_STATUS_QUERY, {"id": import_id}).get("urlRedirectImport") or {}
+        if status.get("finished"):
+            return status
+        metrics.throttle_sleep(BULK_POLL_INTERVAL, "redirect_import_poll")
+
+def finish_import(client, state):
+    """Conclui a importação registrada no estado (submetida antes de uma interrupção).
+    Só marca como enviados os redirects que existem na loja depois da importação. Retorna (criados, falhas)"""
+    current = state["bulk_import"]
+    rows = current["rows"]
+    status = wait_for_import(client, current["id"])
+    print(f"   ✅ Importação {current['id']}: {status.get('createdCount', 0)} criados, "
+          f"{status.get('updatedCount', 0)} atualizados, {status.get('failedCount', 0)} falhas")
+
+    # O status só traz contagens: com falhas (ou contagens que não fecham) confere cada path na loja
+    imported = int(status.get("createdCount") or 0) + int(status.get("updatedCount") or 0)
+    existing = None
+    if int(status.get("failedCount") or 0) or imported < len(rows):
+        existing = fetch_existing_redirects(client)
+
+    created = failed = 0
+    for path, target in rows:
+        if existing is None or existing.get(path) == target:
+            state["done"][path] = target
+            state["failed"].pop(path, None)
+            created += 1
+        else:
+            state["failed"][path] = (f"Não importado (destino atual na loja: {existing[path]})" if path in existing
+                                     else "Não importado pela urlRedirectImport")
+            failed += 1
+    state["bulk_import"] = None
+    save_state(state)
+    return created, failed
+
+def upload_bulk(client, pending, state):
+    """Cria os redirects por importações em massa de BULK_CHUNK linhas. Retorna (criados, falhas)"""
+    created = failed = 0
+    for start in range(0, len(pending), BULK_CHUNK):
+        rows = pending[start:start + BULK_CHUNK]
+        resource_url = stage_redirects_csv(client, rows)
+        import_id = submit_import(client, resource_url)
+
+        # Registrada antes de aguardar: se a execução cair, a próxima só acompanha esta importação
+        state["bulk_import"] = {"id": import_id, "rows": rows}
+        save_state(state)
+        print(f"   📤 Lote {start // BULK_CHUNK + 1}: importação {import_id} com {len(rows)} redirects")
+
+        batch_created, batch_failed = finish_import(client, state)
+        created += batch_created
+        failed += batch_failed
+    return created, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Envia os redirects 301 do 09 direto para o Shopify")
+    parser.add_argument("--mode", choices=["rest", "bulk"], default="rest",
+                        help="rest: POSTs em paralelo | bulk: importação em massa do GraphQL (padrão: rest)")
+    parser.add_argument("--workers", type=int, default=4, help="requisições simultâneas no modo rest (padrão: 4)")
+    parser.add_argument("--file", default=REDIRECTS_FILE, help=f"CSV de redirects (padrão: {REDIRECTS_FILE})")
+    parser.add_argument("--restart", action="store_true", help="ignora o progresso salvo e começa do zero")
+    parser.add_argument("--dry-run", action="store_true", help="mostra o que seria enviado sem criar nada")
+    args = parser.parse_args()
+
+    print("🔗 ENVIO DE REDIRECTS 301 PARA O SHOPIFY")
+    print("=" * 50)
+
+    if not os.path.exists(args.file):
+        print(f"❌ Arquivo {args.file} não encontrado. Execute primeiro o 09_generate_redirects_301.py")
+        return
+
+    client = ShopifyClient(pool_size=args.workers)
+    state = {"done": {}, "failed": {}, "bulk_import": None} if args.restart else load_state()
+
+    try:
+        if state["bulk_import"] and not args.dry_run:
+            print(f"\n♻️  Retomando a importação {state['bulk_import']['id']}...")
+            finish_import(client, state)
+
+        print("\n🔎 Buscando redirects já existentes na loja...")
+        existing = fetch_existing_redirects(client)
+        print(f"✅ {len(existing)} redirects já existem no Shopify")
+
+        pending, already_done, conflicts, total = [], 0, 0, 0
+        for path, target in read_redirects(args.file):
+            total += 1
+            if path in existing:
+                conflicts += existing[path] != target
+                continue
+            if state["done"].get(path) == target:
+                already_done += 1
+                continue
+            pending.append((path, target))
+    except ShopifyError as e:
+        print(f"❌ {e}")
+        return
+
+    print(f"\n📊 Redirects no CSV: {total}")
+    print(f"   ⏭️  Já existem na loja: {total - len(pending) - already_done}"
+          f"{f' ({conflicts} com destino diferente, mantidos)' if conflicts else ''}")
+    print(f"   ♻️  Enviados em execuções anteriores: {already_done}")
+    print(f"   📤 A enviar: {len(pending)}")
+
+    if not pending:
+        print("\n🎉 Nada a enviar")
+        return
+    if args.dry_run:
+        print("\n🧪 MODO TESTE - nada foi enviado ao Shopify")
+        return
+
+    print(f"\n🚀 Enviando ({'importação em massa' if args.mode == 'bulk' else f'{args.workers} requisições simultâneas'})...")
+    try:
+        with profiling.stage("upload"):
+            if args.mode == "bulk":
+                created, failed = upload_bulk(client, pending, state)
+            else:
+                created, failed = upload_rest(client, pending, state, args.workers)
+    except (ShopifyError, requests.exceptions.RequestException) as e:
+        save_state(state)
+        print(f"❌ Envio interrompido: {e}")
+        print("   Execute novamente para retomar de onde parou")
+        return
+
+    print(f"\n✅ Redirects criados: {created}")
+    if failed:
+        print(f"⚠️  Falhas: {failed} (detalhes em {STATE_FILE}; serão reenviadas na próxima execução)")
+    print("🎉 Processo concluído!")
+
+if __name__ == "__main__":
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verificação dos redirects 301 na loja publicada.
+
+Lê converted/redirects_301.csv linha a linha e, com concorrência limitada e
+conexões reaproveitadas, faz um HEAD em cada "Redirect from" sem seguir o
+redirect. Cada linha é conferida:
+- status 301
+- Location apontando para o "Redirect to" esperado
+- destino no ar: cada destino distinto (produto ou coleção) recebe um HEAD (200)
+
+Todas as linhas vão para converted/redirects_verification.csv (status,
+Location, latência) e as que falharam para converted/redirects_mismatches.csv.
+
+A URL da loja vem de --base-url, SHOPIFY_STORE_URL ou SHOPIFY_SHOP_DOMAIN;
+apontar para o api_simulator.py permite testar localmente.
+"""
+
+import argparse
+import csv
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+import metrics
+import profiling
+from shopify_client import retry_wait
+
+# Carrega as variáveis do arquivo .env
+load_dotenv()
+
+SHOPIFY_SHOP_DOMAIN = os.getenv("SHOPIFY_SHOP_DOMAIN")
+SHOPIFY_STORE_URL = os.getenv("SHOPIFY_STORE_URL") or (f"https://{SHOPIFY_SHOP_DOMAIN}" if SHOPIFY_SHOP_DOMAIN else None)
+
+REDIRECTS_FILE = os.path.join("converted", "redirects_301.csv")
+REPORT_FILE = os.path.join("converted", "redirects_verification.csv")
+MISMATCHES_FILE = os.path.join("converted", "redirects_mismatches.csv")
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REPORT_COLUMNS = ["redirect_from", "redirect_to", "status", "location", "latency_ms",
+                  "target_status", "result", "error"]
+
+def location_target(url):
+    """Path e query de uma URL ou path, sem barra final (destinos de coleção têm ?q=)"""
+    parsed = urlparse(url)
+    path = parsed.path.rstrip("/") or "/"
+    return f"{path}?{parsed.query}" if parsed.query else path
+
+class Verifier:
+    """Sessão com pool de conexões e cache do status de cada destino"""
+
+    def __init__(self, base_url, workers, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.targets = {}
+        self.lock = threading.Lock()
+
+    def _request(self, url):
+        response = self.session.head(url, allow_redirects=False, timeout=self.timeout)
+        if response.status_code == 405:
+            response = self.session.get(url, allow_redirects=False, timeout=self.timeout, stream=True)
+            response.close()
+        return response
+
+    def head(self, path):
+        """HEAD sem seguir redirects (GET sem corpo se o servidor não aceitar HEAD), com novas tentativas
+        em 429/5xx e falhas de conexão. Retorna (resposta, segundos da última tentativa)"""
+        url = f"{self.base_url}{path}"
+        for attempt in range(MAX_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                response = self._request(url)
+            except requests.exceptions.RequestException:
+                if attempt == MAX_RETRIES:
+                    raise
+                wait_seconds = 2 ** attempt
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    return response, time.perf_counter() - started
+                wait_seconds = retry_wait(response, attempt)
+            metrics.record_retry("HEAD", url)
+            metrics.throttle_sleep(wait_seconds, "storefront_retry")
+
+    def target_status(self, path):
+        """Status do destino (um HEAD por destino distinto)"""
+        with self.lock:
+            if path in self.targets:
+                return self.targets[path]
+        try:
+            status = self.head(path)[0].status_code
+        except requests.exceptions.RequestException:
+            status = None
+        with self.lock:
+            self.targets[path] = status
+        return status
+
+    def check(self, redirect_from, redirect_to):
+        """Confere um redirect. Retorna a linha do relatório"""
+        row = {"redirect_from": redirect_from, "redirect_to": redirect_to, "status": None, "location": "",
+               "latency_ms": None, "target_status": None, "result": "ok", "error": ""}
+        try:
+            response, seconds = self.head(redirect_from)
+        except requests.exceptions.RequestException as e:
+            row.update(result="error", error=type(e).__name__)
+            return row
+
+        location = response.headers.get("Location", "")
+        row.update(status=response.status_code, location=location, latency_ms=round(seconds * 1000, 1))
+        if response.status_code != 301:
+            row["result"] = "wrong_status"
+        elif location_target(location) != location_target(redirect_to):
+            row["result"] = "wrong_location"
+        else:
+            row["target_status"] = self.target_status(redirect_to)
+            if row["target_status"] != 200:
+                row["result"] = "target_down"
+        return row
+
+def read_redirects(path):
+    """Lê os pares (de, para) do CSV do 09, linha a linha"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            redirect_from = (row.get("Redirect from") or "").strip()
+            if redirect_from:
+                yield redirect_from, (row.get("Redirect to") or "").strip()
+
+def verify(verifier, redirects, workers, on_result):
+    """Confere os redirects mantendo no máximo workers * 4 pendentes (a leitura acompanha o ritmo das respostas)"""
+    window = workers * 4
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for redirect_from, redirect_to in redirects:
+            pending.add(executor.submit(verifier.check, redirect_from, redirect_to))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    on_result(future.result())
+        for future in pending:
+            on_result(future.result())
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Confere se os redirects 301 respondem na loja")
+    parser.add_argument("--base-url", default=SHOPIFY_STORE_URL,
+                        help="URL da loja (padrão: SHOPIFY_STORE_URL ou https://SHOPIFY_SHOP_DOMAIN)")
+    parser.add_argument("--file", default=REDIRECTS_FILE, help=f"CSV de redirects (padrão: {REDIRECTS_FILE})")
+    parser.add_argument("--workers", type=int, default=16, help="requisições simultâneas (padrão: 16)")
+    parser.add_argument("--timeout", type=float, default=15, help="timeout por requisição em segundos (padrão: 15)")
+    args = parser.parse_args()
+
+    print("🔍 VERIFICAÇÃO DOS REDIRECTS 301")
+    print("=" * 50)
+
+    if not args.base_url:
+        print("❌ Informe a URL da loja com --base-url ou SHOPIFY_STORE_URL no .env")
+        return
+    if not os.path.exists(args.file):
+        print(f"❌ Arquivo {args.file} não encontrado. Execute primeiro o 09_generate_redirects_301.py")
+        return
+
+    print(f"🌐 Loja: {args.base_url} | {args.workers} requisições simultâneas")
+    verifier = Verifier(args.base_url, args.workers, args.timeout)
+    counts = {}
+    latencies = []
+
+    os.makedirs(os.path.dirname(REPORT_FILE), exist_ok=True)
+    with open(REPORT_FILE, "w", encoding="utf-8", newline="") as report_file, \
+            open(MISMATCHES_FILE, "w", encoding="utf-8", newline="") as mismatches_file:
+        report = csv.DictWriter(report_file, fieldnames=REPORT_COLUMNS)
+        mismatches = csv.DictWriter(mismatches_file, fieldnames=REPORT_COLUMNS)
+        report.writeheader()
+        mismatches.writeheader()
+
+        def on_result(row):
+            report.writerow(row)
+            if row["result"] != "ok":
+                mismatches.writerow(row)
+            counts[row["result"]] = counts.get(row["result"], 0) + 1
+            if row["latency_ms"] is not None:
+                latencies.append(row["latency_ms"])
+            checked = sum(counts.values())
+            if checked % 1000 == 0:
+                print(f"   🔎 {checked} verificados ({checked - counts.get('ok', 0)} com problema)")
+
+        started = time.perf_counter()
+        with profiling.stage("verify"):
+            verify(verifier, read_redirects(args.file), args.workers, on_result)
+        elapsed = time.perf_counter() - started
+
+    total = sum(counts.values())
+    labels = {
+        "ok": "✅ OK (301 para o destino certo, destino no ar)",
+        "wrong_status": "❌ Não responderam 301",
+        "wrong_location": "❌ 301 para outro destino",
+        "target_down": "❌ Destino fora do ar",
+        "error": "❌ Erro de conexão"
+    }
+    print(f"\n📊 {total} redirects verificados em {elapsed:.1f}s "
+          f"(latência p50 {percentile(latencies, 0.5):.0f}ms, p95 {percentile(latencies, 0.95):.0f}ms)")
+    for result, label in labels.items():
+        if counts.get(result):
+            print(f"   {label}: {counts[result]}")
+    print(f"\n📄 Relatório completo: {REPORT_FILE}")
+    if total - counts.get("ok", 0):
+        print(f"📄 Divergências: {MISMATCHES_FILE}")
+    else:
+        print("🎉 Todos os redirects conferem!")
+
+if __name__ == "__main__":
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Criação dos produtos direto no Shopify pela mutation productSet do GraphQL.
+
+Alternativa à importação manual do CSV do 04:
+1. Lê imported/produtos.json e converte cada produto com o mesmo código do
+   04 (product_rows), montando o input do productSet: opções, variações
+   (SKU, preço, peso, estoque) e imagens (as já enviadas pelo 14 vão com a
+   URL do Shopify)
+2. Envia os produtos em paralelo; quantos ficam em voo depende dos pontos
+   de custo do GraphQL que a loja informa em cada resposta
+   (extensions.cost.throttleStatus): com o balde cheio usa todos os
+   workers, com o balde vazio envia um por vez
+3. Grava em imported/products_upload_state.json o ID do produto na Bagy,
+   o GID criado no Shopify e o hash do conteúdo enviado: uma nova execução
+   retoma de onde parou, pula produtos sem mudança e atualiza (pelo GID) os
+   que mudaram. Produtos ainda fora do estado são conferidos pelo handle na
+   loja antes de criar: os criados por uma execução interrompida antes do
+   salvamento são atualizados, não duplicados
+
+SHOPIFY_BASE_URL permite rodar contra o simulador local (api_simulator.py).
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+import metrics
+import profiling
+from shopify_client import ShopifyClient, ShopifyError, resolve_location_id
+
+# Carrega as variáveis do arquivo .env
+load_dotenv()
+
+converter = importlib.import_module("04_convert_products_to_shopify_csv")
+
+PRODUCTS_FILE = os.path.join("imported", "produtos.json")
+STATE_FILE = os.path.join("imported", "products_upload_state.json")
+SAVE_EVERY = 100
+# Custo estimado de um productSet antes da primeira resposta da loja
+ESTIMATED_COST = 10
+# Peso da última resposta na média do custo pedido
+COST_SMOOTHING = 0.3
+
+PRODUCT_SET_MUTATION = """
+mutation($input: ProductSetInput!) {
+  productSet(input: $input, synchronous: true) {
+    product { id handle }
+    userErrors { field message code }
+  }
+}
+"""
+
+PRODUCTS_QUERY = """
+query($after: String) {
+  products(first: 250, after: $after) {
+    nodes { id handle }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
+
+def load_state():
+    """Carrega o progresso do último envio"""
+    if not os.path.exists(STATE_FILE):
+        return {"products": {}, "failed": {}}
+    with open(STATE_FILE, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    state.setdefault("products", {})
+    state.setdefault("failed", {})
+    return state
+
+def save_state(state):
+    """Salva o progresso de forma atômica"""
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, STATE_FILE)
+
+def _number(value):
+    """Preço/peso do CSV como número (vazio ou inválido vira None)"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def build_product_input(product, location_id=None):
+    """Input do productSet a partir das linhas do CSV que o 04 gera para o produto"""
+    rows = [dict(zip(converter.HEADERS, row)) for row in converter.product_rows(product)]
+    if not rows:
+        return None
+    first = rows[0]
+    variant_rows = [row for row in rows if row['Variant Inventory Tracker'] == 'shopify']
+
+    product_input = {
+        "handle": first['Handle'],
+        "title": first['Title'],
+        "descriptionHtml": first['Body (HTML)'],
+        "vendor": first['Vendor'],
+        "productType": first['Type'],
+        "tags": [tag.strip() for tag in str(first['Tags']).split(',') if tag.strip()],
+        "status": "ACTIVE" if first['Status'] == 'active' else "DRAFT",
+        "seo": {"title": first['SEO Title'], "description": first['SEO Description']},
+    }
+
+    # Imagens na ordem do CSV (sem repetir), incluindo as das variações
+    files, sources = [], set()
+    def add_file(src, alt):
+        if src and src not in sources:
+            sources.add(src)
+            files.append({"originalSource": src, "alt": alt or first['Title'], "contentType": "IMAGE"})
+    for row in rows:
+        add_file(row['Image Src'], row['Image Alt Text'])
+    for row in variant_rows:
+        add_file(row['Variant Image'], first['Title'])
+
+    # Opções na ordem das colunas Option1/Option2, com os valores na ordem das variações
+    options = {}
+    for row in variant_rows:
+        for number in (1, 2, 3):
+            name, value = row[f'Option{number} Name'], row[f'Option{number} Value']
+            if name:
+                values = options.setdefault(name, [])
+                if value not in values:
+                    values.append(value)
+    product_input["productOptions"] = [
+        {"name": name, "values": [{"name": value} for value in values]} for name, values in options.items()
+    ]
+
+    variants = []
+    for row in variant_rows:
+        variant = {
+            "optionValues": [
+                {"optionName": row[f'Option{number} Name'], "name": row[f'Option{number} Value']}
+                for number in (1, 2, 3) if row[f'Option{number} Name']
+            ],
+            "sku": row['Variant SKU'],
+            "price": str(row['Variant Price']),
+            "inventoryPolicy": "DENY",
+            "taxable": row['Variant Taxable'] == 'TRUE',
+            "inventoryItem": {
+                "tracked": True,
+                "requiresShipping": row['Variant Requires Shipping'] == 'TRUE',
+                "measurement": {"weight": {"value": _number(row['Variant Grams']) or 0, "unit": "GRAMS"}},
+            },
+        }
+        if _number(row['Variant Compare At Price']):
+            variant["compareAtPrice"] = str(row['Variant Compare At Price'])
+        if row['Variant Image']:
+            variant["file"] = {"originalSource": row['Variant Image'], "contentType": "IMAGE"}
+        if location_id:
+            variant["inventoryQuantities"] = [{
+                "locationId": location_id, "name": "available",
+                "quantity": int(_number(row['Variant Inventory Qty']) or 0)
+            }]
+        variants.append(variant)
+    product_input["variants"] = variants
+    product_input["files"] = files
+    return product_input
+
+def fetch_existing_handles(client):
+    """Índice handle -> GID dos produtos que já existem na loja (250 por página)"""
+    handles = {}
+    after = None
+    while True:
+        data = client.graphql(PRODUCTS_QUERY, {"after": after}, estimated_cost=60)
+        page = data.get("products") or {}
+        for node in page.get("nodes") or []:
+            handles[node["handle"]] = node["id"]
+        page_info = page.get("pageInfo") or {}
+        if not page_info.get("hasNextPage"):
+            return handles
+        after = page_info.get("endCursor")
+
+def input_hash(product_input):
+    """Hash do input enviado: muda se o produto ou a conversão mudarem"""
+    payload = json.dumps(product_input, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def upload_product(client, product_input, product_id=None):
+    """Cria (ou atualiza, com o GID) um produto. Retorna (produto, erros, custo da resposta)"""
+    variables = {"input": dict(product_input, id=product_id) if product_id else product_input}
+    data, cost = client.graphql_with_cost(PRODUCT_SET_MUTATION, variables, ESTIMATED_COST)
+    result = data.get("productSet") or {}
+    return result.get("product"), result.get("userErrors") or [], cost
+
+class CostWindow:
+    """Quantos productSet deixar em voo: pontos disponíveis / custo médio pedido, entre 1 e workers"""
+
+    def __init__(self, client, workers):
+        self.client = client
+        self.workers = workers
+        self.average_cost = float(ESTIMATED_COST)
+
+    def update(self, cost):
+        requested = (cost or {}).get("requestedQueryCost")
+        if requested:
+            self.average_cost += COST_SMOOTHING * (float(requested) - self.average_cost)
+
+    def size(self):
+        available = self.client.cost_throttle.available_points()
+        return max(1, min(self.workers, int(available // max(self.average_cost, 1))))
+
+def upload_products(client, pending, state, workers):
+    """Envia os productSet com a janela guiada pelo custo. Retorna (criados, atualizados, falhas)"""
+    created = updated = failed = done = 0
+    window = CostWindow(client, workers)
+    queue = iter(pending)
+    running = {}
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            # Completa a janela com os próximos produtos
+            while len(running) < window.size():
+                item = next(queue, None)
+                if item is None:
+                    break
+                bagy_id, product_input, digest, product_id = item
+                future = executor.submit(upload_product, client, product_input, product_id)
+                running[future] = (bagy_id, product_input, digest, product_id)
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                bagy_id, product_input, digest, product_id = running.pop(future)
+                try:
+                    product, errors, cost = future.result()
+                    window.update(cost)
+                except ShopifyError as e:
+                    product, errors = None, [{"message": str(e)}]
+
+                if errors or not product:
+                    state["failed"][bagy_id] = errors or "productSet sem produto na resposta"
+                    failed += 1
+                else:
+                    state["products"][bagy_id] = {"id": product["id"], "handle": product.get("handle"), "hash": digest}
+                    state["failed"].pop(bagy_id, None)
+                    if product_id:
+                        updated += 1
+                    else:
+                        created += 1
+
+                done += 1
+                if done % SAVE_EVERY == 0:
+                    save_state(state)
+                    print(f"   📤 {done}/{len(pending)} enviados ({failed} falhas, "
+                          f"janela {window.size()}/{workers})")
+    finally:
+        # Interrompido (Ctrl+C): descarta o que não começou e guarda o que já foi criado
+        # (cancela um a um: shutdown(cancel_futures=True) só existe a partir do Python 3.9)
+        for future in running:
+            future.cancel()
+        executor.shutdown(wait=True)
+        save_state(state)
+    return created, updated, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Cria os produtos da Bagy direto no Shopify (GraphQL productSet)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="máximo de productSet simultâneos; a janela real segue os pontos de custo (padrão: 8)")
+    parser.add_argument("--file", default=PRODUCTS_FILE, help=f"JSON de produtos (padrão: {PRODUCTS_FILE})")
+    parser.add_argument("--limit", type=int, help="envia no máximo N produtos (para testes)")
+    parser.add_argument("--location", help="location do estoque inicial (padrão: SHOPIFY_LOCATION_ID ou a primeira da loja)")
+    parser.add_argument("--restart", action="store_true", help="ignora o progresso salvo e começa do zero")
+    parser.add_argument("--dry-run", action="store_true", help="mostra o que seria enviado sem criar nada")
+    args = parser.parse_args()
+
+    print("🛍️  CRIAÇÃO DE PRODUTOS NO SHOPIFY (productSet)")
+    print("=" * 50)
+
+    if not os.path.exists(args.file):
+        print(f"❌ Arquivo {args.file} não encontrado. Execute primeiro o 01_export_products_from_bagy.py")
+        return
+
+    with profiling.stage("load"):
+        with open(args.file, "r", encoding="utf-8") as f:
+            products = [p for p in json.load(f) if p and p.get('name')]
+    if args.limit:
+        products = products[:args.limit]
+
+    # Imagens já enviadas pelo 14: o Shopify não precisa buscá-las no CDN da Bagy
+    image_map = converter.load_image_map()
+    for product in products:
+        converter.apply_image_map(product, image_map)
+
+    client = ShopifyClient(pool_size=args.workers)
+    state = {"products": {}, "failed": {}} if args.restart else load_state()
+
+    try:
+        location_id = None if args.dry_run else resolve_location_id(client, args.location)
+    except ShopifyError as e:
+        print(f"❌ {e}")
+        return
+
+    pending, unchanged, without_id, conversion_errors = [], 0, 0, []
+    with profiling.stage("build"):
+        for product in products:
+            if product.get('id') is None:
+                without_id += 1
+                continue
+            bagy_id = str(product.get('id'))
+            try:
+                product_input = build_product_input(product, location_id)
+            except Exception as e:
+                conversion_errors.append((bagy_id, e))
+                continue
+            if not product_input:
+                continue
+            digest = input_hash(product_input)
+            previous = state["products"].get(bagy_id)
+            if previous and previous.get("hash") == digest:
+                unchanged += 1
+                continue
+            pending.append((bagy_id, product_input, digest, previous["id"] if previous else None))
+
+    # Produtos fora do estado que já estão na loja (execução interrompida antes de salvar): atualiza pelo GID
+    reconciled = 0
+    if any(item[3] is None for item in pending):
+        try:
+            with profiling.stage("handles"):
+                existing = fetch_existing_handles(client)
+        except ShopifyError as e:
+            print(f"❌ Erro ao listar os produtos da loja: {e}")
+            return
+        for index, (bagy_id, product_input, digest, product_id) in enumerate(pending):
+            if product_id is None and product_input["handle"] in existing:
+                pending[index] = (bagy_id, product_input, digest, existing[product_input["handle"]])
+                reconciled += 1
+
+    updates = sum(1 for item in pending if item[3])
+    print(f"\n📊 Produtos no arquivo: {len(products)}")
+    print(f"   ⏭️  Sem mudança desde o último envio: {unchanged}")
+    print(f"   📤 A criar: {len(pending) - updates}")
+    print(f"   🔄 A atualizar: {updates}"
+          f"{f' ({reconciled} já existiam na loja com o mesmo handle)' if reconciled else ''}")
+    if without_id:
+        print(f"   ⚠️  Sem ID da Bagy (ignorados): {without_id}")
+    if conversion_errors:
+        print(f"   ⚠️  Erro na conversão (ignorados): {len(conversion_errors)}")
+        for bagy_id, error in conversion_errors[:5]:
+            print(f"      - produto {bagy_id}: {error}")
+
+    if not pending:
+        print("\n🎉 Nada a enviar")
+        return
+    if args.dry_run:
+        print("\n🧪 MODO TESTE - nada foi enviado ao Shopify")
+        print(json.dumps(pending[0][1], ensure_ascii=False, indent=2)[:2000])
+        return
+
+    print(f"\n🚀 Enviando (até {args.workers} simultâneos, conforme os pontos de custo)...")
+    try:
+        with profiling.stage("upload"):
+            created, updated, failed = upload_products(client, pending, state, args.workers)
+    except ShopifyError as e:
+        save_state(state)
+        print(f"❌ Envio interrompido: {e}")
+        print("   Execute novamente para retomar de onde parou")
+        return
+
+    print(f"\n✅ Produtos criados: {created}")
+    print(f"🔄 Produtos atualizados: {updated}")
+    if failed:
+        print(f"⚠️  Falhas: {failed} (detalhes em {STATE_FILE}; serão reenviadas na próxima execução)")
+    print(f"🗂️  Mapeamento Bagy → Shopify em {STATE_FILE}")
+    print("🎉 Processo concluído!")
+
+if __name__ == "__main__":
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Envio antecipado das imagens do catálogo para o Shopify Files.
+
+Na importação do CSV (ou no productSet do 13) o Shopify baixa cada imagem do
+CDN da Bagy uma a uma, e produtos com muitas imagens estouram o tempo limite.
+Este script faz essa transferência antes:
+1. Junta as URLs de imagem de todos os produtos e variações de
+   imported/produtos.json, sem repetir (a mesma foto costuma aparecer no
+   produto e em várias variações)
+2. Em paralelo, baixa as imagens e as envia em lotes pelo upload
+   temporário do GraphQL (um stagedUploadsCreate, um POST no destino por
+   imagem e um fileCreate por lote); imagens com o mesmo conteúdo em URLs
+   diferentes são enviadas uma vez só
+3. Aguarda os arquivos ficarem prontos e grava em
+   imported/images_upload_state.json a URL da Bagy -> GID e URL no CDN do
+   Shopify. Esse arquivo é o cache: imagens já transferidas não são
+   baixadas nem enviadas de novo
+
+Depois, o 04 (e o 13) trocam as colunas de imagem pelas URLs do Shopify.
+
+SHOPIFY_BASE_URL permite rodar contra o simulador local (api_simulator.py).
+"""
+
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+import metrics
+import profiling
+from shopify_client import ShopifyClient, ShopifyError
+
+# Carrega as variáveis do arquivo .env
+load_dotenv()
+
+PRODUCTS_FILE = os.path.join("imported", "produtos.json")
+STATE_FILE = os.path.join("imported", "images_upload_state.json")
+# Imagens por stagedUploadsCreate/fileCreate: o custo de cada mutation não cresce com o lote
+UPLOAD_BATCH = 25
+DOWNLOAD_TIMEOUT = 60
+# Arquivos consultados por vez enquanto o Shopify processa os uploads
+STATUS_BATCH = 100
+FILE_POLL_INTERVAL = 2
+FILE_READY_TIMEOUT = 300
+
+STAGED_UPLOAD_MUTATION = """
+mutation($input: [StagedUploadInput!]!) {
+  stagedUploadsCreate(input: $input) {
+    stagedTargets { url resourceUrl parameters { name value } }
+    userErrors { field message }
+  }
+}
+"""
+
+FILE_CREATE_MUTATION = """
+mutation($files: [FileCreateInput!]!) {
+  fileCreate(files: $files) {
+    files { id fileStatus alt }
+    userErrors { field message code }
+  }
+}
+"""
+
+FILE_STATUS_QUERY = """
+query($ids: [ID!]!) {
+  nodes(ids: $ids) { id ... on MediaImage { fileStatus image { url } } }
+}
+"""
+
+def load_state():
+    """Carrega o cache de imagens já enviadas"""
+    if not os.path.exists(STATE_FILE):
+        return {"images": {}, "failed": {}}
+    with open(STATE_FILE, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    state.setdefault("images", {})
+    state.setdefault("failed", {})
+    return state
+
+def save_state(state):
+    """Salva o progresso de forma atômica"""
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, STATE_FILE)
+
+def collect_images(products):
+    """URLs de imagem do catálogo (produtos e variações), sem repetir. Retorna [(url, texto alternativo)]"""
+    seen = set()
+    images = []
+
+    def add(src, alt):
+        src = (src or "").strip()
+        if src and src not in seen:
+            seen.add(src)
+            images.append((src, alt))
+
+    for product in products:
+        name = product.get('name') or ''
+        for image in product.get('images') or []:
+            if isinstance(image, dict):
+                add(image.get('src'), image.get('alt') or name)
+        for variation in product.get('variations') or []:
+            variant_images = variation.get('images')
+            if isinstance(variant_images, list):
+                for image in variant_images:
+                    if isinstance(image, dict):
+                        add(image.get('src'), image.get('alt') or name)
+            elif isinstance(variant_images, str):
+                add(variant_images, name)
+    return images
+
+def download_session(pool_size):
+    """Sessão sem as credenciais do Shopify, para o CDN da Bagy e o destino dos uploads"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def staged_filename(src):
+    """Nome do arquivo no Shopify: o da URL, prefixado por um hash dela (muitas fotos se chamam 1.jpg)"""
+    name = os.path.basename(urlparse(src).path) or "imagem.jpg"
+    return f"{hashlib.sha1(src.encode('utf-8')).hexdigest()[:10]}-{name}"
+
+def check_user_errors(payload, operation):
+    errors = payload.get("userErrors") or []
+    if errors:
+        raise ShopifyError(f"{operation}: {errors}")
+
+def download_image(session, src):
+    """Baixa uma imagem. Retorna (bytes, tipo MIME)"""
+    response = session.get(src, timeout=DOWNLOAD_TIMEOUT)
+    if response.status_code != 200:
+        raise ShopifyError(f"Download HTTP {response.status_code}")
+    mime_type = (response.headers.get("Content-Type") or "").split(";")[0].strip()
+    if not mime_type.startswith("image/"):
+        mime_type = mimetypes.guess_type(staged_filename(src))[0] or "image/jpeg"
+    return response.content, mime_type
+
+def upload_batch(client, session, batch, contents, lock):
+    """Baixa um lote de imagens e o cria no Shopify Files com um stagedUploadsCreate e um fileCreate.
+    Retorna {url: (entrada do cache {id, sha1, url}, reaproveitada)} e {url: erro}"""
+    results, errors, new = {}, {}, []
+    for src, alt in batch:
+        try:
+            content, mime_type = download_image(session, src)
+        except (ShopifyError, requests.exceptions.RequestException) as e:
+            errors[src] = str(e)
+            continue
+        digest = hashlib.sha1(content).hexdigest()
+        # Mesmo conteúdo já enviado por outra URL (ou repetido no lote): reaproveita o arquivo
+        with lock:
+            known = contents.get(digest)
+            if known is None:
+                contents[digest] = {"id": None, "sha1": digest, "url": None}
+        if known is None:
+            new.append((src, alt, content, mime_type, digest))
+        else:
+            results[src] = (known, True)
+    if not new:
+        return results, errors
+
+    try:
+        data = client.graphql(STAGED_UPLOAD_MUTATION, {"input": [{
+            "resource": "IMAGE",
+            "filename": staged_filename(src),
+            "mimeType": mime_type,
+            "fileSize": str(len(content)),
+            "httpMethod": "POST"
+        } for src, alt, content, mime_type, digest in new]})
+        result = data.get("stagedUploadsCreate", {})
+        check_user_errors(result, "stagedUploadsCreate")
+
+        # O destino é um bucket externo: sem os cabeçalhos de autenticação do Shopify
+        for (src, alt, content, mime_type, digest), target in zip(new, result["stagedTargets"]):
+            fields = {parameter["name"]: parameter["value"] for parameter in target["parameters"]}
+            upload = session.post(target["url"], data=fields, timeout=DOWNLOAD_TIMEOUT,
+                                  files={"file": (staged_filename(src), content, mime_type)})
+            if upload.status_code not in (200, 201, 204):
+                raise ShopifyError(f"Falha no upload temporário: HTTP {upload.status_code}")
+
+        data = client.graphql(FILE_CREATE_MUTATION, {"files": [{
+            "originalSource": target["resourceUrl"],
+            "contentType": "IMAGE",
+            "alt": alt or ""
+        } for (src, alt, content, mime_type, digest), target in zip(new, result["stagedTargets"])]})
+        result = data.get("fileCreate", {})
+        check_user_errors(result, "fileCreate")
+    except (ShopifyError, requests.exceptions.RequestException) as e:
+        with lock:
+            for src, alt, content, mime_type, digest in new:
+                contents.pop(digest, None)
+                errors[src] = str(e)
+        return results, errors
+
+    with lock:
+        for (src, alt, content, mime_type, digest), created in zip(new, result["files"]):
+            contents[digest]["id"] = created["id"]
+            results[src] = (contents[digest], False)
+    return results, errors
+
+def upload_images(client, session, pending, state, workers):
+    """Envia as imagens em lotes de UPLOAD_BATCH, vários lotes em paralelo. Retorna (enviadas, reaproveitadas, falhas)"""
+    uploaded = reused = failed = done = 0
+    lock = threading.Lock()
+    contents = {entry["sha1"]: entry for entry in state["images"].values() if entry.get("sha1")}
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = []
+    try:
+        batches = [pending[start:start + UPLOAD_BATCH] for start in range(0, len(pending), UPLOAD_BATCH)]
+        futures = [executor.submit(upload_batch, client, session, batch, contents, lock) for batch in batches]
+        waiting = []  # Conteúdo repetido que outro lote ainda estava enviando
+        for future in as_completed(futures):
+            results, errors = future.result()
+            for src, (entry, shared) in results.items():
+                if not entry.get("id"):
+                    waiting.append((src, entry))
+                    continue
+                state["images"][src] = entry
+                state["failed"].pop(src, None)
+                if shared:
+                    reused += 1
+                else:
+                    uploaded += 1
+            state["failed"].update(errors)
+            failed += len(errors)
+
+            done += len(results) + len(errors)
+            save_state(state)
+            print(f"   📤 {done}/{len(pending)} imagens processadas ({failed} falhas)")
+
+        # Com todos os lotes concluídos, o conteúdo repetido já tem arquivo (ou o envio dele falhou)
+        for src, entry in waiting:
+            if not entry.get("id"):
+                # O lote dono falhou; outro lote pode ter enviado o mesmo conteúdo depois
+                entry = contents.get(entry["sha1"]) or entry
+            if entry.get("id"):
+                state["images"][src] = entry
+                state["failed"].pop(src, None)
+                reused += 1
+            else:
+                # O envio deste conteúdo falhou: a URL volta na próxima execução
+                state["failed"][src] = "arquivo com o mesmo conteúdo não foi criado"
+                failed += 1
+        if waiting:
+            save_state(state)
+    finally:
+        # Interrompido (Ctrl+C): descarta o que não começou e guarda o que já foi enviado
+        # (cancela um a um: shutdown(cancel_futures=True) só existe a partir do Python 3.9)
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+        save_state(state)
+    return uploaded, reused, failed
+
+def resolve_urls(client, state):
+    """Aguarda os arquivos enviados ficarem prontos e grava a URL do CDN do Shopify. Retorna quantas faltam"""
+    deadline = time.monotonic() + FILE_READY_TIMEOUT
+    while True:
+        sources_by_id = {}
+        for src, entry in state["images"].items():
+            if not entry.get("url"):
+                sources_by_id.setdefault(entry["id"], []).append(src)
+        if not sources_by_id or time.monotonic() > deadline:
+            return len(sources_by_id)
+
+        ids = list(sources_by_id)
+        for start in range(0, len(ids), STATUS_BATCH):
+            batch = ids[start:start + STATUS_BATCH]
+            nodes = client.graphql(FILE_STATUS_QUERY, {"ids": batch}, estimated_cost=len(batch)).get("nodes") or []
+            for file_id, node in zip(batch, nodes):
+                sources = sources_by_id[file_id]
+                if not node or node.get("fileStatus") == "FAILED":
+                    for src in sources:
+                        state["failed"][src] = "Shopify não conseguiu processar o arquivo"
+                        state["images"].pop(src, None)
+                elif node.get("fileStatus") == "READY" and (node.get("image") or {}).get("url"):
+                    for src in sources:
+                        state["images"][src]["url"] = node["image"]["url"]
+        save_state(state)
+
+        if any(not entry.get("url") for entry in state["images"].values()):
+            metrics.throttle_sleep(FILE_POLL_INTERVAL, "file_ready_poll")
+
+def main():
+    parser = argparse.ArgumentParser(description="Envia as imagens do catálogo da Bagy para o Shopify Files")
+    parser.add_argument("--workers", type=int, default=8, help="downloads/uploads simultâneos (padrão: 8)")
+    parser.add_argument("--file", default=PRODUCTS_FILE, help=f"JSON de produtos (padrão: {PRODUCTS_FILE})")
+    parser.add_argument("--limit", type=int, help="envia no máximo N imagens (para testes)")
+    parser.add_argument("--restart", action="store_true", help="ignora o cache e envia tudo de novo")
+    parser.add_argument("--dry-run", action="store_true", help="mostra o que seria enviado sem transferir nada")
+    args = parser.parse_args()
+
+    print("🖼️  ENVIO DE IMAGENS PARA O SHOPIFY FILES")
+    print("=" * 50)
+
+    if not os.path.exists(args.file):
+        print(f"❌ Arquivo {args.file} não encontrado. Execute primeiro o 01_export_products_from_bagy.py")
+        return
+
+    with profiling.stage("load"):
+        with open(args.file, "r", encoding="utf-8") as f:
+            products = [p for p in json.load(f) if p and p.get('name')]
+        images = collect_images(products)
+
+    state = {"images": {}, "failed": {}} if args.restart else load_state()
+    pending = [(src, alt) for src, alt in images if src not in state["images"]]
+    if args.limit:
+        pending = pending[:args.limit]
+
+    print(f"\n📊 Imagens distintas no catálogo: {len(images)}")
+    print(f"   ♻️  Já enviadas (cache): {len(images) - len(pending)}")
+    print(f"   📤 A enviar: {len(pending)}")
+
+    if args.dry_run:
+        print("\n🧪 MODO TESTE - nada foi enviado ao Shopify")
+        return
+
+    client = ShopifyClient(pool_size=args.workers)
+    session = download_session(args.workers)
+    uploaded = reused = failed = 0
+    try:
+        if pending:
+            print(f"\n🚀 Enviando ({args.workers} simultâneas)...")
+            with profiling.stage("upload"):
+                uploaded, reused, failed = upload_images(client, session, pending, state, args.workers)
+
+        print("\n⏳ Aguardando o Shopify processar os arquivos...")
+        with profiling.stage("resolve"):
+            waiting = resolve_urls(client, state)
+    except ShopifyError as e:
+        save_state(state)
+        print(f"❌ Envio interrompido: {e}")
+        print("   Execute novamente para retomar de onde parou")
+        return
+
+    ready = sum(1 for entry in state["images"].values() if entry.get("url"))
+    print(f"\n✅ Imagens enviadas: {uploaded}")
+    if reused:
+        print(f"♻️  Mesmo conteúdo de outra URL (arquivo reaproveitado): {reused}")
+    print(f"🌐 Imagens com URL do Shopify: {ready}")
+    if waiting:
+        print(f"⏳ Ainda em processamento: {waiting} (execute novamente para buscar as URLs)")
+    if failed:
+        print(f"⚠️  Falhas: {failed} (detalhes em {STATE_FILE}; serão reenviadas na próxima execução)")
+    print("➡️  Execute o 04_convert_products_to_shopify_csv.py para gravar as URLs do Shopify no CSV")
+    print("🎉 Processo concluído!")
+
+if __name__ == "__main__":
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Atualização completa do estoque do Shopify a partir dos saldos da Bagy.
+
+O CSV do 04 leva o estoque do momento da conversão (e 0 nos produtos
+simples); até a importação terminar o saldo já mudou. Esta etapa refaz só o
+estoque, sem reimportar nada:
+1. Lê os saldos atuais de todas as variações (e dos produtos simples) na Bagy
+2. Resolve cada SKU para o inventoryItem do Shopify por um índice em cache
+   (imported/inventory_index.json), montado listando todas as variantes da
+   loja em páginas de 250; SKUs novos são buscados pelo filtro sku:"..."
+3. Envia as quantidades com inventorySetQuantities, até 250 itens por
+   chamada e com concorrência limitada: um catálogo inteiro vira algumas
+   dezenas de chamadas
+
+Para acompanhar mudanças de preço e estoque continuamente, use o 10.
+BAGY_API_URL e SHOPIFY_BASE_URL permitem rodar contra o simulador local.
+"""
+
+import argparse
+import importlib
+import json
+import os
+from datetime import datetime
+import requests
+from dotenv import load_dotenv
+import metrics
+import profiling
+from shopify_client import ShopifyClient, ShopifyError, resolve_location_id
+
+# Carrega as variáveis do arquivo .env
+load_dotenv()
+
+sync = importlib.import_module("10_sync_price_stock_to_shopify")
+
+INDEX_FILE = os.path.join("imported", "inventory_index.json")
+
+ALL_VARIANTS_QUERY = """
+query($after: String) {
+  productVariants(first: 250, after: $after) {
+    nodes { id sku product { id } inventoryItem { id } }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
+
+def load_index():
+    """Índice SKU -> IDs do Shopify da última execução"""
+    if not os.path.exists(INDEX_FILE):
+        return {"built_at": None, "items": {}}
+    with open(INDEX_FILE, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    index.setdefault("items", {})
+    return index
+
+def save_index(index):
+    """Salva o índice de forma atômica"""
+    os.makedirs(os.path.dirname(INDEX_FILE), exist_ok=True)
+    tmp_path = f"{INDEX_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, INDEX_FILE)
+
+def build_index(client):
+    """Lista todas as variantes da loja (250 por página). Retorna SKU -> IDs no formato do índice do 10"""
+    items = {}
+    after = None
+    while True:
+        data = client.graphql(ALL_VARIANTS_QUERY, {"after": after}, estimated_cost=60)
+        page = data.get("productVariants") or {}
+        for node in page.get("nodes") or []:
+            if node.get("sku"):
+                items[node["sku"]] = {
+                    "variant_id": node["id"],
+                    "product_id": (node.get("product") or {}).get("id"),
+                    "inventory_item_id": (node.get("inventoryItem") or {}).get("id")
+                }
+        page_info = page.get("pageInfo") or {}
+        if not page_info.get("hasNextPage"):
+            return items
+        after = page_info.get("endCursor")
+
+def read_balances(products):
+    """SKU -> saldo atual (inteiro) das variações e produtos simples. Retorna (saldos, inválidos)"""
+    balances, invalid = {}, []
+    for product in products:
+        for variant in sync.extract_variants(product):
+            if variant["balance"] is None:
+                continue
+            balance = sync.parse_balance(variant["balance"])
+            if balance is None:
+                invalid.append(variant["sku"])
+            else:
+                balances[variant["sku"]] = balance
+    return balances, invalid
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza todo o estoque do Shopify com os saldos atuais da Bagy")
+    parser.add_argument("--workers", type=int, default=4, help="lotes enviados simultaneamente (padrão: 4)")
+    parser.add_argument("--location", help="ID da location de estoque no Shopify")
+    parser.add_argument("--refresh-index", action="store_true", help="lista de novo todas as variantes da loja")
+    parser.add_argument("--dry-run", action="store_true", help="resolve os SKUs sem enviar o estoque")
+    args = parser.parse_args()
+
+    print("📊 ATUALIZAÇÃO DE ESTOQUE BAGY → SHOPIFY")
+    print("=" * 50)
+
+    client = ShopifyClient(pool_size=args.workers)
+    index = {"built_at": None, "items": {}} if args.refresh_index else load_index()
+
+    try:
+        print("\n🔄 Lendo os saldos atuais na Bagy...")
+        with profiling.stage("bagy"):
+            products = sync.fetch_changed_products()
+            balances, invalid = read_balances(products)
+        print(f"📦 Produtos lidos: {len(products)} | SKUs com saldo: {len(balances)}")
+        if invalid:
+            print(f"⚠️  {len(invalid)} SKUs com saldo inválido ignorados (ex: {', '.join(invalid[:5])})")
+
+        with profiling.stage("index"):
+            if not index["items"]:
+                print("\n🔎 Montando o índice SKU → inventoryItem (todas as variantes da loja)...")
+                index = {"built_at": datetime.now().isoformat(timespec="seconds"), "items": build_index(client)}
+            else:
+                print(f"\n♻️  Índice em cache de {index['built_at']} ({len(index['items'])} SKUs)")
+            unresolved = sync.resolve_skus(client, set(balances), index["items"])
+            save_index(index)
+
+        location_id = None if args.dry_run else resolve_location_id(client, args.location)
+    except (ShopifyError, RuntimeError, requests.exceptions.RequestException) as e:
+        print(f"❌ {e}")
+        return
+
+    items = [dict(index["items"][sku], sku=sku, balance=balance) for sku, balance in balances.items()
+             if index["items"].get(sku, {}).get("inventory_item_id")]
+    batches = [items[start:start + sync.INVENTORY_BATCH] for start in range(0, len(items), sync.INVENTORY_BATCH)]
+    print(f"\n📤 {len(items)} itens em {len(batches)} chamadas de inventorySetQuantities"
+          f"{f' ({len(unresolved)} SKUs fora do Shopify)' if unresolved else ''}")
+
+    if args.dry_run:
+        print("🧪 MODO TESTE - nada foi enviado ao Shopify")
+        return
+
+    with profiling.stage("push"):
+        tasks = [(sync.push_stock_batch, client, location_id, batch) for batch in batches]
+        synced, failures = sync.run_parallel(tasks, args.workers)
+
+    print(f"\n✅ Estoques atualizados: {len(synced)}")
+    if failures:
+        print(f"⚠️  {failures} lotes falharam; execute novamente para reenviá-los "
+              f"(--refresh-index se variantes foram removidas da loja)")
+    print("🎉 Processo concluído!")
+
+if __name__ == "__main__":
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
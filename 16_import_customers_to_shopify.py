@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Criação dos clientes da Bagy no Shopify por uma operação em massa do GraphQL.
+
+O 02 só gera a planilha de clientes; o 08 precisa que eles já existam no
+Shopify para achá-los pelo email. Em vez de um POST por cliente:
+1. Lê os clientes do staging (ou do snapshot do 02) e grava um JSONL com
+   o input do customerCreate de cada um (converted/clientes_shopify.jsonl)
+2. Envia o arquivo pelo upload temporário (stagedUploadsCreate) e inicia
+   bulkOperationRunMutation com customerCreate: o Shopify cria todos os
+   clientes do lote em um único job
+3. Acompanha o job (node pelo ID da operação) e lê o JSONL de resultado em
+   fluxo, gravando o índice email -> ID do cliente no Shopify em
+   imported/customers_import_state.json (usado pelo 08)
+
+Clientes já criados em execuções anteriores são pulados; uma execução
+interrompida retoma o acompanhamento do job submetido.
+SHOPIFY_BASE_URL permite rodar contra o simulador local (api_simulator.py).
+"""
+
+import argparse
+import json
+import os
+import re
+import requests
+from dotenv import load_dotenv
+import metrics
+import profiling
+import staging
+from shopify_client import ShopifyClient, ShopifyError
+from snapshot import load_snapshot
+
+# Carrega as variáveis do arquivo .env
+load_dotenv()
+
+STATE_FILE = os.path.join("imported", "customers_import_state.json")
+JSONL_FILE = os.path.join("converted", "clientes_shopify.jsonl")
+# Clientes por operação (o JSONL de uma operação em massa aceita até 100 MB)
+BULK_CHUNK = 50000
+BULK_POLL_INTERVAL = 5
+EMAIL_TAKEN = "Email has already been taken"
+
+CUSTOMER_CREATE_MUTATION = """
+mutation call($input: CustomerInput!) {
+  customerCreate(input: $input) {
+    customer { id email }
+    userErrors { field message }
+  }
+}
+"""
+
+STAGED_UPLOAD_MUTATION = """
+mutation($input: [StagedUploadInput!]!) {
+  stagedUploadsCreate(input: $input) {
+    stagedTargets { url resourceUrl parameters { name value } }
+    userErrors { field message }
+  }
+}
+"""
+
+BULK_RUN_MUTATION = """
+mutation($mutation: String!, $stagedUploadPath: String!) {
+  bulkOperationRunMutation(mutation: $mutation, stagedUploadPath: $stagedUploadPath) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+# Consulta a operação pelo ID: currentBulkOperation passa a ser outra se a loja rodar outra mutation em massa
+BULK_OPERATION_QUERY = """
+query($id: ID!) {
+  node(id: $id) { ... on BulkOperation { id status errorCode objectCount url partialDataUrl } }
+}
+"""
+
+def load_state():
+    """Carrega o índice de clientes criados e a operação em andamento"""
+    if not os.path.exists(STATE_FILE):
+        return {"customers": {}, "existing": [], "failed": {}, "bulk_operation": None}
+    with open(STATE_FILE, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    state.setdefault("customers", {})
+    state.setdefault("existing", [])
+    state.setdefault("failed", {})
+    state.setdefault("bulk_operation", None)
+    return state
+
+def save_state(state):
+    """Salva o progresso de forma atômica"""
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, STATE_FILE)
+
+def load_customers():
+    """Clientes exportados pelo 02: do staging ou, sem ele, do snapshot"""
+    if staging.exists():
+        conn = staging.connect()
+        try:
+            if staging.count_rows(conn, "customers"):
+                return list(staging.iter_customers(conn))
+        finally:
+            conn.close()
+    records, _ = load_snapshot("clientes")
+    return list(records.values())
+
+def shopify_phone(phone):
+    """Telefone brasileiro no formato E.164 exigido pelo Shopify (None se não reconhecido)"""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    if digits.startswith("55") and len(digits) in (12, 13):
+        return f"+{digits}"
+    if len(digits) in (10, 11):
+        return f"+55{digits}"
+    return None
+
+def customer_input(customer, email):
+    """Input do customerCreate a partir de um cliente da Bagy"""
+    names = (customer.get("name") or "").split()
+    data = {
+        "email": email,
+        "firstName": names[0] if names else "",
+        "lastName": " ".join(names[1:]),
+        "note": f"Bagy ID: {customer.get('id')}",
+        "tags": ["bagy"]
+    }
+    phone = shopify_phone(customer.get("phone"))
+    if phone:
+        data["phone"] = phone
+
+    address = customer.get("address") or {}
+    if address.get("street"):
+        data["addresses"] = [{
+            "address1": ", ".join(str(part) for part in (address.get("street"), address.get("number")) if part),
+            "address2": " - ".join(str(part) for part in (address.get("detail"), address.get("district")) if part),
+            "city": address.get("city") or "",
+            "provinceCode": address.get("state") or "",
+            "zip": address.get("zipcode") or "",
+            "countryCode": "BR",
+            "firstName": data["firstName"],
+            "lastName": data["lastName"]
+        }]
+    return data
+
+def write_jsonl(path, inputs):
+    """Grava uma linha {"input": ...} por cliente"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for data in inputs:
+            f.write(json.dumps({"input": data}, ensure_ascii=False))
+            f.write("\n")
+
+def check_user_errors(payload, operation):
+    errors = payload.get("userErrors") or []
+    if errors:
+        raise ShopifyError(f"{operation}: {errors}")
+
+def stage_jsonl(client, path):
+    """Envia o JSONL para o armazenamento temporário do Shopify. Retorna o stagedUploadPath"""
+    data = client.graphql(STAGED_UPLOAD_MUTATION, {"input": [{
+        "resource": "BULK_MUTATION_VARIABLES",
+        "filename": os.path.basename(path),
+        "mimeType": "text/jsonl",
+        "httpMethod": "POST"
+    }]})
+    result = data.get("stagedUploadsCreate", {})
+    check_user_errors(result, "stagedUploadsCreate")
+    target = result["stagedTargets"][0]
+
+    # O destino é um bucket externo: sem os cabeçalhos de autenticação do Shopify
+    fields = {parameter["name"]: parameter["value"] for parameter in target["parameters"]}
+    with open(path, "rb") as f:
+        response = requests.post(target["url"], data=fields, timeout=300,
+                                 files={"file": (os.path.basename(path), f, "text/jsonl")})
+    if response.status_code not in (200, 201, 204):
+        raise ShopifyError(f"Falha no upload do JSONL: HTTP {response.status_code}")
+    return fields["key"]
+
+def submit_bulk(client, staged_path):
+    """Inicia a operação em massa com customerCreate. Retorna o ID da operação"""
+    data = client.graphql(BULK_RUN_MUTATION, {"mutation": CUSTOMER_CREATE_MUTATION, "stagedUploadPath": staged_path})
+    result = data.get("bulkOperationRunMutation", {})
+    check_user_errors(result, "bulkOperationRunMutation")
+    return result["bulkOperation"]["id"]
+
+def wait_for_bulk(client, operation_id):
+    """Aguarda o fim da operação em massa. Retorna o status final"""
+    while True:
+        operation = client.graphql(BULK_OPERATION_QUERY, {"id": operation_id}, estimated_cost=1).get("node")
+        if not operation:
+            raise ShopifyError(f"Operação {operation_id} não encontrada na loja")
+        if operation.get("status") in ("COMPLETED", "FAILED", "CANCELED", "EXPIRED"):
+            return operation
+        metrics.throttle_sleep(BULK_POLL_INTERVAL, "bulk_operation_poll")
+
+def read_results(url):
+    """Linhas do JSONL de resultado, lidas em fluxo: (número da linha de entrada, resultado do customerCreate)"""
+    with requests.get(url, stream=True, timeout=300) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                result = json.loads(line)
+                yield result.get("__lineNumber"), (result.get("data") or {}).get("customerCreate") or {}
+
+def finish_bulk(client, state):
+    """Conclui a operação registrada no estado e grava o índice. Retorna (criados, já existentes, falhas)"""
+    current = state["bulk_operation"]
+    operation = wait_for_bulk(client, current["id"])
+    emails = current["emails"]
+    created = existing = failed = 0
+
+    url = operation.get("url") or operation.get("partialDataUrl")
+    if url:
+        for line_number, result in read_results(url):
+            email = emails[line_number]
+            customer = result.get("customer")
+            errors = result.get("userErrors") or []
+            if customer:
+                state["customers"][email] = customer["id"]
+                state["failed"].pop(email, None)
+                created += 1
+            elif any(error.get("message") == EMAIL_TAKEN for error in errors):
+                state["existing"].append(email)
+                state["failed"].pop(email, None)
+                existing += 1
+            else:
+                state["failed"][email] = errors
+                failed += 1
+    if operation.get("status") != "COMPLETED":
+        print(f"   ⚠️  Operação {current['id']} terminou como {operation.get('status')} "
+              f"({operation.get('errorCode')}); os clientes sem resultado serão reenviados")
+
+    state["bulk_operation"] = None
+    save_state(state)
+    print(f"   ✅ Operação {current['id']}: {created} criados, {existing} já existiam, {failed} falhas")
+    return created, existing, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Cria os clientes da Bagy no Shopify com uma operação em massa")
+    parser.add_argument("--limit", type=int, help="envia no máximo N clientes (para testes)")
+    parser.add_argument("--restart", action="store_true", help="ignora o progresso salvo e começa do zero")
+    parser.add_argument("--dry-run", action="store_true", help="gera o JSONL sem enviar nada")
+    args = parser.parse_args()
+
+    print("👥 IMPORTAÇÃO DE CLIENTES PARA O SHOPIFY (operação em massa)")
+    print("=" * 50)
+
+    with profiling.stage("load"):
+        customers = load_customers()
+    if not customers:
+        print("❌ Nenhum cliente encontrado. Execute primeiro o 02_export_customers_from_bagy.py")
+        return
+
+    client = ShopifyClient()
+    state = {"customers": {}, "existing": [], "failed": {}, "bulk_operation": None} if args.restart else load_state()
+    totals = [0, 0, 0]
+
+    try:
+        if state["bulk_operation"] and not args.dry_run:
+            print(f"\n♻️  Retomando a operação {state['bulk_operation']['id']}...")
+            totals = [a + b for a, b in zip(totals, finish_bulk(client, state))]
+    except (ShopifyError, requests.exceptions.RequestException) as e:
+        print(f"❌ {e}")
+        return
+
+    # Um cliente por email (o Shopify não aceita emails repetidos)
+    done = set(state["customers"]) | set(state["existing"])
+    pending, seen, invalid = [], set(), 0
+    for customer in customers:
+        email = (customer.get("email") or "").strip().lower()
+        if "@" not in email:
+            invalid += 1
+            continue
+        if email in seen or email in done:
+            continue
+        seen.add(email)
+        pending.append((email, customer))
+    if args.limit:
+        pending = pending[:args.limit]
+
+    print(f"\n📊 Clientes exportados: {len(customers)}")
+    print(f"   ♻️  Já no Shopify (execuções anteriores): {len(done)}")
+    if invalid:
+        print(f"   ⚠️  Sem email válido (ignorados): {invalid}")
+    print(f"   📤 A criar: {len(pending)}")
+
+    if not pending:
+        print("\n🎉 Nada a enviar")
+        return
+
+    try:
+        for start in range(0, len(pending), BULK_CHUNK):
+            chunk = pending[start:start + BULK_CHUNK]
+            with profiling.stage("jsonl"):
+                write_jsonl(JSONL_FILE, (customer_input(customer, email) for email, customer in chunk))
+            if args.dry_run:
+                print(f"\n🧪 MODO TESTE - {JSONL_FILE} gerado com {len(chunk)} clientes, nada foi enviado")
+                return
+
+            with profiling.stage("bulk"):
+                operation_id = submit_bulk(client, stage_jsonl(client, JSONL_FILE))
+                # Registrada antes de aguardar: se a execução cair, a próxima só acompanha esta operação
+                state["bulk_operation"] = {"id": operation_id, "emails": [email for email, _ in chunk]}
+                save_state(state)
+                print(f"\n📤 Lote {start // BULK_CHUNK + 1}: operação {operation_id} com {len(chunk)} clientes")
+                totals = [a + b for a, b in zip(totals, finish_bulk(client, state))]
+    except (ShopifyError, requests.exceptions.RequestException) as e:
+        save_state(state)
+        print(f"❌ Importação interrompida: {e}")
+        print("   Execute novamente para retomar de onde parou")
+        return
+
+    created, existing, failed = totals
+    print(f"\n✅ Clientes criados: {created}")
+    if existing:
+        print(f"♻️  Já existiam no Shopify: {existing}")
+    if failed:
+        print(f"⚠️  Falhas: {failed} (detalhes em {STATE_FILE}; serão reenviadas na próxima execução)")
+    print(f"🗂️  Índice email → cliente Shopify em {STATE_FILE}")
+    print("🎉 Processo concluído!")
+
+if __name__ == "__main__":
+    metrics.instrument(__file__)
+    profiling.run(main, __file__)
@@ -0,0 +1,1063 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulador local das APIs da Bagy (Dooca) e do Shopify.
+
+Serve dados sintéticos nos endpoints usados pelos scripts, para medir
+concorrência e rate limit sem credenciais reais:
+- Bagy: /products, /customers, /customers/<id>, /discounts,
+  /cashbacks/customers/balances (paginação page/limit, meta e links;
+  fields=id,name,variations.sku devolve só esses campos)
+- Shopify: price_rules.json, price_rules/<id>/discount_codes.json,
+  customers/search.json, products.json e redirects.json (listagem
+  paginada por page_info; criação com 422 para path repetido)
+- Shopify GraphQL (graphql.json): productSet (cria ou atualiza o produto,
+  com handle único como na loja), products (id e handle, paginado), productVariants (busca por sku:"..." ou
+  listagem paginada), productVariantsBulkUpdate, inventorySetQuantities
+  (até 250 itens), urlRedirectImportCreate/Submit + urlRedirectImport
+  (importação de redirects pelo CSV do upload temporário; paths sem barra
+  inicial falham), bulkOperationRunMutation com customerCreate (lê o JSONL
+  do upload temporário; currentBulkOperation e node(id:) informam o status e a
+  URL do resultado em /bulk-results/<id>.jsonl), stagedUploadsCreate + fileCreate (o
+  arquivo é enviado para /staged-uploads/<chave> neste mesmo servidor e
+  fica READY, com URL de CDN, pouco depois), nodes (status dos arquivos) e
+  locations, sob um limite de custo em pontos por token:
+  extensions.cost.throttleStatus em toda resposta e erro THROTTLED quando
+  os pontos acabam
+- CDN de imagens: GET /cdn/<caminho> devolve bytes de imagem determinísticos
+  (para testar downloads apontando as imagens do catálogo para cá)
+- Vitrine: HEAD/GET em paths com redirect respondem 301 (Location para o
+  destino), /products/<handle> responde 200 se o produto existe no Shopify
+  e as coleções automáticas (/collections/types e /collections/vendors) 200
+
+Recursos de carga:
+- latência configurável (--latency/--jitter, em ms)
+- leaky bucket do Shopify por token (40 requisições, vazão de 2/s),
+  com o cabeçalho X-Shopify-Shop-Api-Call-Limit e 429 ao estourar
+- injeção de falhas: --error-rate (500/502/503) e --throttle-rate (429)
+
+Uso:
+    python api_simulator.py --port 8080 --products 1000 --latency 80
+    BAGY_API_URL=http://127.0.0.1:8080 SHOPIFY_BASE_URL=http://127.0.0.1:8080 \\
+        python 01_export_products_from_bagy.py
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from email.parser import BytesParser
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+
+COLORS = ["Azul", "Verde", "Preto", "Branco", "Rosa", "Vermelho", "Amarelo", "Cinza"]
+SIZES = ["P", "M", "G", "GG", "XG"]
+WORDS = [
+    "Vestido", "Blusa", "Saia", "Calça", "Camisa", "Macacão", "Short", "Casaco",
+    "Linho", "Algodão", "Seda", "Viscose", "Floral", "Listrado", "Básico", "Midi",
+    "Longo", "Curto", "Manga", "Decote", "Bordado", "Estampado", "Liso", "Tricô"
+]
+STORE_URL = "https://www.asmanhas.com.br"
+IMAGE_CDN = "https://cdn.dooca.store/fake"
+MUTATION_COST = 10
+# Tempo até um arquivo criado pelo fileCreate ficar READY
+FILE_PROCESSING_SECONDS = 0.2
+# Tempo de processamento de cada linha de uma operação em massa
+BULK_SECONDS_PER_LINE = 0.0002
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+def _timestamp(base, rng):
+    return (base - timedelta(minutes=rng.randint(0, 60 * 24 * 365))).strftime("%Y-%m-%d %H:%M:%S")
+
+def _description(rng, name):
+    paragraphs = [
+        f"<p>{' '.join(rng.choice(WORDS).lower() for _ in range(rng.randint(20, 60)))}.</p>"
+        for _ in range(rng.randint(1, 4))
+    ]
+    return (f"<style>.desc{{color:#333}}</style><div class=\"desc\"><h2>{name}</h2>"
+            + "".join(paragraphs)
+            + "<ul><li>Composição: 100% algodão</li><li>Lavar à mão</li></ul></div>")
+
+def generate_products(count, seed=42):
+    """Catálogo sintético no formato de /products da Bagy"""
+    rng = random.Random(seed)
+    now = datetime(2025, 6, 1)
+    products = []
+
+    for product_id in range(1, count + 1):
+        name = f"{' '.join(rng.sample(WORDS, rng.randint(2, 4)))} {product_id}"
+        slug = f"{slugify(name)}"
+        price = round(rng.uniform(39, 499), 2)
+        sku = f"BG{product_id:06d}"
+        images = [
+            {"src": f"{IMAGE_CDN}/{product_id}/{position}.jpg", "position": position, "alt": ""}
+            for position in range(1, rng.randint(1, 6) + 1)
+        ]
+
+        variations = []
+        if rng.random() < 0.7:
+            colors = rng.sample(COLORS, rng.randint(1, 3))
+            sizes = SIZES[:rng.randint(1, len(SIZES))]
+            for color in colors:
+                for size in sizes:
+                    variations.append({
+                        "sku": f"{sku}-{slugify(color)[:3].upper()}-{size}",
+                        "price": price,
+                        "price_compare": round(price * 1.2, 2) if rng.random() < 0.3 else None,
+                        "balance": rng.randint(0, 50),
+                        "color": {"name": color},
+                        "attribute": {"name": size, "attribute_name": "Tamanho"},
+                        "images": [{"src": f"{IMAGE_CDN}/{product_id}/{slugify(color)}.jpg"}] if rng.random() < 0.5 else [],
+                        "url": f"{STORE_URL}/{slug}?cor={slugify(color)}&tamanho={size.lower()}"
+                    })
+            rng.shuffle(variations)
+
+        products.append({
+            "id": product_id,
+            "name": name,
+            "sku": sku,
+            "reference": f"REF{product_id:06d}",
+            "url": f"{STORE_URL}/{slug}",
+            "description": _description(rng, name),
+            "active": rng.random() < 0.9,
+            "price": price,
+            "price_compare": round(price * 1.3, 2) if rng.random() < 0.2 else None,
+            "weight": round(rng.uniform(0.1, 2.0), 3),
+            "brand": {"name": rng.choice(["Manhas", "Atelier", "Basic Co"])},
+            "category_default": {"name": rng.choice(["Vestidos", "Blusas", "Calças", "Saias"])},
+            "meta_title": "",
+            "meta_description": "",
+            "meta_keywords": ", ".join(rng.sample(WORDS, 3)).lower(),
+            "images": images,
+            "variations": variations,
+            "created_at": _timestamp(now, rng),
+            "updated_at": _timestamp(now, rng)
+        })
+        if not variations:
+            # Produto simples: o saldo fica no próprio produto (sem usar o rng, para não mudar o resto do catálogo)
+            products[-1]["balance"] = product_id % 31
+
+    return products
+
+def generate_customers(count, seed=42):
+    """Clientes sintéticos no formato de /customers da Bagy"""
+    rng = random.Random(seed + 1)
+    now = datetime(2025, 6, 1)
+    return [
+        {
+            "id": customer_id,
+            "name": f"Cliente {customer_id}",
+            "email": f"cliente{customer_id}@example.com",
+            "cgc": f"{rng.randint(10**10, 10**11 - 1)}",
+            "phone": f"119{rng.randint(10**7, 10**8 - 1)}",
+            "birthday": f"19{rng.randint(60, 99)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+            "gender": rng.choice(["F", "M"]),
+            "address": {
+                "city": "São Paulo", "state": "SP", "zipcode": f"0{rng.randint(1000000, 9999999)}",
+                "street": "Rua Exemplo", "number": str(rng.randint(1, 999)), "detail": "",
+                "district": "Centro"
+            },
+            "created_at": _timestamp(now, rng),
+            "updated_at": _timestamp(now, rng)
+        }
+        for customer_id in range(1, count + 1)
+    ]
+
+def generate_discounts(count, seed=42):
+    """Cupons sintéticos no formato de /discounts da Bagy"""
+    rng = random.Random(seed + 2)
+    now = datetime(2025, 6, 1)
+    return [
+        {
+            "id": discount_id,
+            "name": f"Cupom {discount_id}",
+            "code": f"CUPOM{discount_id:04d}" if rng.random() < 0.9 else None,
+            "date_from": "2025-01-01 00:00:00",
+            "date_to": "2025-12-31 23:59:59",
+            "single_usage": rng.random() < 0.3,
+            "usage_limit": rng.choice([None, 100, 500]),
+            "min_purchase": rng.choice([0, 100, 200]),
+            "max_purchase": None,
+            "min_quantity": None,
+            "max_quantity": None,
+            "type": "order",
+            "value_type": rng.choice(["percentage", "fixed"]),
+            "value": rng.choice([5, 10, 15, 20, 50]),
+            "coupon_allow_free_freight": False,
+            "is_free_freight": rng.random() < 0.1,
+            "prerequisite_customer_id": None,
+            "prerequisite_customer_group_id": None,
+            "prerequisite_quantity": None,
+            "prerequisite_category_ids": [],
+            "prerequisite_product_ids": [],
+            "entitled_quantity": None,
+            "entitled_category_ids": [],
+            "entitled_product_ids": [],
+            "fixed_freight_options": [],
+            "zipcodes": [],
+            "active": rng.random() < 0.8,
+            "created_at": _timestamp(now, rng),
+            "updated_at": _timestamp(now, rng)
+        }
+        for discount_id in range(1, count + 1)
+    ]
+
+def generate_balances(customers, ratio=0.3, seed=42):
+    """Saldos de cashback para uma fração dos clientes"""
+    rng = random.Random(seed + 3)
+    return [
+        {
+            "customer_id": customer["id"],
+            "balance": round(rng.uniform(1, 150), 2),
+            "next_expiration": "2025-12-31 23:59:59",
+            "next_release": None
+        }
+        for customer in customers if rng.random() < ratio
+    ]
+
+class LeakyBucket:
+    """Leaky bucket do Shopify: capacidade fixa, vaza leak_rate requisições por segundo"""
+
+    def __init__(self, capacity=40, leak_rate=2.0):
+        self.capacity = capacity
+        self.leak_rate = leak_rate
+        self.level = 0.0
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Tenta ocupar uma posição. Retorna (aceito, nível atual)"""
+        now = time.monotonic()
+        self.level = max(0.0, self.level - (now - self.updated) * self.leak_rate)
+        self.updated = now
+        if self.level + 1 > self.capacity:
+            return False, int(self.level)
+        self.level += 1
+        return True, int(round(self.level))
+
+class CostBucket:
+    """Limite de custo do GraphQL do Shopify: pontos que se recuperam restore_rate por segundo"""
+
+    def __init__(self, maximum=1000.0, restore_rate=50.0):
+        self.maximum = maximum
+        self.restore_rate = restore_rate
+        self.available = maximum
+        self.updated = time.monotonic()
+
+    def take(self, cost):
+        """Tenta gastar os pontos de uma consulta. Retorna (aceito, throttleStatus)"""
+        now = time.monotonic()
+        self.available = min(self.maximum, self.available + (now - self.updated) * self.restore_rate)
+        self.updated = now
+        accepted = self.available >= cost
+        if accepted:
+            self.available -= cost
+        return accepted, {"maximumAvailable": self.maximum, "currentlyAvailable": round(self.available, 1),
+                          "restoreRate": self.restore_rate}
+
+class SimulatorState:
+    """Dados sintéticos, configuração de carga e contadores do simulador"""
+
+    def __init__(self, products=200, customers=200, discounts=50, seed=42, latency=0.0, jitter=0.0,
+                 error_rate=0.0, throttle_rate=0.0, bucket_size=40, leak_rate=2.0, shopify_ratio=0.8,
+                 cost_maximum=1000.0, cost_restore_rate=50.0):
+        self.products = generate_products(products, seed)
+        self.customers = generate_customers(customers, seed)
+        self.discounts = generate_discounts(discounts, seed)
+        self.balances = generate_balances(self.customers, seed=seed)
+        self.customers_by_id = {c["id"]: c for c in self.customers}
+
+        # Parte do catálogo e dos clientes já "migrada" para o Shopify
+        rng = random.Random(seed + 4)
+        self.shopify_products = [
+            {"id": 9000000 + p["id"], "title": p["name"], "handle": slugify(p["name"]),
+             "status": "active", "created_at": p["created_at"], "updated_at": p["updated_at"]}
+            for p in self.products if rng.random() < shopify_ratio
+        ]
+        self.shopify_customers = {
+            c["email"]: {"id": 7000000 + c["id"], "email": c["email"]}
+            for c in self.customers if rng.random() < shopify_ratio
+        }
+        self.price_rules = {}
+        self.discount_codes = {}
+        self.redirects = {}
+        self.handles = {p["handle"] for p in self.shopify_products}
+        # Variações dos produtos já no Shopify: SKU -> variante (preço e estoque na location do simulador)
+        self.variants_by_sku = {}
+        self.inventory_items = {}
+        self.next_variant_id = 8000000
+        by_id = {p["id"]: p for p in self.products}
+        for record in self.shopify_products:
+            product = by_id[record["id"] - 9000000]
+            for variation in product.get("variations") or [product]:
+                self.add_variant(f"gid://shopify/Product/{record['id']}", variation.get("sku"),
+                                 variation.get("price", product.get("price")), variation.get("price_compare"),
+                                 variation.get("balance") or 0)
+        # Produtos criados pelo productSet: GID -> input recebido
+        self.product_sets = {}
+        # Uploads temporários (chave -> conteúdo recebido) e arquivos do Files (GID -> dados)
+        self.staged_uploads = {}
+        self.files = {}
+        # Operações em massa (GID -> operação) e os JSONL de resultado
+        self.bulk_operations = {}
+        self.bulk_results = {}
+        # Importações de redirects (GID -> linhas do CSV e contagens)
+        self.redirect_imports = {}
+
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.bucket_size = bucket_size
+        self.leak_rate = leak_rate
+        self.buckets = {}
+        self.cost_maximum = cost_maximum
+        self.cost_restore_rate = cost_restore_rate
+        self.cost_buckets = {}
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed + 5)
+        self.next_id = 5000000
+
+    def add_variant(self, product_gid, sku, price=None, compare_at=None, available=0):
+        """Registra uma variante (sem SKU não entra no índice, como na busca do Shopify)"""
+        if not sku:
+            return None
+        self.next_variant_id += 1
+        variant = {
+            "id": f"gid://shopify/ProductVariant/{self.next_variant_id}", "sku": str(sku),
+            "product": {"id": product_gid},
+            "inventoryItem": {"id": f"gid://shopify/InventoryItem/{self.next_variant_id}"},
+            "price": None if price is None else str(price),
+            "compareAtPrice": None if compare_at is None else str(compare_at), "available": available
+        }
+        self.variants_by_sku[variant["sku"]] = variant
+        self.inventory_items[variant["inventoryItem"]["id"]] = variant
+        return variant
+
+    def new_id(self):
+        with self.lock:
+            self.next_id += 1
+            return self.next_id
+
+    def take_bucket(self, token):
+        with self.lock:
+            bucket = self.buckets.setdefault(token, LeakyBucket(self.bucket_size, self.leak_rate))
+            return bucket.take()
+
+    def take_cost(self, token, cost):
+        with self.lock:
+            bucket = self.cost_buckets.setdefault(token, CostBucket(self.cost_maximum, self.cost_restore_rate))
+            return bucket.take(cost)
+
+    def roll(self, rate):
+        with self.lock:
+            return self.rng.random() < rate
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+def _sort_records(records, sort):
+    if not sort:
+        return records
+    field_name = sort.lstrip("-")
+    return sorted(records, key=lambda r: (r.get(field_name) is None, r.get(field_name) or 0),
+                  reverse=sort.startswith("-"))
+
+def select_fields(record, fields):
+    """Só os campos pedidos em ?fields= (aninhados com ponto: variations.sku)"""
+    top, nested = [], {}
+    for field in fields:
+        name, _, child = field.partition(".")
+        if child:
+            nested.setdefault(name, []).append(child)
+        else:
+            top.append(name)
+
+    selected = {name: record[name] for name in top if name in record}
+    for name, children in nested.items():
+        value = record.get(name)
+        if isinstance(value, list):
+            selected[name] = [select_fields(item, children) if isinstance(item, dict) else item for item in value]
+        elif isinstance(value, dict):
+            selected[name] = select_fields(value, children)
+        elif name in record:
+            selected[name] = value
+    return selected
+
+def paginate_bagy(records, query, base_url):
+    """Página no formato da Dooca: data + meta (last_page, total) + links (next)"""
+    page = max(1, int(query.get("page", ["1"])[0]))
+    limit = min(100, max(1, int(query.get("limit", ["20"])[0])))
+    ordered = _sort_records(records, query.get("sort", [None])[0])
+
+    total = len(ordered)
+    last_page = max(1, -(-total // limit))
+    chunk = ordered[(page - 1) * limit:page * limit]
+    if query.get("fields"):
+        chunk = [select_fields(record, query["fields"][0].split(",")) for record in chunk]
+    next_query = {k: v[0] for k, v in query.items()}
+    next_query["page"] = page + 1
+
+    return {
+        "data": chunk,
+        "meta": {"current_page": page, "last_page": last_page, "per_page": limit, "total": total},
+        "links": {"next": f"{base_url}?{urlencode(next_query)}" if page < last_page else None}
+    }
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Sem isso o Nagle soma ~40ms a cada resposta em conexões keep-alive
+    disable_nagle_algorithm = True
+    server_version = "BagyShopifySimulator/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+        self.state.count(f"{self.command} {self._route_name()} {status}")
+
+    def _route_name(self):
+        path = urlparse(self.path).path
+        return re.sub(r"/\d+", "/{id}", re.sub(r"/admin/api/[^/]+", "/admin/api/{ver}", path))
+
+    def _read_json(self):
+        if not self.body:
+            return {}
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return {}
+
+    def _simulate_network(self):
+        """Aplica latência e falhas injetadas. Retorna True se a requisição já foi respondida"""
+        if self.state.latency or self.state.jitter:
+            time.sleep(max(0.0, self.state.latency + self.state.rng.uniform(-self.state.jitter, self.state.jitter)) / 1000)
+
+        if self.state.roll(self.state.error_rate):
+            self._send_json(self.state.rng.choice([500, 502, 503]), {"errors": "Falha simulada"})
+            return True
+        if self.state.roll(self.state.throttle_rate):
+            self._send_json(429, {"errors": "Exceeded rate limit (simulado)"}, {"Retry-After": "1.0"})
+            return True
+        return False
+
+    def _handle(self):
+        # O corpo é sempre consumido: respostas de erro sem lê-lo corromperiam a conexão keep-alive
+        self.body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self._simulate_network():
+            return
+
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        path = parsed.path.rstrip("/")
+
+        if path.startswith("/admin/api/"):
+            self._handle_shopify(path, query)
+        elif path.startswith("/cdn/"):
+            self._handle_cdn(path)
+        elif path.startswith("/staged-uploads/"):
+            self._handle_staged_upload(path)
+        elif path.startswith("/bulk-results/"):
+            self._handle_bulk_result(path)
+        elif self.command == "HEAD" or path in self.state.redirects or path.startswith("/products/"):
+            self._handle_storefront(path)
+        else:
+            self._handle_bagy(path, query)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_HEAD = _handle
+
+    # --- Vitrine ------------------------------------------------------------
+
+    def _handle_storefront(self, path):
+        redirect = self.state.redirects.get(path)
+        if redirect:
+            status, headers = 301, {"Location": f"http://{self.headers.get('Host')}{redirect['target']}"}
+        elif (path.startswith("/products/") and path[len("/products/"):] in self.state.handles) \
+                or path in ("/collections/types", "/collections/vendors"):
+            status, headers = 200, {}
+        else:
+            status, headers = 404, {}
+
+        body = b"" if status == 301 else f"<html><body>{status}</body></html>".encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+        self.state.count(f"{self.command} storefront {status}")
+
+    # --- CDN e uploads temporários -----------------------------------------
+
+    def _send_bytes(self, status, body, content_type, route):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+        self.state.count(f"{self.command} {route} {status}")
+
+    def _handle_cdn(self, path):
+        """Imagem falsa (cabeçalho JPEG + bytes derivados do path, ~20 KB)"""
+        seed = hashlib.sha1(path.encode("utf-8")).digest()
+        self._send_bytes(200, b"\xff\xd8\xff\xe0" + seed * 1000 + b"\xff\xd9", "image/jpeg", "cdn")
+
+    def _handle_staged_upload(self, path):
+        """Destino do upload de um stagedUploadsCreate (no Shopify real, um bucket externo)"""
+        key = path[len("/staged-uploads/"):]
+        # Formulário multipart: guarda só o conteúdo do campo file
+        form = BytesParser().parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode("utf-8") + self.body)
+        content = next((part.get_payload(decode=True) for part in form.walk()
+                        if part.get_param("name", header="content-disposition") == "file"), b"")
+        with self.state.lock:
+            known = key in self.state.staged_uploads
+            if known and self.command == "POST":
+                self.state.staged_uploads[key] = content
+        status = 204 if known and self.command == "POST" else 404
+        self._send_bytes(status, b"", "text/plain", "staged-upload")
+
+    def _handle_bulk_result(self, path):
+        with self.state.lock:
+            body = self.state.bulk_results.get(path[len("/bulk-results/"):])
+        if body is None:
+            self._send_bytes(404, b"", "text/plain", "bulk-result")
+        else:
+            self._send_bytes(200, body, "application/jsonl", "bulk-result")
+
+    # --- Bagy ---------------------------------------------------------------
+
+    def _handle_bagy(self, path, query):
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            self._send_json(401, {"message": "Unauthenticated."})
+            return
+        if self.command != "GET":
+            self._send_json(405, {"message": "Method not allowed"})
+            return
+
+        base_url = f"http://{self.headers.get('Host')}{path}"
+        collections = {
+            "/products": self.state.products,
+            "/customers": self.state.customers,
+            "/discounts": self.state.discounts,
+            "/cashbacks/customers/balances": self.state.balances,
+        }
+
+        if path in collections:
+            self._send_json(200, paginate_bagy(collections[path], query, base_url))
+            return
+
+        match = re.fullmatch(r"/customers/(\d+)", path)
+        if match:
+            customer = self.state.customers_by_id.get(int(match.group(1)))
+            if customer:
+                self._send_json(200, customer)
+            else:
+                self._send_json(404, {"message": "Not found"})
+            return
+
+        self._send_json(404, {"message": "Not found"})
+
+    # --- Shopify ------------------------------------------------------------
+
+    def _handle_shopify(self, path, query):
+        token = self.headers.get("X-Shopify-Access-Token")
+        if not token:
+            self._send_json(401, {"errors": "[API] Invalid API key or access token"})
+            return
+
+        resource = re.sub(r"^/admin/api/[^/]+/", "", path)
+        if resource == "graphql.json":
+            self._handle_graphql(token)
+            return
+
+        accepted, level = self.state.take_bucket(token)
+        limit_header = {"X-Shopify-Shop-Api-Call-Limit": f"{level}/{self.state.bucket_size}"}
+        if not accepted:
+            limit_header["Retry-After"] = "1.0"
+            self._send_json(429, {"errors": "Exceeded 2 calls per second for api client. Reduce request rates to resume uninterrupted service."}, limit_header)
+            return
+
+        if resource == "price_rules.json":
+            if self.command == "POST":
+                price_rule = dict(self._read_json().get("price_rule") or {})
+                price_rule["id"] = self.state.new_id()
+                with self.state.lock:
+                    self.state.price_rules[price_rule["id"]] = price_rule
+                self._send_json(201, {"price_rule": price_rule}, limit_header)
+            else:
+                with self.state.lock:
+                    rules = list(self.state.price_rules.values())
+                self._send_json(200, {"price_rules": rules[:int(query.get("limit", ["50"])[0])]}, limit_header)
+            return
+
+        match = re.fullmatch(r"price_rules/(\d+)/discount_codes\.json", resource)
+        if match and self.command == "POST":
+            price_rule_id = int(match.group(1))
+            code = (self._read_json().get("discount_code") or {}).get("code")
+            with self.state.lock:
+                exists = price_rule_id in self.state.price_rules
+                duplicated = code in self.state.discount_codes
+                if exists and not duplicated:
+                    self.state.discount_codes[code] = price_rule_id
+            if not exists:
+                self._send_json(404, {"errors": "Not Found"}, limit_header)
+            elif duplicated:
+                self._send_json(422, {"errors": {"code": ["must be unique"]}}, limit_header)
+            else:
+                discount_code = {"id": self.state.new_id(), "price_rule_id": price_rule_id, "code": code}
+                self._send_json(201, {"discount_code": discount_code}, limit_header)
+            return
+
+        if resource == "customers/search.json":
+            email = query.get("query", [""])[0].replace("email:", "").strip().lower()
+            customer = self.state.shopify_customers.get(email)
+            self._send_json(200, {"customers": [customer] if customer else []}, limit_header)
+            return
+
+        if resource == "products.json":
+            limit = min(250, int(query.get("limit", ["50"])[0]))
+            offset = int(query.get("page_info", ["0"])[0] or 0)
+            chunk = self.state.shopify_products[offset:offset + limit]
+            headers = dict(limit_header)
+            if offset + limit < len(self.state.shopify_products):
+                next_url = f"http://{self.headers.get('Host')}{path}?{urlencode({'limit': limit, 'page_info': offset + limit})}"
+                headers["Link"] = f'<{next_url}>; rel="next"'
+            self._send_json(200, {"products": chunk}, headers)
+            return
+
+        if resource == "redirects.json":
+            if self.command == "POST":
+                redirect = dict(self._read_json().get("redirect") or {})
+                redirect["id"] = self.state.new_id()
+                with self.state.lock:
+                    duplicated = redirect.get("path") in self.state.redirects
+                    if not duplicated:
+                        self.state.redirects[redirect.get("path")] = redirect
+                if duplicated:
+                    self._send_json(422, {"errors": {"path": ["has already been taken"]}}, limit_header)
+                else:
+                    self._send_json(201, {"redirect": redirect}, limit_header)
+                return
+            limit = min(250, int(query.get("limit", ["50"])[0]))
+            offset = int(query.get("page_info", ["0"])[0] or 0)
+            with self.state.lock:
+                redirects = list(self.state.redirects.values())
+            headers = dict(limit_header)
+            if offset + limit < len(redirects):
+                next_url = f"http://{self.headers.get('Host')}{path}?{urlencode({'limit': limit, 'page_info': offset + limit})}"
+                headers["Link"] = f'<{next_url}>; rel="next"'
+            self._send_json(200, {"redirects": redirects[offset:offset + limit]}, headers)
+            return
+
+        self._send_json(404, {"errors": "Not Found"}, limit_header)
+
+    def _handle_graphql(self, token):
+        """GraphQL com custo: mutations custam MUTATION_COST pontos, as consultas 1"""
+        request = self._read_json()
+        query = request.get("query") or ""
+        variables = request.get("variables") or {}
+        requested = MUTATION_COST if query.lstrip().startswith("mutation") else 1
+        accepted, throttle_status = self.state.take_cost(token, requested)
+        extensions = {"cost": {"requestedQueryCost": requested, "actualQueryCost": requested if accepted else None,
+                               "throttleStatus": throttle_status}}
+        if not accepted:
+            self._send_json(200, {"errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+                                  "extensions": extensions})
+            return
+
+        if "productSet" in query:
+            data = {"productSet": self._product_set(variables.get("input") or {})}
+        elif "productVariantsBulkUpdate" in query:
+            data = {"productVariantsBulkUpdate": self._variants_bulk_update(variables.get("productId"),
+                                                                            variables.get("variants") or [])}
+        elif "productVariants" in query:
+            data = {"productVariants": self._product_variants(query, variables)}
+        elif "products(" in query:
+            data = {"products": self._products_page(variables)}
+        elif "inventorySetQuantities" in query:
+            data = {"inventorySetQuantities": self._inventory_set(variables.get("input") or {})}
+        elif "bulkOperationRunMutation" in query:
+            data = {"bulkOperationRunMutation": self._bulk_run_mutation(variables.get("mutation") or "",
+                                                                        variables.get("stagedUploadPath") or "")}
+        elif "currentBulkOperation" in query:
+            data = {"currentBulkOperation": self._current_bulk_operation()}
+        elif "urlRedirectImportCreate" in query:
+            data = {"urlRedirectImportCreate": self._redirect_import_create(variables.get("url") or "")}
+        elif "urlRedirectImportSubmit" in query:
+            data = {"urlRedirectImportSubmit": self._redirect_import_submit(variables.get("id"))}
+        elif "urlRedirectImport" in query:
+            data = {"urlRedirectImport": self._redirect_import_status(variables.get("id"))}
+        elif "stagedUploadsCreate" in query:
+            data = {"stagedUploadsCreate": self._staged_uploads_create(variables.get("input") or [])}
+        elif "fileCreate" in query:
+            data = {"fileCreate": self._file_create(variables.get("files") or [])}
+        elif "locations" in query:
+            data = {"locations": {"nodes": [{"id": "gid://shopify/Location/1", "name": "Simulador"}]}}
+        elif "node(" in query:
+            data = {"node": self._bulk_operation_node(variables.get("id"))}
+        elif "nodes" in query:
+            data = {"nodes": [self._file_node(gid) for gid in variables.get("ids") or []]}
+        else:
+            self._send_json(200, {"errors": [{"message": "Operação não suportada pelo simulador"}],
+                                  "extensions": extensions})
+            return
+        self._send_json(200, {"data": data, "extensions": extensions})
+
+    def _product_set(self, product_input):
+        """Cria (ou atualiza, com id) um produto, validando opções e variações como o Shopify"""
+        errors = []
+        if not product_input.get("title"):
+            errors.append({"field": ["input", "title"], "message": "Title can't be blank", "code": "BLANK"})
+        option_names = [option.get("name") for option in product_input.get("productOptions") or []]
+        combinations = set()
+        for index, variant in enumerate(product_input.get("variants") or []):
+            values = {value.get("optionName"): value.get("name") for value in variant.get("optionValues") or []}
+            if sorted(values) != sorted(option_names):
+                errors.append({"field": ["input", "variants", str(index), "optionValues"],
+                               "message": "Option values must match the product options", "code": "INVALID"})
+                continue
+            combination = tuple(values[name] for name in option_names)
+            if combination in combinations:
+                errors.append({"field": ["input", "variants", str(index)],
+                               "message": "Variant already exists", "code": "DUPLICATE"})
+            combinations.add(combination)
+        if errors:
+            return {"product": None, "userErrors": errors}
+
+        with self.state.lock:
+            gid = product_input.get("id")
+            if gid:
+                record = next((p for p in self.state.shopify_products
+                               if f"gid://shopify/Product/{p['id']}" == gid), None)
+                if record is None:
+                    return {"product": None, "userErrors": [{"field": ["input", "id"],
+                                                             "message": "Product does not exist", "code": "NOT_FOUND"}]}
+            else:
+                self.state.next_id += 1
+                gid = f"gid://shopify/Product/{self.state.next_id}"
+                handle = base = product_input.get("handle") or slugify(product_input["title"])
+                suffix = 0
+                while handle in self.state.handles:
+                    suffix += 1
+                    handle = f"{base}-{suffix}"
+                record = {"id": self.state.next_id, "handle": handle,
+                          "created_at": datetime.now().isoformat(timespec="seconds")}
+                self.state.shopify_products.append(record)
+                self.state.handles.add(handle)
+                for variant in product_input.get("variants") or []:
+                    quantities = variant.get("inventoryQuantities") or [{}]
+                    self.state.add_variant(gid, variant.get("sku"), variant.get("price"),
+                                           variant.get("compareAtPrice"), quantities[0].get("quantity") or 0)
+            record.update({"title": product_input["title"], "status": (product_input.get("status") or "ACTIVE").lower(),
+                           "updated_at": datetime.now().isoformat(timespec="seconds")})
+            self.state.product_sets[gid] = product_input
+        return {"product": {"id": gid, "handle": record["handle"]}, "userErrors": []}
+
+    def _product_variants(self, query, variables):
+        """Busca por SKU (filtro sku:"..." OR ...) ou listagem paginada por cursor"""
+        search = variables.get("query")
+        if search:
+            terms = re.findall(r'sku:"((?:[^"\\]|\\.)*)"', search)
+            skus = [term.replace('\\"', '"').replace("\\\\", "\\") for term in terms]
+            with self.state.lock:
+                nodes = [self.state.variants_by_sku[sku] for sku in skus if sku in self.state.variants_by_sku]
+            return {"nodes": nodes[:250], "pageInfo": {"hasNextPage": False, "endCursor": None}}
+
+        match = re.search(r"first:\s*(\d+)", query)
+        first = min(250, int(variables.get("first") or (match.group(1) if match else 50)))
+        offset = int(variables.get("after") or 0)
+        with self.state.lock:
+            variants = list(self.state.variants_by_sku.values())
+        nodes = variants[offset:offset + first]
+        has_next = offset + first < len(variants)
+        return {"nodes": nodes, "pageInfo": {"hasNextPage": has_next,
+                                             "endCursor": str(offset + first) if has_next else None}}
+
+    def _products_page(self, variables):
+        """Listagem paginada por cursor dos produtos da loja (id e handle)"""
+        first = min(250, int(variables.get("first") or 250))
+        offset = int(variables.get("after") or 0)
+        with self.state.lock:
+            products = self.state.shopify_products[offset:offset + first]
+            has_next = offset + first < len(self.state.shopify_products)
+        nodes = [{"id": f"gid://shopify/Product/{p['id']}", "handle": p["handle"]} for p in products]
+        return {"nodes": nodes, "pageInfo": {"hasNextPage": has_next,
+                                             "endCursor": str(offset + first) if has_next else None}}
+
+    def _variants_bulk_update(self, product_id, variants):
+        errors, updated = [], []
+        with self.state.lock:
+            by_id = {v["id"]: v for v in self.state.variants_by_sku.values() if v["product"]["id"] == product_id}
+            for index, variant_input in enumerate(variants):
+                variant = by_id.get(variant_input.get("id"))
+                if variant is None:
+                    errors.append({"field": ["variants", str(index), "id"], "message": "Product variant does not exist"})
+                    continue
+                if "price" in variant_input:
+                    variant["price"] = variant_input["price"]
+                if "compareAtPrice" in variant_input:
+                    variant["compareAtPrice"] = variant_input["compareAtPrice"]
+                updated.append({"id": variant["id"]})
+        return {"productVariants": updated if not errors else [], "userErrors": errors}
+
+    def _inventory_set(self, set_input):
+        """Define o estoque de até 250 itens (tudo ou nada, como no Shopify)"""
+        quantities = set_input.get("quantities") or []
+        errors = []
+        if len(quantities) > 250:
+            errors.append({"field": ["input", "quantities"], "message": "Too many quantities (max 250)"})
+        with self.state.lock:
+            for index, quantity in enumerate(quantities):
+                if quantity.get("inventoryItemId") not in self.state.inventory_items:
+                    errors.append({"field": ["input", "quantities", str(index), "inventoryItemId"],
+                                   "message": "The specified inventory item could not be found."})
+                elif not isinstance(quantity.get("quantity"), int):
+                    errors.append({"field": ["input", "quantities", str(index), "quantity"],
+                                   "message": "Quantity must be an integer"})
+            if errors:
+                return {"inventoryAdjustmentGroup": None, "userErrors": errors}
+            for quantity in quantities:
+                self.state.inventory_items[quantity["inventoryItemId"]]["available"] = quantity["quantity"]
+        return {"inventoryAdjustmentGroup": {"reason": set_input.get("reason") or "correction"}, "userErrors": []}
+
+    def _bulk_run_mutation(self, mutation, staged_path):
+        """Executa a mutation para cada linha do JSONL enviado; o resultado fica pronto após o tempo simulado"""
+        if "customerCreate" not in mutation:
+            return {"bulkOperation": None, "userErrors": [{"field": ["mutation"],
+                                                          "message": "Mutation não suportada pelo simulador"}]}
+        with self.state.lock:
+            content = self.state.staged_uploads.get(staged_path)
+            running = any(op["status"] == "RUNNING" and time.monotonic() < op["ready_at"]
+                          for op in self.state.bulk_operations.values())
+        if content is None:
+            return {"bulkOperation": None, "userErrors": [{"field": ["stagedUploadPath"],
+                                                          "message": "Staged upload not found"}]}
+        if running:
+            return {"bulkOperation": None, "userErrors": [{"field": None, "message":
+                    "A bulk mutation operation for this app and shop is already in progress."}]}
+
+        lines = []
+        for number, line in enumerate(content.decode("utf-8").splitlines()):
+            if not line.strip():
+                continue
+            customer_input = (json.loads(line).get("input") or {})
+            email = (customer_input.get("email") or "").strip().lower()
+            with self.state.lock:
+                taken = not email or email in self.state.shopify_customers
+                if not taken:
+                    customer = {"id": self.state.next_id + 1, "email": email}
+                    self.state.next_id += 1
+                    self.state.shopify_customers[email] = customer
+            if taken:
+                result = {"customer": None, "userErrors": [{"field": ["email"], "message":
+                          "Email has already been taken" if email else "Email can't be blank"}]}
+            else:
+                result = {"customer": {"id": f"gid://shopify/Customer/{customer['id']}", "email": email},
+                          "userErrors": []}
+            lines.append(json.dumps({"data": {"customerCreate": result}, "__lineNumber": number}))
+
+        gid = f"gid://shopify/BulkOperation/{self.state.new_id()}"
+        key = f"{gid.rsplit('/', 1)[-1]}.jsonl"
+        with self.state.lock:
+            self.state.bulk_results[key] = ("\n".join(lines) + "\n").encode("utf-8")
+            self.state.bulk_operations[gid] = {
+                "id": gid, "status": "RUNNING", "objectCount": len(lines), "key": key,
+                "ready_at": time.monotonic() + len(lines) * BULK_SECONDS_PER_LINE
+            }
+        return {"bulkOperation": {"id": gid, "status": "CREATED"}, "userErrors": []}
+
+    def _current_bulk_operation(self):
+        with self.state.lock:
+            if not self.state.bulk_operations:
+                return None
+            gid = list(self.state.bulk_operations)[-1]
+        return self._bulk_operation_node(gid)
+
+    def _bulk_operation_node(self, gid):
+        """Status de uma operação em massa pelo ID (None se não existir)"""
+        with self.state.lock:
+            operation = self.state.bulk_operations.get(gid)
+            if operation is None:
+                return None
+            if operation["status"] == "RUNNING" and time.monotonic() >= operation["ready_at"]:
+                operation["status"] = "COMPLETED"
+        completed = operation["status"] == "COMPLETED"
+        return {"id": operation["id"], "status": operation["status"], "errorCode": None,
+                "objectCount": str(operation["objectCount"] if completed else 0),
+                "url": f"http://{self.headers.get('Host')}/bulk-results/{operation['key']}" if completed else None}
+
+    def _redirect_import_create(self, url):
+        """Importação a partir de um CSV (Redirect from, Redirect to) enviado pelo upload temporário"""
+        key = urlparse(url).path[len("/staged-uploads/"):]
+        with self.state.lock:
+            content = self.state.staged_uploads.get(key)
+        if content is None:
+            return {"urlRedirectImport": None, "userErrors": [{"field": ["url"], "message": "File not found"}]}
+
+        rows = [((row.get("Redirect from") or "").strip(), (row.get("Redirect to") or "").strip())
+                for row in csv.DictReader(io.StringIO(content.decode("utf-8")))]
+        gid = f"gid://shopify/UrlRedirectImport/{self.state.new_id()}"
+        with self.state.lock:
+            self.state.redirect_imports[gid] = {"rows": rows, "ready_at": None,
+                                                "created": 0, "updated": 0, "failed": 0}
+        return {"urlRedirectImport": {"id": gid}, "userErrors": []}
+
+    def _redirect_import_submit(self, gid):
+        """Aplica as linhas (path existente é atualizado; path sem barra inicial ou sem destino falha)"""
+        with self.state.lock:
+            redirect_import = self.state.redirect_imports.get(gid)
+            if redirect_import is None or redirect_import["ready_at"] is not None:
+                return {"job": None, "userErrors": [{"field": ["id"], "message": "Import not found or already submitted"}]}
+            for path, target in redirect_import["rows"]:
+                if not path.startswith("/") or not target:
+                    redirect_import["failed"] += 1
+                elif path in self.state.redirects:
+                    self.state.redirects[path]["target"] = target
+                    redirect_import["updated"] += 1
+                else:
+                    self.state.redirects[path] = {"id": self.state.next_id + 1, "path": path, "target": target}
+                    self.state.next_id += 1
+                    redirect_import["created"] += 1
+            redirect_import["ready_at"] = time.monotonic() + len(redirect_import["rows"]) * BULK_SECONDS_PER_LINE
+        return {"job": {"id": f"gid://shopify/Job/{self.state.new_id()}"}, "userErrors": []}
+
+    def _redirect_import_status(self, gid):
+        with self.state.lock:
+            redirect_import = self.state.redirect_imports.get(gid)
+            if redirect_import is None:
+                return None
+            ready_at = redirect_import["ready_at"]
+            finished = ready_at is not None and time.monotonic() >= ready_at
+            # Contagens UnsignedInt64: o GraphQL do Shopify devolve como texto
+            return {"finished": finished, "createdCount": str(redirect_import["created"]),
+                    "updatedCount": str(redirect_import["updated"]), "failedCount": str(redirect_import["failed"])}
+
+    def _staged_uploads_create(self, inputs):
+        targets = []
+        base = f"http://{self.headers.get('Host')}/staged-uploads"
+        for staged_input in inputs:
+            key = f"{self.state.new_id()}/{staged_input.get('filename') or 'arquivo'}"
+            with self.state.lock:
+                self.state.staged_uploads[key] = None
+            targets.append({"url": f"{base}/{key}", "resourceUrl": f"{base}/{key}",
+                            "parameters": [{"name": "key", "value": key},
+                                           {"name": "Content-Type", "value": staged_input.get("mimeType") or ""}]})
+        return {"stagedTargets": targets, "userErrors": []}
+
+    def _file_create(self, files):
+        """Registra os arquivos enviados; só aceita originalSource de um upload temporário já concluído"""
+        created, errors = [], []
+        prefix = f"http://{self.headers.get('Host')}/staged-uploads/"
+        for index, file_input in enumerate(files):
+            source = file_input.get("originalSource") or ""
+            key = source[len(prefix):] if source.startswith(prefix) else None
+            with self.state.lock:
+                uploaded = key is not None and self.state.staged_uploads.get(key) is not None
+            if not uploaded:
+                errors.append({"field": ["files", str(index), "originalSource"],
+                               "message": "File upload not found", "code": "INVALID"})
+                continue
+            gid = f"gid://shopify/MediaImage/{self.state.new_id()}"
+            with self.state.lock:
+                self.state.files[gid] = {
+                    "url": f"https://cdn.shopify.com/s/files/1/0000/0001/files/{key.rsplit('/', 1)[-1]}",
+                    "alt": file_input.get("alt") or "", "ready_at": time.monotonic() + FILE_PROCESSING_SECONDS
+                }
+            created.append({"id": gid, "fileStatus": "UPLOADED", "alt": file_input.get("alt") or ""})
+        return {"files": created if not errors else [], "userErrors": errors}
+
+    def _file_node(self, gid):
+        with self.state.lock:
+            record = self.state.files.get(gid)
+        if record is None:
+            return None
+        ready = time.monotonic() >= record["ready_at"]
+        return {"id": gid, "fileStatus": "READY" if ready else "UPLOADED", "alt": record["alt"],
+                "image": {"url": record["url"]} if ready else None}
+
+def start_simulator(host="127.0.0.1", port=0, **options):
+    """Inicia o simulador em uma thread. Retorna (servidor, URL base)"""
+    server = ThreadingHTTPServer((host, port), SimulatorHandler)
+    server.daemon_threads = True
+    server.state = SimulatorState(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def print_stats(state):
+    print("\n📊 Requisições atendidas:")
+    for key, count in sorted(state.stats.items()):
+        print(f"   {count:>7}  {key}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador local das APIs Bagy e Shopify")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--products", type=int, default=200, help="produtos sintéticos (padrão: 200)")
+    parser.add_argument("--customers", type=int, default=200, help="clientes sintéticos (padrão: 200)")
+    parser.add_argument("--discounts", type=int, default=50, help="cupons sintéticos (padrão: 50)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.0, help="latência média em ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="variação da latência em ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 500/502/503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fração de respostas 429 aleatórias")
+    parser.add_argument("--bucket-size", type=int, default=40, help="capacidade do leaky bucket do Shopify")
+    parser.add_argument("--leak-rate", type=float, default=2.0, help="vazão do leaky bucket (req/s)")
+    parser.add_argument("--cost-max", type=float, default=1000.0, help="pontos de custo do GraphQL (padrão: 1000)")
+    parser.add_argument("--cost-restore", type=float, default=50.0, help="pontos recuperados por segundo (padrão: 50)")
+    args = parser.parse_args()
+
+    print("🧪 Gerando dados sintéticos...")
+    server, base_url = start_simulator(
+        args.host, args.port, products=args.products, customers=args.customers,
+        discounts=args.discounts, seed=args.seed, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        bucket_size=args.bucket_size, leak_rate=args.leak_rate,
+        cost_maximum=args.cost_max, cost_restore_rate=args.cost_restore
+    )
+    state = server.state
+    print(f"✅ Simulador em {base_url}")
+    print(f"   📦 {len(state.products)} produtos | 👥 {len(state.customers)} clientes | "
+          f"🎟️ {len(state.discounts)} cupons | 💰 {len(state.balances)} saldos")
+    print("\nAponte os scripts para o simulador:")
+    print(f"   export BAGY_API_URL={base_url}")
+    print(f"   export SHOPIFY_BASE_URL={base_url}")
+    print("\nCtrl+C para encerrar")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print_stats(state)
+
+if __name__ == "__main__":
+    main()
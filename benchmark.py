@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks das etapas de processamento com catálogos sintéticos.
+
+Gera catálogos da Bagy (1k, 10k e 100k produtos por padrão, com variações,
+imagens e descrições HTML) e mede:
+- convert:   convert_bagy_to_shopify_csv (04)
+- match:     find_matching_products (06), limitado a --match-limit produtos
+             porque a comparação é quadrática
+- redirects: create_sku_to_handle_mapping + process_bagy_products (09)
+- staged_redirects: redirects do 09 com produtos e SKUs já no staging
+                    (como numa segunda execução do 09)
+- mapping:   create_sku_to_handle_mapping (09) sozinho, com as linhas de
+             imagem sem SKU que a exportação do Shopify também traz
+- engine_parity: redirects do 09 pelo motor join (staging) e pelo loop (dicts),
+             com SKUs numéricos (reference inteiro nos produtos simples);
+             falha se as duas saídas forem diferentes
+- export:    01_export_products_from_bagy.py contra o simulador local,
+             limitado a --export-limit produtos (o exportador pausa entre páginas)
+- export_customers, export_coupons, export_cashback: os exportadores 02, 03
+             e 07 contra o mesmo simulador, com --export-limit clientes/cupons
+             (os saldos de cashback são gerados para ~30% dos clientes)
+
+Cada medição roda em um processo separado para que o pico de memória (RSS)
+seja só daquele caso. Os resultados (tempo, linhas/s e pico de RSS) são
+acrescentados a logs/benchmarks.json e comparados com a execução anterior.
+
+--redirect-engine escolhe o motor de redirects do 09 nos dois casos:
+loop (process_bagy_products) ou join (process_bagy_products_join).
+--convert-engine escolhe o motor do 04: loop (por produto) ou pandas (colunar).
+
+Uso:
+    python benchmark.py
+    python benchmark.py --sizes 1000,10000 --cases convert,redirects
+    python benchmark.py --cases staged_redirects --redirect-engine join
+    python benchmark.py --cases convert --convert-engine pandas
+    python benchmark.py --sizes 1000 --cases export,export_customers,export_coupons,export_cashback
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: sem medição de RSS
+    resource = None
+
+HISTORY_FILE = os.path.join("logs", "benchmarks.json")
+# Exportadores medidos contra o simulador: script, opção do simulador que recebe o tamanho e conjunto colunar gravado
+EXPORT_CASES = {
+    "export": ("01_export_products_from_bagy.py", "products", "produtos"),
+    "export_customers": ("02_export_customers_from_bagy.py", "customers", "clientes"),
+    "export_coupons": ("03_export_coupons_from_bagy.py", "discounts", "cupons"),
+    "export_cashback": ("07_export_cashback_from_bagy.py", "customers", "cashback_saldos"),
+}
+CASES = ["convert", "match", "redirects", "staged_redirects", "mapping", "engine_parity"] + list(EXPORT_CASES)
+REDIRECT_ENGINES = {"loop": "process_bagy_products", "join": "process_bagy_products_join"}
+CONVERT_ENGINES = ["loop", "pandas"]
+DEFAULT_SIZES = [1000, 10000, 100000]
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def peak_rss_mb(who=None):
+    """Pico de memória residente do processo (ou dos filhos) em MB"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(who if who is not None else resource.RUSAGE_SELF)
+    # Linux informa em KB, macOS em bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss / divisor, 1)
+
+def load_script(name):
+    """Importa um script numerado (ex: 04_convert_products_to_shopify_csv)"""
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    return importlib.import_module(name)
+
+def shopify_products_from_catalog(products):
+    """Produtos como o Shopify devolve após a importação do CSV do 04"""
+    converter = load_script("04_convert_products_to_shopify_csv")
+    return [
+        {"id": 9000000 + p["id"], "title": p["name"], "handle": converter.create_handle(p["name"])}
+        for p in products
+    ]
+
+def shopify_export_dataframe(products, image_rows=False):
+    """DataFrame no formato do products_export_1.csv (Handle + Variant SKU)"""
+    import pandas as pd
+    converter = load_script("04_convert_products_to_shopify_csv")
+    rows = []
+    for product in products:
+        handle = converter.create_handle(product["name"])
+        skus = [v["sku"] for v in product["variations"]] or [product["sku"]]
+        rows.extend({"Handle": handle, "Variant SKU": sku} for sku in skus)
+        if image_rows:
+            # Imagens extras viram linhas só com Handle, como na exportação real
+            rows.extend({"Handle": handle, "Variant SKU": None} for _ in product["images"][1:])
+    return pd.DataFrame(rows)
+
+def run_convert(products, workdir, engine):
+    converter = load_script("04_convert_products_to_shopify_csv")
+    json_path = os.path.join(workdir, "produtos.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(products, f, ensure_ascii=False)
+
+    started = time.perf_counter()
+    files = converter.convert_bagy_to_shopify_csv(json_path, "produtos_shopify_completo.csv", engine=engine)
+    elapsed = time.perf_counter() - started
+
+    # Catálogos grandes saem em vários arquivos (limite de tamanho do Shopify), cada um com cabeçalho
+    rows = 0
+    for path in files:
+        with open(os.path.join(workdir, path), "rb") as f:
+            rows += sum(1 for _ in f) - 1
+    return elapsed, rows, {"engine": engine, "csv_rows": rows, "csv_files": len(files)}
+
+def run_match(products, limit):
+    validator = load_script("06_validate_migration")
+    products = products[:limit]
+    shopify_products = shopify_products_from_catalog(products)
+
+    started = time.perf_counter()
+    matches = validator.find_matching_products(shopify_products, products)
+    elapsed = time.perf_counter() - started
+    return elapsed, len(shopify_products), {"products": len(products), "matches": len(matches)}
+
+def run_redirects(products, engine):
+    redirects = load_script("09_generate_redirects_301")
+    shopify_df = shopify_export_dataframe(products)
+
+    started = time.perf_counter()
+    sku_to_handle = redirects.create_sku_to_handle_mapping(shopify_df)
+    result = getattr(redirects, REDIRECT_ENGINES[engine])(products, sku_to_handle)
+    elapsed = time.perf_counter() - started
+    return elapsed, len(shopify_df) + len(products), {"engine": engine, "skus": len(sku_to_handle),
+                                                      "redirects": len(result)}
+
+def run_staged_redirects(products, engine, workdir):
+    import staging
+    redirects = load_script("09_generate_redirects_301")
+    shopify_df = shopify_export_dataframe(products)
+    conn = staging.connect(os.path.join(workdir, "staging.db"))
+    staging.upsert_products(conn, products, replace=True)
+    staging.replace_shopify_skus(conn, redirects.create_sku_to_handle_mapping(shopify_df).items())
+    del products[:]
+
+    started = time.perf_counter()
+    result = getattr(redirects, REDIRECT_ENGINES[engine])(staging.ProductsView(conn), staging.SkuHandleIndex(conn))
+    elapsed = time.perf_counter() - started
+    return elapsed, len(shopify_df), {"engine": engine, "redirects": len(result)}
+
+def run_mapping(products):
+    redirects = load_script("09_generate_redirects_301")
+    shopify_df = shopify_export_dataframe(products, image_rows=True)
+    del products[:]
+
+    started = time.perf_counter()
+    sku_to_handle = redirects.create_sku_to_handle_mapping(shopify_df)
+    elapsed = time.perf_counter() - started
+    return elapsed, len(shopify_df), {"skus": len(sku_to_handle)}
+
+def run_engine_parity(products, workdir):
+    import staging
+    redirects = load_script("09_generate_redirects_301")
+    # Produtos simples só com reference numérico e os demais sem SKU no produto: no staging a coluna
+    # de SKUs fica só com números e nulos, o caso que já fez o join perder redirects product_direct
+    for product in products:
+        product["sku"] = product["id"] if not product["variations"] else None
+    shopify_df = shopify_export_dataframe(products)
+    for product in products:
+        if not product["variations"]:
+            product["sku"], product["reference"] = None, product["id"]
+
+    conn = staging.connect(os.path.join(workdir, "staging.db"))
+    staging.upsert_products(conn, products, replace=True)
+    staging.replace_shopify_skus(conn, redirects.create_sku_to_handle_mapping(shopify_df).items())
+    sku_to_handle = staging.SkuHandleIndex(conn)
+
+    started = time.perf_counter()
+    loop = redirects.process_bagy_products(products, sku_to_handle)
+    join = redirects.process_bagy_products_join(staging.ProductsView(conn), sku_to_handle)
+    elapsed = time.perf_counter() - started
+
+    expected = [(r["redirect_from"], r["redirect_to"], str(r["sku"]), r["source"]) for r in loop]
+    found = [(r.redirect_from, r.redirect_to, str(r.sku), r.source) for r in join.itertuples()]
+    if found != expected:
+        differences = len(set(expected) ^ set(found))
+        raise RuntimeError(f"motores divergem: loop {len(expected)} x join {len(found)} redirects "
+                           f"({differences} diferentes)")
+    return elapsed, len(products), {"redirects": len(expected)}
+
+def run_export(case, size, workdir):
+    import columnar
+    from api_simulator import start_simulator
+    script, option, dataset = EXPORT_CASES[case]
+    # Só o recurso exportado tem o tamanho pedido; os demais ficam mínimos
+    options = dict({"products": 1, "customers": 1, "discounts": 1}, **{option: size})
+    server, base_url = start_simulator(**options)
+    env = dict(os.environ, API_KEY="benchmark", BAGY_API_URL=base_url, HTTP_CACHE="0")
+
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.join(REPO_DIR, script)],
+                            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "falha no exportador")
+
+    # Todos os exportadores gravam a cópia colunar; conta os registros por ela
+    frame, _ = columnar.load_frame(dataset)
+    if frame is None:
+        raise RuntimeError(f"{script} não gravou {columnar.dataset_path(dataset)}")
+    return elapsed, len(frame), {"records": len(frame), "requests": sum(server.state.stats.values())}
+
+def run_case(case, size, args):
+    """Executa um caso no processo atual e devolve o resultado"""
+    from api_simulator import generate_products
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        os.chdir(workdir)
+        effective_size = min(size, args.match_limit if case == "match" else
+                             args.export_limit if case in EXPORT_CASES else size)
+        # Os exportadores leem os dados do simulador, que gera os próprios registros
+        products = [] if case in EXPORT_CASES else generate_products(effective_size, seed=args.seed)
+
+        # Os scripts imprimem progresso; o custo de formatar continua medido, só a saída é descartada
+        with contextlib.redirect_stdout(io.StringIO()):
+            if case == "convert":
+                elapsed, rows, details = run_convert(products, workdir, args.convert_engine)
+            elif case == "match":
+                elapsed, rows, details = run_match(products, effective_size)
+            elif case == "redirects":
+                elapsed, rows, details = run_redirects(products, args.redirect_engine)
+            elif case == "staged_redirects":
+                elapsed, rows, details = run_staged_redirects(products, args.redirect_engine, workdir)
+            elif case == "mapping":
+                elapsed, rows, details = run_mapping(products)
+            elif case == "engine_parity":
+                elapsed, rows, details = run_engine_parity(products, workdir)
+            else:
+                elapsed, rows, details = run_export(case, effective_size, workdir)
+
+        os.chdir(REPO_DIR)
+
+    rss = peak_rss_mb(resource.RUSAGE_CHILDREN if case in EXPORT_CASES and resource else None)
+    return {
+        "case": case,
+        "size": size,
+        "effective_size": effective_size,
+        "seconds": round(elapsed, 3),
+        "rows": rows,
+        "rows_per_second": round(rows / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": rss,
+        **details
+    }
+
+def run_isolated(case, size, args):
+    """Executa o caso em um subprocesso (pico de RSS isolado)"""
+    command = [sys.executable, os.path.abspath(__file__), "--child", case, "--sizes", str(size),
+               "--seed", str(args.seed), "--match-limit", str(args.match_limit),
+               "--export-limit", str(args.export_limit), "--redirect-engine", args.redirect_engine,
+               "--convert-engine", args.convert_engine]
+    result = subprocess.run(command, capture_output=True, text=True, cwd=REPO_DIR)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"código {result.returncode}"
+        return {"case": case, "size": size, "error": error}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=REPO_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history():
+    if not os.path.exists(HISTORY_FILE):
+        return []
+    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_history(history):
+    os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+
+def previous_result(history, case, size, engine=None):
+    """Último resultado válido do mesmo caso/tamanho (e motor de redirects) em execuções anteriores"""
+    for run in reversed(history):
+        for result in run["results"]:
+            if (result["case"] == case and result["size"] == size and "error" not in result
+                    and result.get("engine") == engine):
+                return result
+    return None
+
+def print_result(result, previous):
+    label = f"{result['case']:<16} {result['size']:>7}"
+    if "error" in result:
+        print(f"   ❌ {label}  erro: {result['error']}")
+        return
+
+    comparison = ""
+    if previous and previous.get("effective_size") == result["effective_size"] and previous["seconds"]:
+        change = (result["seconds"] - previous["seconds"]) / previous["seconds"] * 100
+        icon = "🔺" if change > 10 else "🔻" if change < -10 else "➖"
+        comparison = f"  {icon} {change:+.0f}% vs anterior"
+
+    limited = f" (limitado a {result['effective_size']})" if result["effective_size"] != result["size"] else ""
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/d"
+    print(f"   ⏱️  {label}{limited}: {result['seconds']:.2f}s | "
+          f"{result['rows_per_second'] or 0:,.0f} linhas/s | RSS {rss}{comparison}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks com catálogos sintéticos")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="tamanhos do catálogo (padrão: 1000,10000,100000)")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"casos a medir (padrão: {','.join(CASES)})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--match-limit", type=int, default=500,
+                        help="máximo de produtos no caso match (comparação quadrática, padrão: 500)")
+    parser.add_argument("--export-limit", type=int, default=1000,
+                        help="máximo de produtos/clientes/cupons nos casos export* (padrão: 1000)")
+    parser.add_argument("--redirect-engine", choices=sorted(REDIRECT_ENGINES), default="loop",
+                        help="motor de redirects do 09 (padrão: loop)")
+    parser.add_argument("--convert-engine", choices=CONVERT_ENGINES, default="loop",
+                        help="motor de conversão do 04 (padrão: loop)")
+    parser.add_argument("--no-save", action="store_true", help="não grava o resultado no histórico")
+    parser.add_argument("--child", choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    if args.child:
+        print(json.dumps(run_case(args.child, sizes[0], args)))
+        return
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        raise SystemExit(f"❌ Casos desconhecidos: {', '.join(sorted(unknown))}")
+
+    print("📏 BENCHMARKS BAGY → SHOPIFY")
+    print("=" * 50)
+
+    history = load_history()
+    results = []
+    for case in cases:
+        for size in sizes:
+            result = run_isolated(case, size, args)
+            print_result(result, previous_result(history, case, size, result.get("engine")))
+            results.append(result)
+
+    if not args.no_save:
+        history.append({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results
+        })
+        save_history(history)
+        print(f"\n💾 Resultados acrescentados a {HISTORY_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cópia colunar binária dos dados exportados da Bagy.
+
+Além do Excel/JSON, cada exportador (01, 02, 03 e 07) grava em imported/
+um arquivo <nome>.parquet (com pyarrow instalado) ou <nome>.pkl (pickle do
+pandas) com um esquema tipado: cada coluna declarada vira Int64, float64,
+boolean ou string. Colunas não declaradas, objetos aninhados (endereço,
+variações, imagens) e colunas cujos valores não batem com o tipo declarado
+são guardadas como texto JSON, então a leitura devolve os mesmos registros
+da API (campos ausentes em um registro voltam como None). Os leitores
+(05, 08 e 09) preferem este arquivo ao Excel e ao JSON: carregar 100 mil
+linhas leva milissegundos em vez dos segundos do openpyxl.
+"""
+
+import json
+import os
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+DATASET_DIR = "imported"
+JSON = "json"
+
+# Tipos aceitos por coluna e os valores Python que cabem em cada um
+PYTHON_TYPES = {
+    "Int64": (int,),
+    "float64": (float,),
+    "boolean": (bool,),
+    "string": (str,),
+}
+
+def dataset_path(name, parquet=PARQUET_AVAILABLE):
+    """Caminho do arquivo colunar de um conjunto de dados"""
+    return os.path.join(DATASET_DIR, f"{name}.parquet" if parquet else f"{name}.pkl")
+
+def _fits(values, dtype):
+    """Todos os valores não nulos são do tipo Python esperado (bool não conta como int)"""
+    expected = PYTHON_TYPES[dtype]
+    return all(v is None or (isinstance(v, expected) and (dtype == "boolean" or not isinstance(v, bool)))
+               for v in values)
+
+def _json_column(values):
+    return pd.Series([None if v is None else json.dumps(v, ensure_ascii=False) for v in values], dtype="string")
+
+def build_frame(records, schema):
+    """DataFrame tipado. Retorna (frame, colunas guardadas como JSON)"""
+    columns = list(schema)
+    for record in records:
+        columns.extend(key for key in record if key not in schema and key not in columns)
+
+    data, json_columns = {}, []
+    for column in columns:
+        values = [record.get(column) for record in records]
+        dtype = schema.get(column, JSON)
+        if dtype != JSON and _fits(values, dtype):
+            data[column] = pd.Series(values, dtype=dtype)
+        else:
+            data[column] = _json_column(values)
+            json_columns.append(column)
+    frame = pd.DataFrame(data)
+    frame.attrs["json_columns"] = json_columns
+    return frame, json_columns
+
+def save_dataset(name, records, schema):
+    """Grava o conjunto de dados de forma atômica e remove a cópia no outro formato"""
+    frame, json_columns = build_frame(list(records), schema)
+    os.makedirs(DATASET_DIR, exist_ok=True)
+    path = dataset_path(name)
+    tmp_path = f"{path}.tmp"
+
+    if PARQUET_AVAILABLE:
+        # As colunas JSON vão nos metadados do arquivo (o parquet não guarda frame.attrs em todas as versões)
+        import pyarrow.parquet as pq
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"json_columns"] = json.dumps(json_columns).encode("utf-8")
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    else:
+        frame.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+    stale = dataset_path(name, parquet=not PARQUET_AVAILABLE)
+    if os.path.exists(stale):
+        os.remove(stale)
+    print(f"✅ Cópia colunar salva como {path}")
+    return path
+
+def load_frame(name, columns=None):
+    """Lê o DataFrame tipado (colunas JSON ainda como texto), só com as colunas pedidas que existirem.
+    Retorna (frame, colunas JSON) ou (None, [])"""
+    if PARQUET_AVAILABLE and os.path.exists(dataset_path(name, parquet=True)):
+        import pyarrow.parquet as pq
+        path = dataset_path(name, parquet=True)
+        schema = pq.read_schema(path)
+        if columns is not None:
+            columns = [column for column in columns if column in schema.names]
+        table = pq.read_table(path, columns=columns)
+        json_columns = json.loads((schema.metadata or {}).get(b"json_columns", b"[]"))
+        return table.to_pandas(), json_columns
+    if os.path.exists(dataset_path(name, parquet=False)):
+        frame = pd.read_pickle(dataset_path(name, parquet=False))
+        json_columns = frame.attrs.get("json_columns", [])
+        if columns is not None:
+            frame = frame[[column for column in columns if column in frame.columns]]
+        return frame, json_columns
+    return None, []
+
+def load_dataset(name, projection=None):
+    """Registros gravados por save_dataset, como dicts (ou registros compactos de uma projection.Projection,
+    lendo só as colunas dela). Retorna None se não houver cópia colunar"""
+    try:
+        frame, json_columns = load_frame(name, projection.fields if projection else None)
+    except Exception as e:
+        print(f"⚠️  Cópia colunar de {name} ilegível ({e}), usando os arquivos originais")
+        return None
+    if frame is None:
+        return None
+
+    columns = []
+    for column in frame.columns:
+        values = frame[column].astype(object).tolist()
+        if column in json_columns:
+            columns.append([None if v is None or v is pd.NA else json.loads(v) for v in values])
+        else:
+            columns.append([None if v is None or v is pd.NA or v != v else v for v in values])
+    records = (dict(zip(frame.columns, row)) for row in zip(*columns))
+    if projection is not None:
+        return [projection.apply(record) for record in records]
+    return list(records)
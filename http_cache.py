@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache em disco das respostas GET da API da Bagy.
+
+Ativado com HTTP_CACHE=1 no .env. Cada resposta 200 é guardada em
+imported/http_cache/ com chave derivada de URL, parâmetros e token:
+- se a API devolveu ETag/Last-Modified, a próxima chamada envia
+  If-None-Match/If-Modified-Since e um 304 é servido do disco
+- sem validadores, a resposta é reaproveitada enquanto tiver menos de
+  ttl segundos (parâmetro da chamada ou HTTP_CACHE_TTL)
+
+O tamanho total é limitado por HTTP_CACHE_MAX_MB; ao passar do limite as
+entradas menos usadas recentemente são removidas (LRU pela data de acesso).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+from dotenv import load_dotenv
+
+# Carrega as variáveis do arquivo .env
+load_dotenv()
+
+ENABLED = os.getenv("HTTP_CACHE", "").lower() in ("1", "true", "yes")
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join("imported", "http_cache"))
+MAX_BYTES = int(float(os.getenv("HTTP_CACHE_MAX_MB", "500")) * 1024 * 1024)
+DEFAULT_TTL = float(os.getenv("HTTP_CACHE_TTL")) if os.getenv("HTTP_CACHE_TTL") else None
+
+class HttpCache:
+    """Armazena pares <chave>.json (metadados) + <chave>.body (conteúdo)"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = None
+        self.lock = threading.Lock()
+
+    def _paths(self, key):
+        folder = os.path.join(self.directory, key[:2])
+        return os.path.join(folder, f"{key}.json"), os.path.join(folder, f"{key}.body")
+
+    def load(self, key):
+        """Retorna (metadados, corpo) ou None. Atualiza a data de acesso (LRU)"""
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+
+        now = time.time()
+        for path in (meta_path, body_path):
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return meta, body
+
+    def store(self, key, meta, body):
+        meta_path, body_path = self._paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        # Regravar uma chave substitui o corpo anterior: só a diferença entra no total
+        try:
+            previous_size = os.path.getsize(body_path)
+        except OSError:
+            previous_size = 0
+
+        for path, data, mode in ((body_path, body, "wb"), (meta_path, json.dumps(meta).encode("utf-8"), "wb")):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = self._scan_size()
+            else:
+                self.total_bytes += len(body) - previous_size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def touch_meta(self, key, meta):
+        """Regrava só os metadados (revalidação 304: o corpo não mudou)"""
+        meta_path, _ = self._paths(key)
+        tmp_path = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".body"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Remove as entradas acessadas há mais tempo até caber em 90% do limite"""
+        target = self.max_bytes * 0.9
+        entries = sorted(self._entries())
+        self.total_bytes = sum(size for _, size, _ in entries)
+        for _, size, body_path in entries:
+            if self.total_bytes <= target:
+                break
+            for path in (body_path, body_path[:-len(".body")] + ".json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.total_bytes -= size
+
+_cache = HttpCache()
+
+def cache_key(url, params=None, headers=None):
+    """Chave da entrada: URL, parâmetros ordenados e token (lojas diferentes não se misturam)"""
+    authorization = (headers or {}).get("Authorization", "")
+    raw = json.dumps([url, sorted((params or {}).items()), authorization], default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _cached_response(meta, body):
+    """Monta um requests.Response a partir de uma entrada do cache"""
+    response = requests.Response()
+    response.status_code = meta["status"]
+    response.headers = CaseInsensitiveDict(meta.get("headers", {}))
+    response.url = meta["url"]
+    response.encoding = meta.get("encoding")
+    response._content = body
+    response.from_cache = True
+    return response
+
+def get(url, headers=None, params=None, ttl=None, **kwargs):
+    """requests.get com cache em disco (sem efeito se HTTP_CACHE não estiver ativo)"""
+    if not ENABLED:
+        return requests.get(url, headers=headers, params=params, **kwargs)
+
+    ttl = DEFAULT_TTL if ttl is None else ttl
+    key = cache_key(url, params, headers)
+    cached = _cache.load(key)
+    request_headers = dict(headers or {})
+
+    if cached:
+        meta, body = cached
+        validators = meta.get("etag") or meta.get("last_modified")
+        if not validators and ttl is not None and time.time() - meta["stored_at"] < ttl:
+            return _cached_response(meta, body)
+        if meta.get("etag"):
+            request_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            request_headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = requests.get(url, headers=request_headers, params=params, **kwargs)
+
+    if response.status_code == 304 and cached:
+        meta, body = cached
+        meta["stored_at"] = time.time()
+        _cache.touch_meta(key, meta)
+        return _cached_response(meta, body)
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if response.status_code == 200 and (etag or last_modified or ttl is not None):
+        meta = {
+            "url": response.url,
+            "status": response.status_code,
+            "headers": {"Content-Type": response.headers.get("Content-Type", "application/json")},
+            "encoding": response.encoding,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time()
+        }
+        _cache.store(key, meta, response.content)
+
+    return response
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas das chamadas HTTP dos scripts de migração.
+
+Ativado com METRICS=1 no .env. Os scripts chamam instrument() ao iniciar;
+a partir daí toda requisição feita com requests (direta, pelo http_cache ou
+pelo shopify_client) é registrada por endpoint:
+- quantidade de chamadas por status e erros de conexão
+- novas tentativas (retries)
+- bytes enviados e recebidos
+- histograma de latência
+
+O tempo gasto em pausas de rate limit (throttle_sleep) é contado à parte,
+por motivo, para separar espera de trabalho real.
+
+Saídas em logs/metrics/ (ou METRICS_DIR):
+- <script>.json: resumo gravado ao final da execução
+- <script>.prom: arquivo textfile do Prometheus, regravado a cada
+  METRICS_INTERVAL segundos durante execuções longas
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+import requests
+from dotenv import load_dotenv
+
+# Carrega as variáveis do arquivo .env
+load_dotenv()
+
+ENABLED = os.getenv("METRICS", "").lower() in ("1", "true", "yes")
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join("logs", "metrics"))
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "15"))
+
+# Limites do histograma de latência (segundos), no estilo do Prometheus
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+def endpoint_name(url):
+    """Agrupa URLs por endpoint: host + caminho sem ids nem versão da API"""
+    parsed = urlparse(url)
+    path = re.sub(r"/admin/api/[^/]+", "/admin/api", parsed.path)
+    path = re.sub(r"/\d+(?=/|$|\.)", "/{id}", path)
+    return f"{parsed.netloc}{path}"
+
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, seconds):
+        self.latency_sum += seconds
+        self.latency_max = max(self.latency_max, seconds)
+        for i, limit in enumerate(LATENCY_BUCKETS):
+            if seconds <= limit:
+                self.latency_buckets[i] += 1
+                break
+
+    def to_dict(self):
+        cumulative, running = {}, 0
+        for limit, count in zip(LATENCY_BUCKETS, self.latency_buckets):
+            running += count
+            cumulative[str(limit)] = running
+        cumulative["+Inf"] = self.calls
+
+        return {
+            "calls": self.calls,
+            "statuses": dict(self.statuses),
+            "errors": dict(self.errors),
+            "retries": self.retries,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency_avg": round(self.latency_sum / self.calls, 4) if self.calls else None,
+            "latency_max": round(self.latency_max, 4),
+            "latency_sum": round(self.latency_sum, 4),
+            "latency_histogram": cumulative
+        }
+
+class Metrics:
+    """Contadores compartilhados entre threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.throttle_seconds = Counter()
+        self.started = time.time()
+        self.script = None
+
+    def _endpoint(self, method, url):
+        key = (method, endpoint_name(url))
+        if key not in self.endpoints:
+            self.endpoints[key] = EndpointStats()
+        return self.endpoints[key]
+
+    def record_request(self, method, url, seconds, status=None, error=None, bytes_sent=0, bytes_received=0):
+        with self.lock:
+            stats = self._endpoint(method, url)
+            stats.calls += 1
+            stats.observe(seconds)
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            if error:
+                stats.errors[error] += 1
+            else:
+                stats.statuses[str(status)] += 1
+
+    def record_retry(self, method, url):
+        with self.lock:
+            self._endpoint(method, url).retries += 1
+
+    def record_sleep(self, reason, seconds):
+        with self.lock:
+            self.throttle_seconds[reason] += seconds
+
+    def summary(self):
+        with self.lock:
+            endpoints = {f"{method} {name}": stats.to_dict() for (method, name), stats in sorted(self.endpoints.items())}
+            throttle = {reason: round(seconds, 3) for reason, seconds in self.throttle_seconds.items()}
+        return {
+            "script": self.script,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "elapsed_seconds": round(time.time() - self.started, 3),
+            "requests": sum(e["calls"] for e in endpoints.values()),
+            "http_seconds": round(sum(e["latency_sum"] for e in endpoints.values()), 3),
+            "throttle_sleep_seconds": throttle,
+            "endpoints": endpoints
+        }
+
+    def prometheus(self):
+        """Texto no formato textfile do Prometheus (node_exporter)"""
+        summary = self.summary()
+        script = summary["script"]
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def labels(**values):
+            return ",".join(f'{k}="{str(v)}"' for k, v in values.items())
+
+        metric("migration_http_requests_total", "counter", "Requisições HTTP por endpoint e status")
+        for key, stats in summary["endpoints"].items():
+            method, endpoint = key.split(" ", 1)
+            for status, count in stats["statuses"].items():
+                lines.append(f"migration_http_requests_total{{{labels(script=script, method=method, endpoint=endpoint, status=status)}}} {count}")
+            for error, count in stats["errors"].items():
+                lines.append(f"migration_http_requests_total{{{labels(script=script, method=method, endpoint=endpoint, status=error)}}} {count}")
+
+        metric("migration_http_retries_total", "counter", "Novas tentativas por endpoint")
+        metric("migration_http_sent_bytes_total", "counter", "Bytes enviados por endpoint")
+        metric("migration_http_received_bytes_total", "counter", "Bytes recebidos por endpoint")
+        metric("migration_http_request_duration_seconds", "histogram", "Latência das requisições por endpoint")
+        for key, stats in summary["endpoints"].items():
+            method, endpoint = key.split(" ", 1)
+            base = labels(script=script, method=method, endpoint=endpoint)
+            lines.append(f"migration_http_retries_total{{{base}}} {stats['retries']}")
+            lines.append(f"migration_http_sent_bytes_total{{{base}}} {stats['bytes_sent']}")
+            lines.append(f"migration_http_received_bytes_total{{{base}}} {stats['bytes_received']}")
+            for limit, count in stats["latency_histogram"].items():
+                lines.append(f'migration_http_request_duration_seconds_bucket{{{base},le="{limit}"}} {count}')
+            lines.append(f"migration_http_request_duration_seconds_sum{{{base}}} {stats['latency_sum']}")
+            lines.append(f"migration_http_request_duration_seconds_count{{{base}}} {stats['calls']}")
+
+        metric("migration_throttle_sleep_seconds_total", "counter", "Tempo em pausas de rate limit por motivo")
+        for reason, seconds in summary["throttle_sleep_seconds"].items():
+            lines.append(f"migration_throttle_sleep_seconds_total{{{labels(script=script, reason=reason)}}} {seconds}")
+
+        return "\n".join(lines) + "\n"
+
+_metrics = Metrics()
+_original_send = requests.Session.send
+
+def _instrumented_send(session, request, **kwargs):
+    """Session.send com registro de latência, status e bytes"""
+    started = time.perf_counter()
+    bytes_sent = len(request.body) if request.body else 0
+    try:
+        response = _original_send(session, request, **kwargs)
+    except requests.exceptions.RequestException as e:
+        _metrics.record_request(request.method, request.url, time.perf_counter() - started,
+                                error=type(e).__name__, bytes_sent=bytes_sent)
+        raise
+
+    if kwargs.get("stream"):
+        bytes_received = int(response.headers.get("Content-Length") or 0)
+    else:
+        bytes_received = len(response.content or b"")
+    _metrics.record_request(request.method, request.url, time.perf_counter() - started,
+                            status=response.status_code, bytes_sent=bytes_sent, bytes_received=bytes_received)
+    return response
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def write_prometheus():
+    _write_atomic(os.path.join(METRICS_DIR, f"{_metrics.script}.prom"), _metrics.prometheus())
+
+def write_summary():
+    """Grava o resumo JSON e a versão final do arquivo do Prometheus"""
+    summary = _metrics.summary()
+    path = os.path.join(METRICS_DIR, f"{_metrics.script}.json")
+    _write_atomic(path, json.dumps(summary, ensure_ascii=False, indent=2))
+    write_prometheus()
+
+    throttle = sum(summary["throttle_sleep_seconds"].values())
+    print(f"\n📈 Métricas: {summary['requests']} requisições, {summary['http_seconds']:.1f}s em HTTP, "
+          f"{throttle:.1f}s em pausas de rate limit ({path})")
+
+def _periodic_writer():
+    while True:
+        time.sleep(METRICS_INTERVAL)
+        try:
+            write_prometheus()
+        except OSError:
+            pass
+
+def instrument(script):
+    """Ativa a coleta para o script (sem efeito se METRICS não estiver ativo)"""
+    if not ENABLED or _metrics.script is not None:
+        return
+    _metrics.script = os.path.splitext(os.path.basename(script))[0]
+    requests.Session.send = _instrumented_send
+    atexit.register(write_summary)
+    threading.Thread(target=_periodic_writer, daemon=True).start()
+
+def record_retry(method, url):
+    """Registra uma nova tentativa de uma requisição"""
+    if ENABLED:
+        _metrics.record_retry(method, url)
+
+def throttle_sleep(seconds, reason):
+    """time.sleep contabilizado como pausa de rate limit"""
+    if seconds <= 0:
+        return
+    time.sleep(seconds)
+    if ENABLED:
+        _metrics.record_sleep(reason, seconds)
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modo de profiling dos scripts (--profile).
+
+Os scripts chamam run(main, __file__) no lugar de main(). Com --profile na
+linha de comando, a função principal roda sob o cProfile e ao final são
+gravados em logs/profile/:
+- <script>_<data>.pstats: dados brutos (abrir com `python -m pstats` ou snakeviz)
+- <script>_<data>.txt: relatório com as etapas e as N funções mais caras
+
+--profile-top=N muda quantas funções entram no relatório (padrão: 30).
+
+As etapas são marcadas no código com stage("nome") (bloco) ou
+checkpoint("nome") (fases sequenciais de uma função) e só custam algo
+quando o profiling está ativo. O cProfile mede apenas a thread principal;
+as etapas medem tempo de relógio em qualquer thread.
+
+--memory ativa o relatório de memória: o tracemalloc registra as alocações
+e a cada fronteira de etapa (as mais externas; etapas aninhadas como as do
+06 são ignoradas) são lidos o RSS, o pico alocado na etapa e as linhas que
+mais alocaram (--memory-top=N, padrão 10). O relatório vai para
+logs/profile/<script>_<data>_memory.txt. O tracemalloc deixa a execução
+várias vezes mais lenta; use em catálogos de teste ou com paciência.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+PROFILE_DIR = os.path.join("logs", "profile")
+DEFAULT_TOP = 30
+DEFAULT_MEMORY_TOP = 10
+
+ENABLED = False
+MEMORY = False
+
+class StageTimers:
+    """Tempo acumulado e número de execuções de cada etapa nomeada"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.calls = {}
+        self.current = None  # (nome, início) do checkpoint em andamento
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def report(self, total_seconds):
+        lines = [f"{'Etapa':<30} {'Execuções':>10} {'Tempo (s)':>12} {'% total':>8}"]
+        for name, seconds in sorted(self.totals.items(), key=lambda item: -item[1]):
+            share = seconds / total_seconds * 100 if total_seconds else 0
+            lines.append(f"{name:<30} {self.calls[name]:>10} {seconds:>12.3f} {share:>7.1f}%")
+        return "\n".join(lines)
+
+def current_rss_mb():
+    """Memória residente atual do processo em MB (None se não der para medir)"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Sem /proc, só o pico está disponível (KB no Linux, bytes no macOS)
+        return usage / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    except ImportError:
+        return None
+
+RESET_PEAK = hasattr(tracemalloc, "reset_peak")
+
+class MemoryTracker:
+    """Snapshots do tracemalloc e leituras de RSS nas fronteiras das etapas"""
+
+    FILTERS = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+
+    def __init__(self):
+        self.top = DEFAULT_MEMORY_TOP
+        self.records = []
+        self.current = None
+
+    def begin(self, name):
+        snapshot = tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+        # reset_peak só existe a partir do Python 3.9; sem ele o pico seria o do processo inteiro
+        if RESET_PEAK:
+            tracemalloc.reset_peak()
+        self.current = (name, snapshot, current_rss_mb(), tracemalloc.get_traced_memory()[0])
+
+    def end(self):
+        if not self.current:
+            return
+        name, start_snapshot, rss_before, traced_before = self.current
+        traced_after, traced_peak = tracemalloc.get_traced_memory()
+        end_snapshot = tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+        self.records.append({
+            "stage": name,
+            "rss_before": rss_before,
+            "rss_after": current_rss_mb(),
+            "traced_before": traced_before / (1024 * 1024),
+            "traced_after": traced_after / (1024 * 1024),
+            "traced_peak": traced_peak / (1024 * 1024) if RESET_PEAK else None,
+            "top_lines": end_snapshot.compare_to(start_snapshot, "lineno")[:self.top]
+        })
+        self.current = None
+
+    def summary(self):
+        def mb(value):
+            return f"{value:>9.1f}" if value is not None else f"{'n/d':>9}"
+
+        lines = [f"{'Etapa':<24} {'RSS antes':>9} {'RSS depois':>10} {'Pico etapa':>10} {'Retido':>9}  (MB)"]
+        for record in self.records:
+            retained = record["traced_after"] - record["traced_before"]
+            lines.append(f"{record['stage']:<24} {mb(record['rss_before'])} {mb(record['rss_after']):>10} "
+                         f"{mb(record['traced_peak']):>10} {retained:>+9.1f}")
+        return "\n".join(lines)
+
+    def details(self):
+        lines = []
+        for record in self.records:
+            peak = f"{record['traced_peak']:.1f} MB" if record["traced_peak"] is not None else "n/d (Python 3.8)"
+            lines.append(f"\n[{record['stage']}] pico alocado: {peak}")
+            for stat in record["top_lines"]:
+                frame = stat.traceback[0]
+                lines.append(f"   {stat.size_diff / (1024 * 1024):>+9.2f} MB  {stat.count_diff:>+9} blocos  "
+                             f"{os.path.basename(frame.filename)}:{frame.lineno}")
+        return "\n".join(lines)
+
+_timers = StageTimers()
+_memory = MemoryTracker()
+_null_stage = nullcontext()
+
+@contextmanager
+def _timed_stage(name):
+    # Memória só nas etapas mais externas: snapshots em etapas aninhadas (chamadas por item) seriam lentos demais
+    track_memory = MEMORY and _memory.current is None
+    if track_memory:
+        _memory.begin(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timers.add(name, time.perf_counter() - started)
+        if track_memory:
+            _memory.end()
+
+def stage(name):
+    """Bloco medido como etapa (sem custo se o profiling estiver desligado)"""
+    if not (ENABLED or MEMORY):
+        return _null_stage
+    return _timed_stage(name)
+
+def checkpoint(name):
+    """Encerra a etapa sequencial em andamento e inicia a próxima (None só encerra)"""
+    if not (ENABLED or MEMORY):
+        return
+    now = time.perf_counter()
+    if _timers.current:
+        previous, started = _timers.current
+        _timers.add(previous, now - started)
+        if MEMORY and _memory.current and _memory.current[0] == previous:
+            _memory.end()
+    if name and MEMORY and _memory.current is None:
+        _memory.begin(name)
+    # O início é lido depois do snapshot para que ele não conte no tempo da etapa
+    _timers.current = (name, time.perf_counter()) if name else None
+
+def _parse_arguments():
+    """Remove as opções de profiling do sys.argv (para não confundir o argparse dos scripts)"""
+    enabled, top, memory, remaining = False, DEFAULT_TOP, False, [sys.argv[0]]
+    for arg in sys.argv[1:]:
+        if arg == "--profile":
+            enabled = True
+        elif arg.startswith("--profile-top="):
+            enabled = True
+            top = int(arg.split("=", 1)[1])
+        elif arg == "--memory":
+            memory = True
+        elif arg.startswith("--memory-top="):
+            memory = True
+            _memory.top = int(arg.split("=", 1)[1])
+        else:
+            remaining.append(arg)
+    sys.argv[:] = remaining
+    return enabled, top, memory
+
+def _stats_text(profiler, sort, top):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+    return stream.getvalue()
+
+def write_report(profiler, script, elapsed, top):
+    """Grava o .pstats e o relatório texto. Retorna (caminho do relatório, texto)"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{script}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    profiler.dump_stats(f"{base}.pstats")
+
+    checkpoint(None)
+    report = "\n".join([
+        f"PROFILE {script}",
+        "=" * 50,
+        f"Tempo total: {elapsed:.3f}s",
+        "",
+        "ETAPAS",
+        _timers.report(elapsed),
+        "",
+        f"TOP {top} POR TEMPO ACUMULADO",
+        _stats_text(profiler, "cumulative", top),
+        f"TOP {top} POR TEMPO PRÓPRIO",
+        _stats_text(profiler, "tottime", top),
+    ])
+    with open(f"{base}.txt", "w", encoding="utf-8") as f:
+        f.write(report)
+    return f"{base}.txt", report
+
+def write_memory_report(script):
+    """Grava o relatório de memória. Retorna o caminho"""
+    checkpoint(None)
+    _memory.end()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{script}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_memory.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join([
+            f"MEMÓRIA {script}",
+            "=" * 50,
+            _memory.summary(),
+            "",
+            f"LINHAS QUE MAIS ALOCARAM POR ETAPA (top {_memory.top})",
+            _memory.details(),
+            ""
+        ]))
+    return path
+
+def run(main, script):
+    """Executa main(); com --profile/--memory, instrumentado e com relatório ao final"""
+    global ENABLED, MEMORY
+    enabled, top, memory = _parse_arguments()
+    if not (enabled or memory):
+        return main()
+
+    ENABLED, MEMORY = enabled, memory
+    script = os.path.splitext(os.path.basename(script))[0]
+    profiler = cProfile.Profile() if enabled else None
+    if memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    try:
+        return profiler.runcall(main) if profiler else main()
+    finally:
+        elapsed = time.perf_counter() - started
+        print("\n" + "=" * 50)
+        if profiler:
+            path, report = write_report(profiler, script, elapsed, top)
+            print(f"🔬 PROFILE ({elapsed:.2f}s)")
+            print(_timers.report(elapsed))
+            print(f"\n📄 Relatório completo: {path}")
+            print(f"📄 Dados do cProfile: {path[:-len('.txt')]}.pstats")
+        if memory:
+            path = write_memory_report(script)
+            tracemalloc.stop()
+            print(f"🧠 MEMÓRIA ({elapsed:.2f}s com tracemalloc)")
+            print(_memory.summary())
+            print(f"\n📄 Relatório de memória: {path}")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projeção de campos na leitura dos produtos da Bagy.
+
+Um produto da API traz descrição HTML, imagens, marca, categoria e todas
+as variações; o 06 só compara id, nome e URL, o 09 só precisa das URLs e
+SKUs e o 10 só de preço e estoque. Uma Projection declara os campos usados (inclusive dentro de objetos
+aninhados, como as variações) e converte cada registro, no momento da
+leitura, em um objeto compacto com __slots__ e a mesma interface de leitura
+do dict (get, [], in): o restante é descartado antes do próximo registro.
+
+A mesma projeção vira o parâmetro fields da API (id,name,variations.sku...),
+que a Bagy pode usar para devolver só esses campos; se a API ignorar o
+parâmetro, a projeção local garante o mesmo resultado.
+"""
+
+import json
+
+class Record:
+    """Registro compacto: só os campos da projeção, com a interface de leitura do dict"""
+    __slots__ = ()
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __getitem__(self, key):
+        if key not in self.__slots__ or not hasattr(self, key):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.__slots__ and hasattr(self, key)
+
+    def keys(self):
+        return [key for key in self.__slots__ if hasattr(self, key)]
+
+    def to_dict(self):
+        return {key: _plain(getattr(self, key)) for key in self.keys()}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+def _plain(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+class Projection:
+    """Campos usados de um registro; nested projeta objetos (ou listas de objetos) aninhados"""
+
+    def __init__(self, name, fields, nested=None):
+        self.fields = tuple(fields)
+        self.nested = nested or {}
+        self.record_type = type(name, (Record,), {"__slots__": self.fields})
+
+    def api_fields(self):
+        """Valor do parâmetro fields da API (campos aninhados com ponto: variations.sku)"""
+        names = []
+        for field in self.fields:
+            if field in self.nested:
+                names.extend(f"{field}.{child}" for child in self.nested[field].api_fields().split(","))
+            else:
+                names.append(field)
+        return ",".join(names)
+
+    def apply(self, raw):
+        """Converte um dict da API no registro compacto (campos ausentes continuam ausentes)"""
+        if not isinstance(raw, dict):
+            return raw
+        record = self.record_type()
+        for field in self.fields:
+            if field not in raw:
+                continue
+            value = raw[field]
+            nested = self.nested.get(field)
+            if nested is not None:
+                value = [nested.apply(item) for item in value] if isinstance(value, list) else nested.apply(value)
+            setattr(record, field, value)
+        return record
+
+def iter_json_array(path):
+    """Itens de um arquivo com uma lista JSON, decodificados um por vez"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    position = _skip_whitespace(text, 0)
+    if text[position:position + 1] != "[":
+        raise ValueError(f"{path} não contém uma lista JSON")
+    position = _skip_whitespace(text, position + 1)
+    while text[position:position + 1] != "]":
+        item, position = decoder.raw_decode(text, position)
+        yield item
+        position = _skip_whitespace(text, position)
+        if text[position:position + 1] == ",":
+            position = _skip_whitespace(text, position + 1)
+
+def _skip_whitespace(text, position):
+    while position < len(text) and text[position] in " \t\r\n":
+        position += 1
+    return position
+
+def load_json(path, projection):
+    """Lê uma lista JSON projetando cada item (sem manter os dicts completos em memória)"""
+    return [projection.apply(item) for item in iter_json_array(path)]
+
+# Campos de preço e estoque lidos a cada ciclo pelo 10 (e pelo 15); updated_at move a marca d'água
+_STOCK = ("sku", "price", "price_compare", "balance")
+PRODUCT_STOCK = Projection(
+    "ProductStock", ("id", "updated_at", "variations") + _STOCK,
+    nested={"variations": Projection("VariationStock", _STOCK)}
+)
+
+# Campos usados pelo 06 para comparar os produtos
+PRODUCT_MATCH = Projection("ProductMatch", ("id", "name", "url"))
+
+_TAXONOMY = ("name", "slug")
+# Campos usados pelo 09 para gerar os redirects (categoria e marca só no modo --sitemap)
+PRODUCT_LINKS = Projection(
+    "ProductLinks",
+    ("id", "name", "sku", "reference", "url", "variations", "category_default", "brand"),
+    nested={
+        "variations": Projection("VariationLink", ("sku", "url")),
+        "category_default": Projection("CategoryLink", _TAXONOMY),
+        "brand": Projection("BrandLink", _TAXONOMY),
+    }
+)
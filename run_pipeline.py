@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Executor do pipeline de migração como um grafo de dependências (DAG).
+
+Cada etapa declara os arquivos (aceita curingas, ex: products_export_*.csv)
+e tabelas do staging que lê e que produz.
+As dependências são deduzidas dessas declarações e etapas independentes
+rodam em paralelo (ex: 01, 02, 03 e 07 ao mesmo tempo).
+
+Antes de executar uma etapa local, o executor calcula um hash do script,
+dos argumentos e de todas as entradas; se for igual ao da última execução
+bem-sucedida e as saídas ainda existirem, a etapa é pulada.
+Etapas que leem de uma API (exportações, validação) não têm entradas
+locais para comparar e rodam sempre, a menos que --offline seja usado.
+
+Etapas que criam ou alteram dados no Shopify (05, 08, 11, 13, 14, 15 e 16) e a verificação dos
+redirects na loja publicada (12) só rodam quando pedidas explicitamente
+com --only.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from datetime import datetime
+import staging
+
+STATE_FILE = os.path.join("imported", "pipeline_state.json")
+LOG_DIR = os.path.join("logs", "pipeline")
+
+# Prefixo usado para declarar tabelas do staging como entradas/saídas
+STAGING_PREFIX = "staging:"
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    remote: bool = False      # lê de uma API: não dá para saber se a entrada mudou
+    manual: bool = False      # cria dados no Shopify: só roda com --only
+    stdin: str = None         # resposta para scripts com menu interativo
+    incremental: bool = False # aceita --incremental
+
+STAGES = [
+    Stage("01", "01_export_products_from_bagy.py",
+          outputs=["imported/produtos.json", "imported/produtos_dooca.xlsx", "staging:products"],
+          remote=True, incremental=True),
+    Stage("02", "02_export_customers_from_bagy.py",
+          outputs=["imported/clientes_dooca.xlsx", "staging:customers"],
+          remote=True, incremental=True),
+    Stage("03", "03_export_coupons_from_bagy.py",
+          outputs=["imported/cupons_dooca.xlsx", "staging:discounts"],
+          remote=True, incremental=True),
+    Stage("07", "07_export_cashback_from_bagy.py",
+          outputs=["imported/cashback_saldos.json", "imported/cashback_saldos.xlsx", "staging:cashback_balances"],
+          remote=True),
+    Stage("04", "04_convert_products_to_shopify_csv.py",
+          inputs=["imported/produtos.json", "imported/images_upload_state.json"],
+          outputs=["converted/produtos_shopify_completo.csv"],
+          incremental=True),
+    Stage("09", "09_generate_redirects_301.py",
+          inputs=["imported/produtos.json", "staging:products", "imported/products_export_*.csv"],
+          outputs=["converted/redirects_301.csv", "converted/redirects_detailed_report.csv"]),
+    Stage("06", "06_validate_migration.py",
+          inputs=["imported/produtos.json"],
+          outputs=["converted/correspondencias_shopify_bagy.xlsx"],
+          remote=True),
+    Stage("05", "05_import_coupons_to_shopify.py",
+          inputs=["imported/cupons_dooca.xlsx", "staging:discounts"],
+          outputs=["imported/import_results.json"],
+          manual=True, stdin="1\n"),
+    Stage("08", "08_generate_vouchers_from_cashback.py",
+          inputs=["imported/cashback_saldos.json", "staging:cashback_balances", "staging:customers",
+                  "imported/customers_import_state.json"],
+          manual=True),
+    Stage("11", "11_upload_redirects_to_shopify.py",
+          inputs=["converted/redirects_301.csv"],
+          outputs=["imported/redirects_upload_state.json"],
+          manual=True),
+    Stage("12", "12_verify_redirects.py",
+          inputs=["converted/redirects_301.csv", "imported/redirects_upload_state.json"],
+          outputs=["converted/redirects_verification.csv", "converted/redirects_mismatches.csv"],
+          remote=True, manual=True),
+    Stage("13", "13_upload_products_to_shopify.py",
+          inputs=["imported/produtos.json", "imported/images_upload_state.json"],
+          outputs=["imported/products_upload_state.json"],
+          manual=True),
+    Stage("14", "14_upload_images_to_shopify.py",
+          inputs=["imported/produtos.json"],
+          outputs=["imported/images_upload_state.json"],
+          manual=True),
+    Stage("15", "15_sync_inventory_to_shopify.py",
+          outputs=["imported/inventory_index.json"],
+          remote=True, manual=True),
+    Stage("16", "16_import_customers_to_shopify.py",
+          inputs=["staging:customers"],
+          outputs=["converted/clientes_shopify.jsonl", "imported/customers_import_state.json"],
+          remote=True, manual=True),
+]
+
+def build_dependencies(stages):
+    """Deduz as dependências: B depende de A se B lê algo que A produz"""
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            producers.setdefault(output, set()).add(stage.name)
+
+    return {
+        stage.name: {p for item in stage.inputs for p in producers.get(item, ()) if p != stage.name}
+        for stage in stages
+    }
+
+def hash_file(path, digest):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+def hash_staging_table(table, digest):
+    """Hash do conteúdo de uma tabela do staging (na ordem de gravação)"""
+    conn = sqlite3.connect(staging.STAGING_DB)
+    try:
+        for row in conn.execute(f"SELECT * FROM {table} ORDER BY rowid"):
+            digest.update(repr(row).encode("utf-8"))
+    except sqlite3.OperationalError:
+        digest.update(b"<sem tabela>")
+    finally:
+        conn.close()
+
+def stage_fingerprint(stage, args):
+    """Hash do script, dos argumentos e de todas as entradas da etapa"""
+    digest = hashlib.sha256()
+    hash_file(stage.script, digest)
+    digest.update(json.dumps(stage_arguments(stage, args)).encode("utf-8"))
+
+    for item in stage.inputs:
+        digest.update(item.encode("utf-8"))
+        if item.startswith(STAGING_PREFIX):
+            if staging.exists():
+                hash_staging_table(item[len(STAGING_PREFIX):], digest)
+        elif "*" in item:
+            for path in sorted(glob.glob(item)):
+                digest.update(path.encode("utf-8"))
+                hash_file(path, digest)
+        elif os.path.exists(item):
+            hash_file(item, digest)
+        else:
+            digest.update(b"<ausente>")
+
+    return digest.hexdigest()
+
+def outputs_exist(stage):
+    files = [o for o in stage.outputs if not o.startswith(STAGING_PREFIX)]
+    return all(os.path.exists(o) for o in files)
+
+def stage_arguments(stage, args):
+    return ["--incremental"] if args.incremental and stage.incremental else []
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+def should_skip(stage, fingerprint, state, args):
+    """Decide se a etapa pode ser pulada. Retorna o motivo ou None"""
+    if args.force:
+        return None
+    if stage.remote:
+        return "modo offline" if args.offline and outputs_exist(stage) else None
+    last = state.get(stage.name, {})
+    if last.get("fingerprint") == fingerprint and outputs_exist(stage):
+        return "entradas inalteradas"
+    return None
+
+def run_stage(stage, args):
+    """Executa o script da etapa, gravando a saída em logs/pipeline/<etapa>.log"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{stage.name}.log")
+    command = [sys.executable, stage.script] + stage_arguments(stage, args)
+    env = dict(os.environ, PYTHONIOENCODING="utf-8", PYTHONUNBUFFERED="1")
+
+    started = time.monotonic()
+    with open(log_path, "w", encoding="utf-8") as log:
+        result = subprocess.run(command, input=stage.stdin, text=True, stdout=log,
+                                stderr=subprocess.STDOUT, env=env)
+    return result.returncode, time.monotonic() - started, log_path
+
+def select_stages(args):
+    """Etapas pedidas em --only ou todas as automáticas"""
+    if args.only:
+        names = {n.strip() for n in args.only.split(",") if n.strip()}
+        unknown = names - {s.name for s in STAGES}
+        if unknown:
+            raise SystemExit(f"❌ Etapas desconhecidas: {', '.join(sorted(unknown))}")
+        return [s for s in STAGES if s.name in names]
+    return [s for s in STAGES if not s.manual]
+
+def run_pipeline(args):
+    stages = select_stages(args)
+    by_name = {s.name: s for s in stages}
+    dependencies = build_dependencies(stages)
+    state = load_state()
+
+    pending = [s.name for s in stages]
+    results = {}
+    durations = {}
+    running = {}
+
+    print(f"🧭 Etapas: {', '.join(pending)} | paralelismo: {args.jobs}")
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        while pending or running:
+            progressed = False
+            for name in list(pending):
+                deps = dependencies[name]
+                if any(results.get(d) in ("falhou", "bloqueada") for d in deps):
+                    results[name] = "bloqueada"
+                    pending.remove(name)
+                    print(f"⛔ [{name}] bloqueada por dependência com falha")
+                    continue
+                if not all(d in results for d in deps):
+                    continue
+
+                pending.remove(name)
+                progressed = True
+                stage = by_name[name]
+                fingerprint = stage_fingerprint(stage, args)
+                reason = should_skip(stage, fingerprint, state, args)
+
+                if reason:
+                    results[name] = "pulada"
+                    print(f"⏭️  [{name}] pulada ({reason})")
+                elif args.dry_run:
+                    results[name] = "planejada"
+                    print(f"📝 [{name}] seria executada: {stage.script}")
+                else:
+                    print(f"▶️  [{name}] iniciando {stage.script}")
+                    running[executor.submit(run_stage, stage, args)] = (name, fingerprint)
+
+            if not running:
+                if pending and not progressed:
+                    raise SystemExit(f"❌ Dependência circular entre as etapas: {', '.join(pending)}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                returncode, elapsed, log_path = future.result()
+                durations[name] = elapsed
+                if returncode == 0:
+                    results[name] = "ok"
+                    state[name] = {"fingerprint": fingerprint, "finished_at": datetime.now().isoformat(timespec="seconds")}
+                    save_state(state)
+                    print(f"✅ [{name}] concluída em {elapsed:.1f}s")
+                else:
+                    results[name] = "falhou"
+                    print(f"❌ [{name}] falhou (código {returncode}). Log: {log_path}")
+
+    return results, durations
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa o pipeline de migração Bagy → Shopify")
+    parser.add_argument("--only", help="etapas a executar, separadas por vírgula (ex: 01,04,09)")
+    parser.add_argument("--jobs", type=int, default=4, help="etapas simultâneas (padrão: 4)")
+    parser.add_argument("--force", action="store_true", help="executa mesmo com entradas inalteradas")
+    parser.add_argument("--offline", action="store_true", help="pula exportações cujas saídas já existem")
+    parser.add_argument("--incremental", action="store_true", help="exportações 01-03 e conversão 04 em modo incremental")
+    parser.add_argument("--dry-run", action="store_true", help="mostra o plano sem executar")
+    args = parser.parse_args()
+
+    print("🚀 PIPELINE DE MIGRAÇÃO BAGY → SHOPIFY")
+    print("=" * 50)
+
+    started = time.monotonic()
+    results, durations = run_pipeline(args)
+
+    print("\n" + "=" * 50)
+    print("📊 RESUMO DO PIPELINE:")
+    for name, status in results.items():
+        elapsed = f" ({durations[name]:.1f}s)" if name in durations else ""
+        print(f"   [{name}] {status}{elapsed}")
+    print(f"⏱️  Tempo total: {time.monotonic() - started:.1f}s")
+    print("=" * 50)
+
+    if any(status in ("falhou", "bloqueada") for status in results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
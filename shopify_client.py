@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cliente compartilhado para as APIs REST e GraphQL do Shopify.
+
+Centraliza o controle de limite de requisições para que vários workers
+possam usar a mesma loja sem estourar a cota:
+- REST: balde furado (leaky bucket) sincronizado pelo cabeçalho
+  X-Shopify-Shop-Api-Call-Limit
+- GraphQL: pontos de custo sincronizados por extensions.cost.throttleStatus
+
+Respostas 429/5xx e erros THROTTLED são repetidos com espera.
+SHOPIFY_BASE_URL permite apontar o cliente para um servidor local (stub).
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+import metrics
+
+# Carrega as variáveis do arquivo .env
+load_dotenv()
+
+SHOPIFY_SHOP_DOMAIN = os.getenv("SHOPIFY_SHOP_DOMAIN")
+SHOPIFY_ACCESS_TOKEN = os.getenv("SHOPIFY_ACCESS_TOKEN")
+SHOPIFY_API_VERSION = "2024-10"
+SHOPIFY_BASE_URL = os.getenv("SHOPIFY_BASE_URL") or f"https://{SHOPIFY_SHOP_DOMAIN}"
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MAX_BACKOFF = 30
+
+FIRST_LOCATION_QUERY = """
+{ locations(first: 1) { nodes { id name } } }
+"""
+
+class ShopifyError(Exception):
+    """Erro da API Shopify que persistiu após as novas tentativas"""
+
+class LeakyBucket:
+    """Limite da API REST: balde de 40 requisições que esvazia 2 por segundo"""
+
+    def __init__(self, capacity=40, leak_rate=2.0):
+        self.capacity = capacity
+        self.leak_rate = leak_rate
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _leak(self):
+        now = time.monotonic()
+        self.level = max(0.0, self.level - (now - self.updated) * self.leak_rate)
+        self.updated = now
+
+    def acquire(self):
+        """Bloqueia até haver espaço no balde para mais uma requisição"""
+        while True:
+            with self.lock:
+                self._leak()
+                if self.level + 1 <= self.capacity:
+                    self.level += 1
+                    return
+                wait = (self.level + 1 - self.capacity) / self.leak_rate
+            metrics.throttle_sleep(wait, "shopify_rest_bucket")
+
+    def update_from_header(self, header):
+        """Sincroniza com o valor informado pelo Shopify (ex: "32/40")"""
+        if not header or "/" not in header:
+            return
+        try:
+            used, capacity = (float(x) for x in header.split("/", 1))
+        except ValueError:
+            return
+        with self.lock:
+            self.level = used
+            self.capacity = capacity
+            self.updated = time.monotonic()
+
+class CostThrottle:
+    """Limite da API GraphQL: pontos de custo que se recuperam por segundo"""
+
+    def __init__(self, maximum=1000.0, restore_rate=50.0):
+        self.maximum = maximum
+        self.restore_rate = restore_rate
+        self.available = maximum
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _restore(self):
+        now = time.monotonic()
+        self.available = min(self.maximum, self.available + (now - self.updated) * self.restore_rate)
+        self.updated = now
+
+    def acquire(self, cost):
+        """Reserva pontos para uma consulta, esperando a recuperação se preciso"""
+        cost = min(cost, self.maximum)
+        while True:
+            with self.lock:
+                self._restore()
+                if self.available >= cost:
+                    self.available -= cost
+                    return
+                wait = (cost - self.available) / self.restore_rate
+            metrics.throttle_sleep(wait, "shopify_graphql_cost")
+
+    def available_points(self):
+        """Pontos disponíveis agora (com a recuperação desde a última resposta)"""
+        with self.lock:
+            self._restore()
+            return self.available
+
+    def update(self, cost_info):
+        """Sincroniza com extensions.cost.throttleStatus da resposta"""
+        status = (cost_info or {}).get("throttleStatus")
+        if not status:
+            return
+        with self.lock:
+            self.maximum = float(status.get("maximumAvailable", self.maximum))
+            self.restore_rate = float(status.get("restoreRate", self.restore_rate))
+            self.available = float(status.get("currentlyAvailable", self.available))
+            self.updated = time.monotonic()
+
+def retry_wait(response, attempt):
+    """Tempo de espera antes de repetir: Retry-After (segundos ou data HTTP) ou backoff exponencial"""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+        try:
+            # Data HTTP (RFC 9110), ex: "Wed, 21 Oct 2026 07:28:00 GMT"
+            return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            pass
+    return min(2 ** attempt, MAX_BACKOFF)
+
+class ShopifyClient:
+    """Sessão HTTP com pool de conexões e limites compartilhados entre threads"""
+
+    def __init__(self, base_url=None, access_token=None, api_version=SHOPIFY_API_VERSION,
+                 pool_size=10, max_retries=5, timeout=30):
+        self.base_url = (base_url or SHOPIFY_BASE_URL).rstrip("/")
+        self.api_url = f"{self.base_url}/admin/api/{api_version}"
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "X-Shopify-Access-Token": access_token or SHOPIFY_ACCESS_TOKEN or "",
+            "Content-Type": "application/json"
+        })
+
+        self.rest_bucket = LeakyBucket()
+        self.cost_throttle = CostThrottle()
+
+    def _send(self, method, url, before_send, **kwargs):
+        """Envia a requisição repetindo em falhas de rede, 429 e 5xx"""
+        for attempt in range(self.max_retries + 1):
+            before_send()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if attempt == self.max_retries:
+                    raise ShopifyError(f"Falha de conexão com {url}: {e}")
+                metrics.record_retry(method, url)
+                metrics.throttle_sleep(retry_wait(None, attempt), "retry_backoff")
+                continue
+
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                metrics.record_retry(method, url)
+                metrics.throttle_sleep(retry_wait(response, attempt), "retry_backoff")
+                continue
+            return response
+
+    def rest(self, method, path, **kwargs):
+        """Chamada REST (path relativo a /admin/api/<versão>/). Retorna a resposta"""
+        url = path if path.startswith("http") else f"{self.api_url}/{path.lstrip('/')}"
+        response = self._send(method, url, self.rest_bucket.acquire, **kwargs)
+        self.rest_bucket.update_from_header(response.headers.get("X-Shopify-Shop-Api-Call-Limit"))
+        return response
+
+    def graphql(self, query, variables=None, estimated_cost=10):
+        """Executa uma consulta GraphQL e retorna o campo data"""
+        return self.graphql_with_cost(query, variables, estimated_cost)[0]
+
+    def graphql_with_cost(self, query, variables=None, estimated_cost=10):
+        """Como graphql, retornando também extensions.cost da resposta (custo pedido, real e throttleStatus)"""
+        url = f"{self.api_url}/graphql.json"
+        payload = {"query": query, "variables": variables or {}}
+
+        for attempt in range(self.max_retries + 1):
+            response = self._send("POST", url, lambda: self.cost_throttle.acquire(estimated_cost), json=payload)
+            if response.status_code != 200:
+                raise ShopifyError(f"GraphQL HTTP {response.status_code}: {response.text[:300]}")
+
+            body = response.json()
+            cost = (body.get("extensions") or {}).get("cost") or {}
+            self.cost_throttle.update(cost)
+
+            errors = body.get("errors")
+            if errors:
+                throttled = any((e.get("extensions") or {}).get("code") == "THROTTLED" for e in errors)
+                if throttled and attempt < self.max_retries:
+                    metrics.record_retry("POST", url)
+                    continue
+                raise ShopifyError(f"GraphQL: {errors}")
+
+            return body.get("data") or {}, cost
+
+        raise ShopifyError("GraphQL: limite de custo excedido após novas tentativas")
+
+def resolve_location_id(client, location_id=None):
+    """Usa a location informada (ou SHOPIFY_LOCATION_ID) ou a primeira location da loja"""
+    location_id = location_id or os.getenv("SHOPIFY_LOCATION_ID")
+    if location_id:
+        return location_id if location_id.startswith("gid://") else f"gid://shopify/Location/{location_id}"
+
+    nodes = client.graphql(FIRST_LOCATION_QUERY).get("locations", {}).get("nodes", [])
+    if not nodes:
+        raise ShopifyError("Nenhuma location encontrada na loja Shopify")
+    print(f"📍 Location de estoque: {nodes[0].get('name')} ({nodes[0]['id']})")
+    return nodes[0]["id"]
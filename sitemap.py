@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leitura em fluxo de sitemaps XML (índice e sitemaps filhos).
+
+iter_urls(location) percorre um sitemap ou um índice de sitemaps e devolve
+as URLs uma a uma, sem carregar o arquivo inteiro: o XML é lido com
+iterparse e cada <url>/<sitemap> é descartado assim que processado, então a
+memória fica constante mesmo com centenas de milhares de URLs.
+
+- location pode ser uma URL (http/https) ou um arquivo local
+- arquivos .xml.gz (ou respostas compactadas) são descompactados em fluxo
+- filhos de um índice local são procurados primeiro na mesma pasta, pelo
+  nome do arquivo (cópia offline do sitemap); se não existirem, são baixados
+- só <loc>/<lastmod> do namespace do sitemap são lidos: os das extensões
+  de imagem e vídeo são ignorados
+"""
+
+import gzip
+import io
+import os
+import xml.etree.ElementTree as ET
+from urllib.parse import urlparse
+import requests
+
+MAX_DEPTH = 3
+TIMEOUT = 60
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+def _split_tag(tag):
+    """Namespace e nome da tag ({http://www.sitemaps.org/...}url -> (http://www.sitemaps.org/..., url))"""
+    if tag.startswith("{"):
+        namespace, _, name = tag[1:].partition("}")
+        return namespace, name
+    return "", tag
+
+def _is_remote(location):
+    return urlparse(location).scheme in ("http", "https")
+
+def _resolve_child(location, parent):
+    """Filho de um índice local: usa a cópia na mesma pasta quando existir"""
+    if parent and not _is_remote(parent):
+        local = os.path.join(os.path.dirname(parent), os.path.basename(urlparse(location).path))
+        if os.path.exists(local):
+            return local
+    if location.startswith("file://"):
+        return urlparse(location).path
+    return location
+
+def _open(location, session):
+    """Abre o sitemap como fluxo de bytes (descompactando gzip pelo cabeçalho do arquivo)"""
+    if _is_remote(location):
+        response = (session or requests).get(location, stream=True, timeout=TIMEOUT)
+        response.raise_for_status()
+        response.raw.decode_content = True
+        stream = io.BufferedReader(response.raw)
+    else:
+        stream = open(location, "rb")
+    if stream.peek(2)[:2] == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+def iter_urls(location, session=None, parent=None, depth=0, visited=None):
+    """URLs do sitemap (ou de todos os filhos do índice), como (loc, lastmod, sitemap de origem)"""
+    visited = set() if visited is None else visited
+    location = _resolve_child(location, parent)
+    if location in visited or depth > MAX_DEPTH:
+        return
+    visited.add(location)
+
+    stream = _open(location, session)
+    try:
+        root = None
+        entry = {}
+        for event, element in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = element
+                continue
+
+            # Só as tags do protocolo de sitemap (ou sem namespace): extensões como
+            # <image:loc> e <video:...> usam os mesmos nomes e não podem substituir o <loc> da página
+            namespace, name = _split_tag(element.tag)
+            if namespace not in (SITEMAP_NAMESPACE, ""):
+                continue
+            if name in ("loc", "lastmod"):
+                entry[name] = (element.text or "").strip()
+            elif name in ("url", "sitemap"):
+                loc, lastmod = entry.get("loc"), entry.get("lastmod")
+                entry = {}
+                # Descarta o que já foi lido (o root guarda referência aos filhos processados)
+                root.clear()
+                if not loc:
+                    continue
+                if name == "sitemap":
+                    yield from iter_urls(loc, session, location, depth + 1, visited)
+                else:
+                    yield loc, lastmod, location
+    finally:
+        stream.close()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Snapshot local dos registros exportados da Bagy, usado pela exportação incremental.
+
+Cada exportador (produtos, clientes, cupons) mantém em imported/snapshots/
+um arquivo <nome>.json com todos os registros indexados por id e a marca
+d'água (maior updated_at já visto). Na execução seguinte com --incremental
+a paginação é pedida ordenada por -updated_at e para assim que chega em
+registros mais antigos que a marca d'água; os registros alterados são
+mesclados no snapshot e os arquivos de saída são gerados a partir dele.
+
+Se alguma página falhar, a marca d'água não avança: a próxima execução
+busca de novo desde a marca anterior (ou faz a varredura completa, se
+ainda não houver marca), sem perder os registros das páginas puladas.
+
+Observação: exclusões na Bagy não aparecem na exportação incremental.
+Rode uma exportação completa (sem --incremental) periodicamente para
+reconstruir o snapshot do zero.
+"""
+
+import json
+import os
+
+SNAPSHOT_DIR = os.path.join("imported", "snapshots")
+
+# Parâmetro de ordenação aceito pela API da Bagy (mesmo formato do "-id" usado no 07)
+INCREMENTAL_SORT = "-updated_at"
+
+def snapshot_path(name):
+    """Caminho do arquivo de snapshot de um conjunto de dados"""
+    return os.path.join(SNAPSHOT_DIR, f"{name}.json")
+
+def load_snapshot(name):
+    """Carrega o snapshot salvo. Retorna (registros por id, marca d'água)"""
+    path = snapshot_path(name)
+    if not os.path.exists(path):
+        return {}, None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"⚠️  Snapshot {path} ilegível ({e}), fazendo exportação completa")
+        return {}, None
+
+    return data.get("records", {}), data.get("watermark")
+
+def save_snapshot(name, records, watermark):
+    """Salva o snapshot de forma atômica (arquivo temporário + rename)"""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = snapshot_path(name)
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"watermark": watermark, "records": records}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    print(f"📸 Snapshot salvo em {path} ({len(records)} registros, marca d'água: {watermark or '-'})")
+
+def merge_records(records, changed):
+    """Mescla registros alterados no snapshot. Retorna (novos, atualizados)"""
+    new_count = 0
+    updated_count = 0
+
+    for record in changed:
+        if not record or record.get("id") is None:
+            continue
+        key = str(record["id"])
+        if key in records:
+            updated_count += 1
+        else:
+            new_count += 1
+        records[key] = record
+
+    return new_count, updated_count
+
+def latest_updated_at(records, current=None):
+    """Maior updated_at entre os registros (ou a marca d'água atual)"""
+    latest = current
+    for record in records:
+        updated_at = record.get("updated_at")
+        if updated_at and (latest is None or updated_at > latest):
+            latest = updated_at
+    return latest
+
+def next_watermark(records, current, complete):
+    """Marca d'água a salvar: só avança quando a paginação terminou (complete)"""
+    if not complete:
+        print(f"⚠️  Paginação interrompida: marca d'água mantida em {current or '-'}, rode a exportação de novo")
+        return current
+    return latest_updated_at(records, current)
+
+def changed_since(page_records, watermark):
+    """
+    Separa os registros de uma página ordenada por -updated_at.
+
+    Retorna (registros com updated_at >= marca d'água, marca atingida).
+    Registros iguais à marca d'água são mantidos porque podem ter sido
+    alterados no mesmo segundo da última execução; a mesclagem é idempotente.
+    Se a página não vier ordenada (API ignorou o parâmetro sort), devolve a
+    página inteira e não interrompe a paginação, caindo na varredura completa.
+    """
+    stamps = [r.get("updated_at") or "" for r in page_records]
+    if stamps != sorted(stamps, reverse=True):
+        print("⚠️  Página não está ordenada por updated_at, continuando varredura completa")
+        return page_records, False
+
+    recent = [r for r, stamp in zip(page_records, stamps) if stamp >= watermark]
+    return recent, len(recent) < len(page_records)
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Banco de staging (SQLite) compartilhado entre as etapas da migração.
+
+Os exportadores gravam aqui os registros da Bagy (produtos, variações,
+clientes, cupons e saldos de cashback), o 09 grava o mapeamento
+SKU -> Handle da exportação do Shopify e o 04 guarda as linhas de CSV já
+convertidas de cada produto com o hash do conteúdo de origem. Os consumidores fazem buscas
+indexadas (id, sku, handle, email) em vez de reler arquivos inteiros.
+
+Cada gravação roda em uma única transação: uma exportação interrompida não
+deixa o banco pela metade. Exportações completas substituem a tabela;
+exportações incrementais fazem upsert apenas dos registros alterados.
+"""
+
+import json
+import os
+import sqlite3
+
+STAGING_DB = os.path.join("imported", "staging.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    sku TEXT,
+    url TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_products_sku ON products(sku);
+
+CREATE TABLE IF NOT EXISTS variations (
+    product_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    sku TEXT,
+    url TEXT,
+    PRIMARY KEY (product_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_variations_sku ON variations(sku);
+
+CREATE TABLE IF NOT EXISTS customers (
+    id TEXT PRIMARY KEY,
+    email TEXT,
+    name TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email);
+
+CREATE TABLE IF NOT EXISTS discounts (
+    id TEXT PRIMARY KEY,
+    code TEXT,
+    active INTEGER,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_discounts_code ON discounts(code);
+
+CREATE TABLE IF NOT EXISTS cashback_balances (
+    customer_id TEXT PRIMARY KEY,
+    balance REAL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS shopify_skus (
+    sku TEXT PRIMARY KEY,
+    handle TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_shopify_skus_handle ON shopify_skus(handle);
+
+CREATE TABLE IF NOT EXISTS converted_products (
+    product_id TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    block BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def connect(path=STAGING_DB):
+    """Abre (e cria, se preciso) o banco de staging"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Timeout alto: exportadores rodando em paralelo (run_pipeline.py) disputam a escrita
+    conn = sqlite3.connect(path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def exists(path=STAGING_DB):
+    """Indica se o banco de staging já foi criado por algum exportador"""
+    return os.path.exists(path)
+
+def count_rows(conn, table):
+    """Quantidade de registros de uma tabela"""
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def _key(value):
+    return None if value is None else str(value)
+
+def upsert_products(conn, products, replace=False):
+    """Grava produtos e variações. replace=True substitui a tabela inteira"""
+    with conn:
+        if replace:
+            conn.execute("DELETE FROM products")
+            conn.execute("DELETE FROM variations")
+
+        for product in products:
+            if not product or product.get("id") is None:
+                continue
+            product_id = _key(product["id"])
+            conn.execute(
+                """INSERT INTO products (id, name, sku, url, updated_at, data) VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET name=excluded.name, sku=excluded.sku, url=excluded.url,
+                   updated_at=excluded.updated_at, data=excluded.data""",
+                (product_id, product.get("name"), _key(product.get("sku")), product.get("url"),
+                 product.get("updated_at"), json.dumps(product, ensure_ascii=False))
+            )
+
+            conn.execute("DELETE FROM variations WHERE product_id = ?", (product_id,))
+            conn.executemany(
+                "INSERT INTO variations (product_id, position, sku, url) VALUES (?, ?, ?, ?)",
+                [
+                    (product_id, position, _key(variation.get("sku")), variation.get("url"))
+                    for position, variation in enumerate(product.get("variations") or [])
+                ]
+            )
+
+def upsert_customers(conn, customers, replace=False):
+    """Grava clientes. replace=True substitui a tabela inteira"""
+    with conn:
+        if replace:
+            conn.execute("DELETE FROM customers")
+        conn.executemany(
+            """INSERT INTO customers (id, email, name, updated_at, data) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(id) DO UPDATE SET email=excluded.email, name=excluded.name,
+               updated_at=excluded.updated_at, data=excluded.data""",
+            [
+                (_key(c["id"]), (c.get("email") or "").strip().lower() or None, c.get("name"),
+                 c.get("updated_at"), json.dumps(c, ensure_ascii=False))
+                for c in customers if c and c.get("id") is not None
+            ]
+        )
+
+def upsert_discounts(conn, discounts, replace=False):
+    """Grava cupons. replace=True substitui a tabela inteira"""
+    with conn:
+        if replace:
+            conn.execute("DELETE FROM discounts")
+        conn.executemany(
+            """INSERT INTO discounts (id, code, active, updated_at, data) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(id) DO UPDATE SET code=excluded.code, active=excluded.active,
+               updated_at=excluded.updated_at, data=excluded.data""",
+            [
+                (_key(d["id"]), d.get("code"), 1 if d.get("active") else 0,
+                 d.get("updated_at"), json.dumps(d, ensure_ascii=False))
+                for d in discounts if d and d.get("id") is not None
+            ]
+        )
+
+def replace_cashback_balances(conn, balances):
+    """Substitui os saldos de cashback (a exportação do 07 é sempre completa)"""
+    with conn:
+        conn.execute("DELETE FROM cashback_balances")
+        conn.executemany(
+            """INSERT INTO cashback_balances (customer_id, balance, data) VALUES (?, ?, ?)
+               ON CONFLICT(customer_id) DO UPDATE SET balance=excluded.balance, data=excluded.data""",
+            [
+                (_key(b["customer_id"]), b.get("balance"), json.dumps(b, ensure_ascii=False))
+                for b in balances if b and b.get("customer_id") is not None
+            ]
+        )
+
+def replace_shopify_skus(conn, pairs, source=None):
+    """Substitui o mapeamento SKU -> Handle (último handle vence, como no dict do 09)"""
+    with conn:
+        conn.execute("DELETE FROM shopify_skus")
+        conn.executemany(
+            "INSERT INTO shopify_skus (sku, handle) VALUES (?, ?) "
+            "ON CONFLICT(sku) DO UPDATE SET handle=excluded.handle",
+            pairs
+        )
+        if source:
+            set_meta(conn, "shopify_skus_source", source)
+
+def get_converted_hashes(conn):
+    """Hash de conteúdo de cada produto já convertido pelo 04 (id -> hash)"""
+    return dict(conn.execute("SELECT product_id, hash FROM converted_products"))
+
+def get_converted_block(conn, product_id):
+    """Linhas de CSV já codificadas de um produto convertido: (bloco, quantidade de linhas) ou None"""
+    return conn.execute(
+        "SELECT block, row_count FROM converted_products WHERE product_id = ?", (_key(product_id),)
+    ).fetchone()
+
+def save_converted_block(conn, product_id, content_hash, block, row_count):
+    """Grava as linhas convertidas de um produto (sem commit: o 04 grava tudo em uma transação)"""
+    conn.execute(
+        """INSERT INTO converted_products (product_id, hash, row_count, block) VALUES (?, ?, ?, ?)
+           ON CONFLICT(product_id) DO UPDATE SET hash=excluded.hash, row_count=excluded.row_count,
+           block=excluded.block""",
+        (_key(product_id), content_hash, row_count, block)
+    )
+
+def delete_converted_products(conn, product_ids):
+    """Remove do cache de conversão produtos que saíram do catálogo (sem commit)"""
+    conn.executemany("DELETE FROM converted_products WHERE product_id = ?", [(_key(i),) for i in product_ids])
+
+def set_meta(conn, key, value):
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+        (key, value)
+    )
+
+def get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def _iter_data(conn, query, params=()):
+    for (data,) in conn.execute(query, params):
+        yield json.loads(data)
+
+def iter_products(conn):
+    """Produtos na ordem de exportação"""
+    return _iter_data(conn, "SELECT data FROM products ORDER BY rowid")
+
+def iter_customers(conn):
+    """Clientes na ordem de exportação"""
+    return _iter_data(conn, "SELECT data FROM customers ORDER BY rowid")
+
+def iter_discounts(conn):
+    """Cupons na ordem de exportação"""
+    return _iter_data(conn, "SELECT data FROM discounts ORDER BY rowid")
+
+def iter_cashback_balances(conn):
+    """Saldos de cashback na ordem de exportação"""
+    return _iter_data(conn, "SELECT data FROM cashback_balances ORDER BY rowid")
+
+def iter_product_links(conn):
+    """(rowid, url, name, sem variações, sku ou reference) dos produtos, na ordem de exportação.
+    O JSON só é lido para o reference de produtos sem variações e sem sku"""
+    return conn.execute(
+        """SELECT rowid, url, name, simple,
+                  CASE WHEN simple AND (sku IS NULL OR sku = '') THEN json_extract(data, '$.reference') ELSE sku END
+           FROM (SELECT p.rowid AS rowid, p.url AS url, p.name AS name, p.sku AS sku, p.data AS data,
+                        NOT EXISTS (SELECT 1 FROM variations v WHERE v.product_id = p.id) AS simple
+                 FROM products p)
+           ORDER BY rowid"""
+    )
+
+def iter_variation_links(conn):
+    """(rowid do produto, sku, url) das variações, na ordem de exportação"""
+    return conn.execute(
+        """SELECT p.rowid, v.sku, v.url FROM variations v JOIN products p ON p.id = v.product_id
+           ORDER BY p.rowid, v.position"""
+    )
+
+def iter_product_taxonomy(conn):
+    """Pares distintos (categoria padrão, slug, marca, slug) dos produtos, lidos do JSON"""
+    return conn.execute(
+        """SELECT DISTINCT json_extract(data, '$.category_default.name'), json_extract(data, '$.category_default.slug'),
+                           json_extract(data, '$.brand.name'), json_extract(data, '$.brand.slug')
+           FROM products"""
+    )
+
+def iter_shopify_skus(conn):
+    """Pares (sku, handle) do mapeamento do Shopify"""
+    return conn.execute("SELECT sku, handle FROM shopify_skus")
+
+def get_customer(conn, customer_id):
+    """Busca um cliente da Bagy pelo id"""
+    row = conn.execute("SELECT data FROM customers WHERE id = ?", (_key(customer_id),)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def find_customer_by_email(conn, email):
+    """Busca um cliente da Bagy pelo email (sem diferenciar maiúsculas)"""
+    row = conn.execute(
+        "SELECT data FROM customers WHERE email = ?", ((email or "").strip().lower(),)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+def find_handle_by_sku(conn, sku):
+    """Handle do Shopify para um SKU (None se não existir)"""
+    row = conn.execute("SELECT handle FROM shopify_skus WHERE sku = ?", (_key(sku),)).fetchone()
+    return row[0] if row else None
+
+class ProductsView:
+    """Produtos do staging lidos sob demanda, sem carregar a tabela inteira"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __len__(self):
+        return count_rows(self.conn, "products")
+
+    def __iter__(self):
+        return iter_products(self.conn)
+
+class SkuHandleIndex:
+    """Mapeamento SKU -> Handle com a mesma interface do dict, via consultas indexadas"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __len__(self):
+        return count_rows(self.conn, "shopify_skus")
+
+    def __contains__(self, sku):
+        return find_handle_by_sku(self.conn, sku) is not None
+
+    def __getitem__(self, sku):
+        handle = find_handle_by_sku(self.conn, sku)
+        if handle is None:
+            raise KeyError(sku)
+        return handle
+
+    def get(self, sku, default=None):
+        handle = find_handle_by_sku(self.conn, sku)
+        return default if handle is None else handle
+
+    def items(self):
+        return iter_shopify_skus(self.conn)
+
+    @staticmethod
+    def key(sku):
+        """SKU como é guardado e comparado nas buscas (texto)"""
+        return _key(sku)